@@ -1,28 +1,246 @@
-from django.contrib import admin
-from .models import Product, QuotationRequest, Lead
+import time
+from datetime import timedelta
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.http import HttpResponse, HttpResponseRedirect
+from django.template.response import TemplateResponse
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import analytics, pricing, profiling
+from .models import Product, QuotationRequest, Lead, LeadNotification, Store
+
+
+# --- Big-table helpers ---
+class EstimatedCountPaginator(Paginator):
+    """
+    Unfiltered changelists pe postgres ka planner estimate (pg_class.reltuples)
+    use karo instead of a full COUNT(*). Small tables and filtered/searched
+    lists still get the exact count.
+    """
+    estimate_threshold = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[getattr(queryset, "db", "default")]
+        if connection.vendor == "postgresql" and not queryset.query.where:
+            with connection.cursor() as cursor:
+                # partitioned tables (Lead/QuotationRequest): sum over the partitions
+                cursor.execute(
+                    "SELECT SUM(GREATEST(reltuples, 0))::bigint FROM pg_class WHERE oid = %s::regclass "
+                    "OR oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass)",
+                    [queryset.model._meta.db_table] * 2,
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= self.estimate_threshold:
+                return row[0]
+        return super().count
+
+
+class ProductAutocompleteFilter(admin.SimpleListFilter):
+    """Product filter as a select2 autocomplete box instead of listing every product."""
+    title = "product"
+    parameter_name = "product__id__exact"
+    template = "admin/chatbot/autocomplete_filter.html"
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        self.widget = product_autocomplete_widget(model, model_admin)
+        self.rendered_widget = self.widget.render(
+            "autocomplete_" + self.parameter_name, self.value(), attrs={"style": "width: 100%"}
+        )
+
+    def lookups(self, request, model_admin):
+        return ()  # never enumerate products
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            "selected": self.value() is None,
+            "query_string": changelist.get_query_string(remove=[self.parameter_name]),
+            "display": "All",
+        }
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(product_id=self.value())
+        return queryset
+
+
+def product_autocomplete_widget(model, model_admin):
+    db_field = model._meta.get_field("product")
+    widget = AutocompleteSelect(
+        db_field,
+        model_admin.admin_site,
+        attrs={"data-autocomplete-filter": ProductAutocompleteFilter.parameter_name},
+    )
+    # form field ke through banao taaki widget.choices lazy ModelChoiceIterator ho
+    return db_field.formfield(widget=widget).widget
+
+
+# --- Store Admin ---
+@admin.register(Store)
+class StoreAdmin(admin.ModelAdmin):
+    list_display = ("name", "slug", "hosts", "whatsapp_number", "intents_file", "is_active")
+    search_fields = ("name", "slug", "hosts", "whatsapp_number")
+    prepopulated_fields = {"slug": ("name",)}
 
 # --- Product Admin ---
+class RepriceActionForm(ActionForm):
+    rate = forms.DecimalField(required=False, min_value=0.01, decimal_places=4, label="Silver ₹/g",
+                              widget=forms.NumberInput(attrs={"step": "0.01", "style": "width: 7em"}))
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ("id", "name", "category", "price", "best_seller")  # columns jo dikhenge
-    list_filter = ("category", "best_seller")  # sidebar filter
-    search_fields = ("name", "description", "category")  # search option
+    list_display = ("id", "name", "category", "price", "weight_grams", "making_charge", "best_seller")  # columns jo dikhenge
+    list_filter = ("store", "category", "best_seller")  # sidebar filter
+    search_fields = ("name", "description", "category")  # search option (autocomplete bhi isi se)
     list_editable = ("price", "best_seller")  # direct edit from list view
     ordering = ("id",)  # Default ordering
     list_per_page = 20  # Pagination
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    action_form = RepriceActionForm
+    actions = ["reprice"]
+
+    @admin.action(description="Reprice selected products at the silver rate (weight × rate + making charge)")
+    def reprice(self, request, queryset):
+        # "Select all" + a category filter = whole category in one UPDATE
+        try:
+            rate = pricing.parse_rate(request.POST.get("rate", ""))
+        except ValueError:
+            self.message_user(request, "Enter the silver rate (₹ per gram) next to the action.", messages.ERROR)
+            return
+        updated, elapsed = pricing.reprice(rate, queryset)
+        self.message_user(request, f"Repriced {updated} product(s) at ₹{rate}/g in {elapsed * 1000:.0f} ms "
+                                   "(products without a weight keep their price).")
 
 # --- Quotation Request Admin ---
 @admin.register(QuotationRequest)
 class QuotationRequestAdmin(admin.ModelAdmin):
     list_display = ("id", "customer_name", "contact", "product", "quantity", "created_at")
-    list_filter = ("created_at", "product")
+    list_select_related = ("product",)  # product.__str__ bina per-row query
+    list_filter = ("store", "created_at", ProductAutocompleteFilter)
+    autocomplete_fields = ("product",)
+    date_hierarchy = "created_at"
     search_fields = ("customer_name", "contact", "message")
     ordering = ("-created_at",)
     list_per_page = 20
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        return (super().media
+                + product_autocomplete_widget(self.model, self).media
+                + forms.Media(js=["chatbot/admin_autocomplete_filter.js"]))
 
 # --- Lead Admin ---
 @admin.register(Lead)
 class LeadAdmin(admin.ModelAdmin):
     list_display = ("name", "phone", "email", "created_at")
     search_fields = ("name", "phone", "email")
-    list_filter = ("created_at",)
+    list_filter = ("store", "created_at")
+    date_hierarchy = "created_at"
+    ordering = ("-created_at",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+# --- Lead notification outbox ---
+@admin.register(LeadNotification)
+class LeadNotificationAdmin(admin.ModelAdmin):
+    list_display = ("lead", "status", "attempts", "next_attempt_at", "sent_at", "last_error")
+    list_filter = ("status",)
+    list_select_related = ("lead",)
+    raw_id_fields = ("lead",)
+    ordering = ("-created_at",)
+    actions = ["retry_now"]
+
+    @admin.action(description="Retry selected notifications now")
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=LeadNotification.SENT).update(
+            status=LeadNotification.PENDING, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f"{updated} notification(s) queued for the next notify_leads run.")
+
+
+# --- Request profiles (not a model: JSON files written by profiling.py) ---
+def profiles_view(request):
+    """Admin page: recent profiles, merged hotspots, collapsed-stack download, on/off toggle."""
+    names = profiling.list_profiles()
+    if request.method == "POST":
+        minutes = (request.POST.get("minutes") or "0").strip()
+        if not minutes.isdigit():
+            messages.error(request, "Minutes must be a whole number.")
+            return HttpResponseRedirect(request.path)
+        limit = profiling.max_toggle_minutes()
+        if int(minutes) > limit:
+            messages.warning(request, f"Profiling everything is capped at {limit} minutes.")
+        until = profiling.set_toggle(min(int(minutes), limit))
+        messages.info(request, f"Profiling all requests until {time.strftime('%H:%M:%S', time.localtime(until))}."
+                      if until else "Profiling toggle switched off.")
+        return HttpResponseRedirect(request.path)
+
+    selected = request.GET.getlist("p") or names[:50]
+    records = []
+    for name in selected:
+        try:
+            records.append((name, profiling.read_profile(name)))
+        except (OSError, ValueError):
+            continue  # pruned meanwhile
+    stacks = profiling.merge_stacks(record for _, record in records)
+
+    if request.GET.get("format") == "collapsed":
+        response = HttpResponse(profiling.collapsed_text(stacks), content_type="text/plain; charset=utf-8")
+        response["Content-Disposition"] = 'attachment; filename="chat-profiles.collapsed"'
+        return response
+
+    own, inclusive = profiling.hotspots(stacks)
+    total = sum(stacks.values()) or 1
+    context = {
+        **admin.site.each_context(request),
+        "title": "Request profiles",
+        "profiles": [(name, record) for name, record in records],
+        "own": [(frame, count, count * 100 / total) for frame, count in own],
+        "inclusive": [(frame, count, count * 100 / total) for frame, count in inclusive],
+        "toggle_until": profiling.toggle_until(),
+        "now": time.time(),
+        "token": profiling.make_token(),
+        "header": profiling.HEADER,
+        "query": request.GET.urlencode(),
+    }
+    return TemplateResponse(request, "admin/chatbot/profiles.html", context)
+
+
+ANALYTICS_RANGES = [7, 14, 30, 90]
+
+
+def analytics_view(request):
+    """Admin page: daily messages, fallback rate, stages, cart adds and conversions - DailyRollup rows only."""
+    days = request.GET.get("days", "")
+    days = int(days) if days.isdigit() and 0 < int(days) <= 366 else 14
+    store = request.GET.get("store")
+    store_id = int(store) if store and store.isdigit() else None
+    end = timezone.localdate()
+    report = analytics.report(end - timedelta(days=days - 1), end, store_id)
+    context = {
+        **admin.site.each_context(request),
+        "title": "Conversation analytics",
+        "report": report,
+        "days": days,
+        "ranges": ANALYTICS_RANGES,
+        "store_id": store_id,
+        "stores": Store.objects.order_by("name").values_list("pk", "name"),
+    }
+    return TemplateResponse(request, "admin/chatbot/analytics.html", context)
+
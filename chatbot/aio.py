@@ -0,0 +1,78 @@
+"""
+Async (ASGI) deployment support.
+
+With CHAT_ASYNC=1 (ASGI servers: uvicorn / daphne / hypercorn) chatbot/urls.py
+routes the chat endpoints to the native async views (views.achatbot_response,
+views.awhatsapp_webhook): sessions via aget/aset, catalog queries via the
+async ORM. WSGI deployments keep the sync views.
+
+Measure before switching (`manage.py bench_async`): on Django 5.2 the async
+ORM and Django's own MiddlewareMixin middleware still run every call through
+sync_to_async, i.e. a thread per in-flight request plus a hop per query, so
+gunicorn gthread is faster and lighter for this engine today. The async path
+pays off once queries run on a native async driver or the engine awaits
+other slow I/O.
+
+Ye tabhi kaam karta hai jab poora middleware stack async-capable ho - a
+single sync-only middleware makes Django run everything below it in a thread
+again. Our own middleware derives from HybridMiddleware and
+AsyncWhiteNoiseMiddleware replaces whitenoise's sync-only one.
+
+Process-local caches (catalog snapshot, category summaries, store routes)
+are filled from the DB. On the event loop they never query: stale data is
+served, and (re)builds run through sync_to_async (see invalidation.acurrent,
+TenantIndex.awarm, summaries.aget_category_summary, tenancy.aget_routes).
+"""
+import asyncio
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+def on_event_loop():
+    """True when called from async code (where blocking DB access is not allowed)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class HybridMiddleware:
+    """
+    Middleware that runs natively under WSGI and ASGI. Subclasses implement
+    handle(request) and async ahandle(request); Django picks the mode from
+    the rest of the stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.ahandle(request)
+        return self.handle(request)
+
+
+class AsyncWhiteNoiseMiddleware(HybridMiddleware, WhiteNoiseMiddleware):
+    """whitenoise's middleware (same settings, same serving), usable without a thread hop under ASGI."""
+
+    def __init__(self, get_response=None):
+        WhiteNoiseMiddleware.__init__(self, get_response)
+        HybridMiddleware.__init__(self, get_response)
+
+    def handle(self, request):
+        return WhiteNoiseMiddleware.__call__(self, request)
+
+    async def ahandle(self, request):
+        if self.autorefresh:  # DEBUG: scans the filesystem
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
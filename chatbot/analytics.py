@@ -0,0 +1,251 @@
+"""
+Daily conversation analytics.
+
+Request path pe sirf in-memory Counter increments hote hain:
+
+    (day, store, "intent", "price_filter") += 1
+
+Every FLUSH_INTERVAL seconds the request that finishes next (request_finished
+signal, after the response is sent) swaps the counters out and writes them to
+DailyRollup with one upsert-increment per batch:
+
+    INSERT ... ON CONFLICT (day, store_key, metric, key)
+    DO UPDATE SET count = count + excluded.count
+
+so the admin dashboard (/admin/chatbot/analytics/) reads a few hundred rollup
+rows instead of GROUP BY over the raw tables. A worker that dies loses at
+most one interval of counts.
+
+Metrics (key in brackets): messages, intent [name] (fallback rate = intent
+"fallback" / messages), stage [detect_intent stage], cart_add [product],
+lead, quotation [product]. Historical leads/quotations:
+`manage.py backfill_rollups`.
+
+Settings (settings.CHAT_ANALYTICS): ENABLED, FLUSH_INTERVAL.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+MESSAGES, INTENT, STAGE, CART_ADD, LEAD, QUOTATION = "messages", "intent", "stage", "cart_add", "lead", "quotation"
+KEY_LENGTH = 100
+UPSERT_BATCH = 100
+
+_lock = threading.Lock()
+_counts = Counter()     # (day, store id or 0, metric, key) -> n
+_flush_lock = threading.Lock()
+_flushed_at = time.monotonic()
+
+
+def _conf():
+    return getattr(settings, "CHAT_ANALYTICS", {})
+
+
+# --- Request path ---
+def incr(metric, key="", store_id=None, n=1, day=None):
+    if not _conf().get("ENABLED", True):
+        return
+    item = (day or timezone.localdate(), store_id or 0, metric, str(key or "")[:KEY_LENGTH])
+    with _lock:
+        _counts[item] += n
+
+
+def record_message(request, intent, stage):
+    if not _conf().get("ENABLED", True) or getattr(request, "chat_replay", False):
+        return
+    store = getattr(request, "store", None)
+    day, store_id = timezone.localdate(), store.pk if store else 0
+    with _lock:
+        _counts[(day, store_id, MESSAGES, "")] += 1
+        _counts[(day, store_id, INTENT, intent)] += 1
+        _counts[(day, store_id, STAGE, stage)] += 1
+
+
+def record_cart_add(request, product_name, store_id=None):
+    if not getattr(request, "chat_replay", False):
+        incr(CART_ADD, product_name, store_id)
+
+
+def pending():
+    with _lock:
+        return Counter(_counts)
+
+
+def reset():
+    with _lock:
+        _counts.clear()
+
+
+def discard_pending(names, since=None, until=None):
+    """Drop unflushed counts of the `names` metrics for days in [since, until]; returns how many were dropped."""
+    with _lock:
+        stale = [item for item in _counts
+                 if item[2] in names and (since is None or item[0] >= since) and (until is None or item[0] <= until)]
+        for item in stale:
+            del _counts[item]
+    return len(stale)
+
+
+# --- Flushing ---
+def maybe_flush(**kwargs):
+    """request_finished receiver: flush if FLUSH_INTERVAL has passed (one thread at a time)."""
+    global _flushed_at
+    if time.monotonic() - _flushed_at < _conf().get("FLUSH_INTERVAL", 10):
+        return
+    if not _flush_lock.acquire(blocking=False):
+        return
+    try:
+        _flushed_at = time.monotonic()
+        flush()
+    except Exception:
+        logger.exception("analytics flush failed, counts kept for the next one")
+    finally:
+        _flush_lock.release()
+
+
+def flush():
+    """Write pending counters to DailyRollup. Returns rows upserted; on error the counts are put back."""
+    global _counts
+    with _lock:
+        counts, _counts = _counts, Counter()
+    if not counts:
+        return 0
+    try:
+        upsert(counts)
+    except Exception:
+        with _lock:
+            _counts.update(counts)
+        metrics.incr("analytics.flush_errors")
+        raise
+    metrics.incr("analytics.rows_flushed", len(counts))
+    return len(counts)
+
+
+def upsert(counts):
+    """Add `counts` {(day, store, metric, key): n} onto the rollup rows."""
+    from .models import DailyRollup
+
+    items = sorted(counts.items())  # fixed order: concurrent flushes lock rows the same way
+    with transaction.atomic():
+        if connection.vendor in ("postgresql", "sqlite"):
+            for start in range(0, len(items), UPSERT_BATCH):
+                _upsert_batch(DailyRollup, items[start:start + UPSERT_BATCH])
+            return
+        for (day, store_id, metric, key), n in items:  # other backends: update, else insert
+            row = DailyRollup.objects.filter(day=day, store_key=store_id, metric=metric, key=key)
+            if not row.update(count=F("count") + n):
+                DailyRollup.objects.create(day=day, store_key=store_id, metric=metric, key=key, count=n)
+
+
+def _upsert_batch(model, items):
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    columns = ", ".join(qn(c) for c in ("day", "store_key", "metric", "key", "count"))
+    unique = ", ".join(qn(c) for c in ("day", "store_key", "metric", "key"))
+    params = []
+    for (day, store_id, metric, key), n in items:
+        params += [connection.ops.adapt_datefield_value(day), store_id, metric, key, n]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(items))} "
+            f"ON CONFLICT ({unique}) DO UPDATE SET {qn('count')} = {table}.{qn('count')} + excluded.{qn('count')}",
+            params,
+        )
+
+
+# --- Backfill from the raw tables ---
+def backfill(since=None, until=None):
+    """
+    Recompute the lead / quotation rollups for [since, until] from Lead and
+    QuotationRequest, replacing what is stored for those days (re-runs are
+    idempotent). Returns {metric: rows written}.
+
+    This process's unflushed lead / quotation counts for those days are
+    dropped in the same operation (the raw rows already include them), so
+    a later flush doesn't add them on top. Other workers' counters can't be
+    reached: don't backfill days that are still being counted live (today,
+    or yesterday until every worker has flushed) - the command defaults to
+    ending yesterday.
+    """
+    from django.db.models import Count
+    from django.db.models.functions import TruncDate
+
+    from .models import DailyRollup, Lead, QuotationRequest
+
+    sources = [
+        (LEAD, Lead.objects.all(), None),
+        (QUOTATION, QuotationRequest.objects.all(), "product__name"),
+    ]
+    written = {}
+    with transaction.atomic():
+        discard_pending({LEAD, QUOTATION}, since, until)
+        for metric, qs, key_field in sources:
+            if since:
+                qs = qs.filter(created_at__date__gte=since)
+            if until:
+                qs = qs.filter(created_at__date__lte=until)
+            fields = ["day", "store"] + ([key_field] if key_field else [])
+            grouped = qs.annotate(day=TruncDate("created_at")).values(*fields).annotate(n=Count("id")).order_by()
+            rows = [
+                DailyRollup(day=g["day"], store_key=g["store"] or 0, metric=metric,
+                            key=(g[key_field] or "")[:KEY_LENGTH] if key_field else "", count=g["n"])
+                for g in grouped
+            ]
+            stale = DailyRollup.objects.filter(metric=metric)
+            if since:
+                stale = stale.filter(day__gte=since)
+            if until:
+                stale = stale.filter(day__lte=until)
+            stale.delete()
+            DailyRollup.objects.bulk_create(rows, batch_size=500)
+            written[metric] = len(rows)
+    return written
+
+
+# --- Dashboard data (rollups only) ---
+def report(start, end, store_id=None):
+    """Totals and per-day rows between two dates (inclusive) from DailyRollup."""
+    from django.db.models import Sum
+
+    from .models import DailyRollup
+
+    rows = DailyRollup.objects.filter(day__range=(start, end))
+    if store_id is not None:
+        rows = rows.filter(store_key=store_id)
+    days, totals = {}, {}
+    for day, metric, key, n in rows.values_list("day", "metric", "key").annotate(n=Sum("count")).order_by():
+        days.setdefault(day, Counter())[(metric, key)] += n
+        totals.setdefault(metric, Counter())[key] += n
+
+    per_day = []
+    for day in sorted(days, reverse=True):
+        c = days[day]
+        messages, fallback = c[(MESSAGES, "")], c[(INTENT, "fallback")]
+        per_day.append({
+            "day": day, "messages": messages, "fallback": fallback,
+            "fallback_rate": fallback * 100 / messages if messages else 0,
+            "leads": c[(LEAD, "")], "quotations": sum(n for (m, _), n in c.items() if m == QUOTATION),
+            "conversion": c[(LEAD, "")] * 100 / messages if messages else 0,
+        })
+    messages = sum(totals.get(MESSAGES, {}).values())
+    return {
+        "days": per_day,
+        "messages": messages,
+        "fallback_rate": totals.get(INTENT, {}).get("fallback", 0) * 100 / messages if messages else 0,
+        "leads": sum(totals.get(LEAD, {}).values()),
+        "quotations": sum(totals.get(QUOTATION, {}).values()),
+        "intents": Counter(totals.get(INTENT, {})).most_common(),
+        "stages": Counter(totals.get(STAGE, {})).most_common(),
+        "cart_adds": Counter(totals.get(CART_ADD, {})).most_common(10),
+        "quoted_products": Counter(totals.get(QUOTATION, {})).most_common(10),
+    }
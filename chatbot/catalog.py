@@ -0,0 +1,135 @@
+"""
+In-memory catalog snapshot for price / category questions.
+
+Catalog bahut kam change hota hai, so instead of hitting the DB for every
+"rings under 2000" we keep an immutable snapshot as parallel NumPy arrays
+(ids, prices, category codes) and answer with vectorized masks +
+argpartition. Snapshot is rebuilt (and swapped atomically) whenever the
+catalog version changes on any worker.
+"""
+from collections import namedtuple
+
+
+CatalogItem = namedtuple(
+    "CatalogItem", ["id", "name", "price", "category", "best_seller", "image", "description"]
+)
+
+
+class CatalogSnapshot:
+    """Immutable, array-backed view of the product table."""
+
+    def __init__(self, items, version=0):
+        import numpy as np  # only snapshot users pay for numpy, not every worker at startup
+
+        self.version = version
+        self.items = tuple(items)
+
+        categories = {}
+        by_name = {}
+        codes = np.empty(len(self.items), dtype=np.int32)
+        for i, item in enumerate(self.items):
+            key = (item.category or "").lower()
+            codes[i] = categories.setdefault(key, len(categories))
+            by_name.setdefault(" ".join(item.name.lower().split()), item)
+
+        self.category_codes = codes
+        self.category_index = categories  # lowercased category -> code
+        self.by_name = by_name  # lowercased product name -> first item (typeahead picks, see views._intent_for)
+        self.ids = np.fromiter((item.id for item in self.items), dtype=np.int64, count=len(self.items))
+        self.prices = np.fromiter(
+            (float(item.price or 0) for item in self.items), dtype=np.float64, count=len(self.items)
+        )
+
+    @classmethod
+    def from_db(cls, version=0, store=None):
+        from .models import Product
+        from .routers import use_primary
+
+        with use_primary():  # cached under `version`: never snapshot a lagging replica
+            rows = Product.objects.for_store(store).order_by("id").values_list(
+                "id", "name", "price", "category", "best_seller", "image", "description"
+            )
+            storage = Product._meta.get_field("image").storage
+            items = [
+                CatalogItem(pk, name, price, category, best_seller,
+                            storage.url(image) if image else "", description)
+                for pk, name, price, category, best_seller, image, description in rows.iterator(chunk_size=5000)
+            ]
+        return cls(items, version)
+
+    def __len__(self):
+        return len(self.items)
+
+    # --- Masks ---
+    def mask(self, category=None, max_price=None, min_price=None):
+        import numpy as np
+
+        mask = np.ones(len(self.items), dtype=bool)
+        if category is not None:
+            code = self.category_index.get(category.lower())
+            if code is None:
+                return np.zeros(len(self.items), dtype=bool)
+            mask &= self.category_codes == code
+        if max_price is not None:
+            mask &= self.prices <= max_price
+        if min_price is not None:
+            mask &= self.prices >= min_price
+        return mask
+
+    def top_k(self, mask, k=5, descending=False):
+        """k cheapest (or most expensive) items under mask, sorted by price then id."""
+        import numpy as np
+
+        idx = np.flatnonzero(mask)
+        if k <= 0 or idx.size == 0:
+            return []
+        keys = -self.prices[idx] if descending else self.prices[idx]
+        if idx.size > k:
+            part = np.argpartition(keys, k - 1)[:k]
+            idx, keys = idx[part], keys[part]
+        order = np.lexsort((self.ids[idx], keys))
+        return [self.items[i] for i in idx[order]]
+
+    def named(self, text):
+        """Item whose name is exactly `text` (case/space-insensitive), else None."""
+        return self.by_name.get(" ".join(text.lower().split()))
+
+    # --- Questions ---
+    def under(self, limit, category=None, k=5):
+        return self.top_k(self.mask(category, max_price=limit), k)
+
+    def above(self, limit, category=None, k=5):
+        return self.top_k(self.mask(category, min_price=limit), k)
+
+    def cheapest(self, category=None, k=5):
+        return self.top_k(self.mask(category), k)
+
+    def most_expensive(self, category=None, k=5):
+        return self.top_k(self.mask(category), k, descending=True)
+
+
+# --- Versioning ---
+# Snapshots live on each store's TenantIndex (see tenancy.py). The version is
+# shared by all workers through invalidation.py, so an admin edit on one
+# worker makes every worker rebuild (in the background) and swap.
+CATALOG = "catalog"
+
+
+def catalog_version():
+    from .invalidation import current
+    return current(CATALOG)
+
+
+async def acatalog_version():
+    from .invalidation import acurrent
+    return await acurrent(CATALOG)
+
+
+def bump_catalog_version():
+    from .invalidation import bump
+    return bump(CATALOG)
+
+
+def get_snapshot(store=None):
+    from .tenancy import get_tenant_index
+    return get_tenant_index(store).snapshot()
@@ -0,0 +1,28 @@
+# --- Reply formatting per channel ---
+# web widget renders HTML (<br>), WhatsApp shows plain text with newlines
+
+CART_HINT = "💬 Type 'add <product>' to add to cart, or 'I'm interested' to request a callback."
+
+
+def price_text(price):
+    return f"₹{price}" if price else "Price NA"
+
+
+def format_products_list(products, header="🔎 Matching items:"):
+    reply = header + "<br>"
+    for p in products:
+        reply += f"- {p.name} ({price_text(p.price)})<br>"
+    reply += "<br>" + CART_HINT
+    return reply
+
+
+def format_products_text(products, header="🔎 Matching items:"):
+    lines = [header]
+    lines += [f"- {p.name} ({price_text(p.price)})" for p in products]
+    return "\n".join(lines) + "\n\n" + CART_HINT
+
+
+FORMATTERS = {
+    "web": format_products_list,
+    "whatsapp": format_products_text,
+}
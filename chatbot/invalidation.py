@@ -0,0 +1,190 @@
+"""
+Cross-worker cache invalidation bus.
+
+Process-local caches (catalog snapshots, category summaries, tenant indexes)
+go stale on the other gunicorn workers / nodes when an admin edits a Product.
+So every cache family has a monotonically increasing version in the
+CacheVersion table:
+
+    bump("catalog")     -> UPDATE ... SET version = version + 1 RETURNING version
+                           (one row; seen locally / notified on commit)
+    current("catalog")  -> per-worker cached value, re-read from the DB at
+                           most once per CHECK_INTERVAL_MS (all names, 1 query;
+                           acurrent() does the same from async code)
+
+When a worker sees a version move that it didn't cause, subscribers of that
+name run in a background thread (rebuild + atomic swap) while requests keep
+being served from the old copy. On Postgres an optional LISTEN/NOTIFY
+listener pushes changes so workers don't wait for the next poll.
+
+Settings (settings.CACHE_INVALIDATION): CHECK_INTERVAL_MS, LISTEN.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .aio import on_event_loop
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "chatbot_cache_versions"
+
+_lock = threading.Lock()
+_versions = {}        # name -> version seen by this worker
+_checked_at = 0.0     # monotonic time of the last DB read
+_subscribers = {}     # name -> [callback]
+_listener = None
+
+
+def _conf():
+    return getattr(settings, "CACHE_INVALIDATION", {})
+
+
+def subscribe(name, callback):
+    _subscribers.setdefault(name, []).append(callback)
+
+
+def _run_subscribers(name):
+    for callback in _subscribers.get(name, ()):
+        def run(callback=callback):
+            try:
+                callback()
+            except Exception:
+                logger.exception("cache rebuild for %s failed", name)
+            finally:
+                connection.close()  # thread ka apna DB connection
+        threading.Thread(target=run, name=f"rebuild-{name}", daemon=True).start()
+
+
+def _read_versions():
+    from .models import CacheVersion
+    return dict(CacheVersion.objects.values_list("name", "version"))
+
+
+def refresh():
+    """Re-read all versions now; fire subscribers for names changed elsewhere."""
+    _apply(_read_versions())
+
+
+async def arefresh():
+    from .models import CacheVersion
+    _apply({name: version async for name, version in CacheVersion.objects.values_list("name", "version")})
+
+
+def _apply(latest):
+    global _checked_at
+    with _lock:
+        changed = [name for name, version in latest.items() if _versions.get(name, version) != version]
+        _versions.update(latest)
+        _checked_at = time.monotonic()
+    for name in changed:
+        _run_subscribers(name)
+
+
+def _due():
+    return time.monotonic() - _checked_at >= _conf().get("CHECK_INTERVAL_MS", 500) / 1000
+
+
+def current(name):
+    _ensure_listener()
+    # event loop pe DB query nahi: async requests re-read through acurrent()
+    if _due() and not on_event_loop():
+        refresh()
+    return _versions.get(name, 0)
+
+
+async def acurrent(name):
+    """current() for async code; the periodic re-read uses the async ORM."""
+    _ensure_listener()
+    if _due():
+        await arefresh()
+    return _versions.get(name, 0)
+
+
+def bump(name):
+    """
+    Increment `name` for every worker; returns the new version. Inside a
+    transaction the change (and this worker's copy of it) only takes effect
+    on commit: a rollback leaves every worker where it was, and nothing
+    rebuilds from rows that aren't committed yet under the new version.
+    """
+    from .models import CacheVersion
+
+    if connection.vendor in ("postgresql", "sqlite") and connection.features.can_return_columns_from_insert:
+        version = _bump_returning(CacheVersion, name)
+    else:  # other backends: lock the row, then increment
+        with transaction.atomic():
+            row, _ = CacheVersion.objects.select_for_update().get_or_create(name=name)
+            row.version = version = row.version + 1
+            row.save(update_fields=["version", "updated_at"])
+    transaction.on_commit(lambda: _committed(name, version))
+    return version
+
+
+def _bump_returning(model, name):
+    """One statement: concurrent bumps never read back the same version."""
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({qn('name')}, {qn('version')}, {qn('updated_at')}) VALUES (%s, 1, %s) "
+            f"ON CONFLICT ({qn('name')}) DO UPDATE SET {qn('version')} = {table}.{qn('version')} + 1, "
+            f"{qn('updated_at')} = excluded.{qn('updated_at')} RETURNING {qn('version')}",
+            [name, connection.ops.adapt_datetimefield_value(timezone.now())],
+        )
+        return cursor.fetchone()[0]
+
+
+def _committed(name, version):
+    with _lock:
+        _versions[name] = version  # local change: no background rebuild needed
+    if connection.vendor == "postgresql":
+        _notify(name)
+
+
+def _notify(name):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, name])
+
+
+def force_check():
+    global _checked_at
+    _checked_at = 0.0
+
+
+# --- Postgres LISTEN/NOTIFY push (optional, psycopg 3) ---
+def _ensure_listener():
+    global _listener
+    if _listener is not None or not _conf().get("LISTEN") or connection.vendor != "postgresql":
+        return
+    with _lock:
+        if _listener is None:
+            _listener = threading.Thread(target=_listen_forever, name="cache-version-listener", daemon=True)
+            _listener.start()
+
+
+def _listen_forever():
+    try:
+        import psycopg
+    except ImportError:
+        logger.warning("CACHE_INVALIDATION LISTEN needs psycopg 3; falling back to polling")
+        return
+    params = connection.get_connection_params()
+    params.pop("cursor_factory", None)
+    params.pop("context", None)
+    backoff = 1
+    while True:
+        try:
+            with psycopg.connect(**params, autocommit=True) as conn:
+                conn.execute(f"LISTEN {CHANNEL}")
+                backoff = 1
+                for _ in conn.notifies():
+                    refresh()  # re-read versions + start background rebuilds right away
+        except Exception:
+            logger.exception("cache version listener disconnected, retrying in %ss", backoff)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60)
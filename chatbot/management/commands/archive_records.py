@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from chatbot import partitions
+
+
+class Command(BaseCommand):
+    help = ("Export Lead/QuotationRequest months older than the retention window to gzip CSV "
+            "files, then drop those partitions (Postgres) or delete the rows in batches.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retention-months", type=int, help="default: DATA_RETENTION['MONTHS']")
+        parser.add_argument("--dir", help="default: DATA_RETENTION['ARCHIVE_DIR']")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        done = partitions.archive_months(options["retention_months"], options["dir"], dry_run=options["dry_run"])
+        for table, month, rows, path in done:
+            verb = "would archive" if options["dry_run"] else "archived"
+            self.stdout.write(f"{verb} {table} {month}: {rows} rows -> {path}")
+        if not done:
+            self.stdout.write("nothing older than the retention window")
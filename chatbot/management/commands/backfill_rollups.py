@@ -0,0 +1,28 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from chatbot import analytics
+
+
+class Command(BaseCommand):
+    help = ("Rebuild the daily lead / quotation rollups (conversion analytics) from Lead and "
+            "QuotationRequest. Existing rollups for those days are replaced, so it is safe to re-run.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="YYYY-MM-DD, default: oldest record")
+        parser.add_argument("--until", help="YYYY-MM-DD, default: yesterday (today is being counted live)")
+
+    def handle(self, *args, **options):
+        try:
+            since = date.fromisoformat(options["since"]) if options["since"] else None
+            until = date.fromisoformat(options["until"]) if options["until"] else timezone.localdate() - timedelta(days=1)
+        except ValueError as e:
+            raise CommandError(f"Bad date: {e}")
+        if until >= timezone.localdate():
+            self.stderr.write("warning: today is still counted live; other workers' unflushed lead/quotation "
+                              "counts will be added on top of the backfill")
+        written = analytics.backfill(since, until)
+        self.stdout.write(" ".join(f"{metric}_rows={n}" for metric, n in written.items())
+                          + f" since={since or 'start'} until={until}")
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from io import BytesIO
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+
+from chatbot.metrics import percentile
+
+MODES = ["wsgi", "asgi-sync", "asgi-async"]
+CONVERSATION = ["hi", "show me rings", "rings under 2000", "price for 20 rings", "add silver ring",
+                "view cart", "suggest best selling items", "light oxidised jhumka for daily wear"]
+
+
+def _cookie_header(cookies):
+    return "; ".join(f"{k}={v}" for k, v in cookies.items())
+
+
+def _remember(cookies, set_cookies):
+    for header in set_cookies:
+        for name, morsel in SimpleCookie(header).items():
+            cookies[name] = morsel.value
+
+
+# --- Minimal in-process servers (no sockets: only the Django side is measured) ---
+def wsgi_get(app, path, params, cookies):
+    environ = {
+        "REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": urlencode(params),
+        "SERVER_NAME": "testserver", "SERVER_PORT": "80", "SERVER_PROTOCOL": "HTTP/1.1",
+        "REMOTE_ADDR": "127.0.0.1", "HTTP_HOST": "testserver", "HTTP_COOKIE": _cookie_header(cookies),
+        "wsgi.url_scheme": "http", "wsgi.input": BytesIO(), "wsgi.errors": sys.stderr,
+    }
+    started = []
+    response = app(environ, lambda status, headers, exc_info=None: started.append((status, headers)))
+    try:
+        b"".join(response)
+    finally:
+        response.close()  # request_finished -> DB connection handling, as under gunicorn
+    status, headers = started[0]
+    _remember(cookies, [v for k, v in headers if k.lower() == "set-cookie"])
+    return int(status.split()[0])
+
+
+async def asgi_get(app, path, params, cookies):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": urlencode(params).encode(),
+        "headers": [(b"host", b"testserver"), (b"cookie", _cookie_header(cookies).encode())],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+    body_sent = False
+    done = asyncio.Event()
+    messages = []
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    done.set()
+    start = messages[0]
+    _remember(cookies, [v.decode("latin-1") for k, v in start["headers"] if k.lower() == b"set-cookie"])
+    return start["status"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrency benchmark: N simulated chat users against a thread-pool deployment (WSGI, "
+        "sync views), ASGI with the sync views and ASGI with the async views. Each mode runs in its own process; "
+        "reports throughput, latency, peak threads and RSS growth. Uses the configured database "
+        "(sessions are written like in production)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=500)
+        parser.add_argument("--messages", type=int, default=len(CONVERSATION), help="messages per user")
+        parser.add_argument("--threads", type=int, default=32, help="thread mode: worker threads (gthread)")
+        parser.add_argument("--think-ms", type=float, default=200.0, help="pause between a user's messages")
+        parser.add_argument("--db-latency-ms", type=float, default=2.0,
+                            help="added to every query (network round trip to Postgres)")
+        parser.add_argument("--mode", choices=["all", *MODES], default="all")
+        parser.add_argument("--child", action="store_true", help="internal: run one mode in this process, print JSON")
+
+    def handle(self, *args, **options):
+        if options["child"]:
+            self.stdout.write(json.dumps(self.run(options)))
+            return
+        modes = MODES if options["mode"] == "all" else [options["mode"]]
+        for mode in modes:
+            result = self.spawn(mode, options)
+            self.stdout.write(
+                f"mode={mode:<10} users={options['users']} requests={result['requests']} errors={result['errors']} "
+                f"elapsed={result['elapsed']:.2f}s throughput={result['throughput']:.0f} req/s"
+            )
+            self.stdout.write(
+                f"           latency_ms p50={result['p50']:.1f} p95={result['p95']:.1f} p99={result['p99']:.1f} "
+                f"peak_threads={result['peak_threads']} rss_growth={result['rss_growth_mb']:.1f} MiB "
+                f"peak_rss={result['peak_rss_mb']:.1f} MiB"
+            )
+
+    def spawn(self, mode, options):
+        argv = [sys.executable, os.path.join(settings.BASE_DIR, "manage.py"), "bench_async", "--child",
+                "--mode", mode]
+        for name in ("users", "messages", "threads", "think_ms", "db_latency_ms"):
+            argv += [f"--{name.replace('_', '-')}", str(options[name])]
+        env = dict(os.environ, CHAT_ASYNC="1" if mode == "asgi-async" else "0")
+        proc = subprocess.run(argv, env=env, capture_output=True, text=True)
+        if proc.returncode:
+            raise CommandError(proc.stderr[-2000:])
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+
+    # --- child process ---
+    def run(self, options):
+        if (options["mode"] == "asgi-async") != settings.CHAT_ASYNC:
+            raise CommandError("CHAT_ASYNC must match the mode (set by the parent process)")
+        latency = options["db_latency_ms"] / 1000
+
+        def slow_query(execute, sql, params, many, context):
+            time.sleep(latency)  # blocking driver wait, like psycopg over the network
+            return execute(sql, params, many, context)
+
+        def on_connect(sender, connection, **kwargs):
+            if latency:
+                connection.execute_wrappers.append(slow_query)
+
+        connection_created.connect(on_connect, weak=False)
+        overrides = override_settings(
+            DEBUG=False, ALLOWED_HOSTS=["*"],
+            CHAT_RATE_LIMIT={**settings.CHAT_RATE_LIMIT, "ENABLED": False},  # all users share one IP
+            CHAT_TRANSCRIPTS={**settings.CHAT_TRANSCRIPTS, "ENABLED": False},
+            CHAT_PROFILING={**settings.CHAT_PROFILING, "ENABLED": False},
+        )
+        with overrides:
+            return asyncio.run(self.simulate(options))
+
+    async def simulate(self, options):
+        from django.core.handlers.asgi import ASGIHandler
+        from django.core.handlers.wsgi import WSGIHandler
+
+        mode = options["mode"]
+        messages = [CONVERSATION[i % len(CONVERSATION)] for i in range(options["messages"])]
+        think = options["think_ms"] / 1000
+        loop = asyncio.get_running_loop()
+
+        if mode == "wsgi":
+            app, pool = WSGIHandler(), ThreadPoolExecutor(options["threads"], thread_name_prefix="gthread")
+
+            def get(path, params, cookies):
+                return loop.run_in_executor(pool, wsgi_get, app, path, params, cookies)
+        else:
+            app = ASGIHandler()
+
+            def get(path, params, cookies):
+                return asgi_get(app, path, params, cookies)
+
+        await get("/get-response/", {"msg": "show me rings"}, {})  # warm caches (snapshot, summaries, speller)
+
+        latencies, errors = [], [0]
+
+        async def user(n):
+            cookies = {}
+            await asyncio.sleep(think * n / options["users"])  # staggered arrivals
+            for msg in messages:
+                started = time.perf_counter()
+                try:
+                    status = await get("/get-response/", {"msg": msg}, cookies)
+                except Exception:
+                    status = None
+                latencies.append(time.perf_counter() - started)
+                if status != 200:
+                    errors[0] += 1
+                await asyncio.sleep(think)
+
+        peak_threads = [threading.active_count()]
+        stop = threading.Event()
+
+        def watch_threads():
+            while not stop.wait(0.01):
+                peak_threads[0] = max(peak_threads[0], threading.active_count())
+
+        watcher = threading.Thread(target=watch_threads, daemon=True)
+        watcher.start()
+        rss_before = _rss_mb()
+        started = time.perf_counter()
+        await asyncio.gather(*(user(n) for n in range(options["users"])))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        watcher.join()
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+        return {
+            "requests": len(latencies), "errors": errors[0], "elapsed": elapsed,
+            "throughput": len(latencies) / elapsed if elapsed else 0,
+            "p50": percentile(latencies, 50) * 1000, "p95": percentile(latencies, 95) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "peak_threads": peak_threads[0] - 1,  # minus the watcher
+            "rss_growth_mb": max(0.0, peak_rss - rss_before), "peak_rss_mb": peak_rss,
+        }
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
@@ -0,0 +1,57 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from chatbot.catalog import CatalogItem, CatalogSnapshot
+
+CATEGORIES = ["Rings", "Bangles", "Necklaces", "Chains", "Earrings", "Anklets"]
+
+
+def synthetic_items(n, seed=7):
+    rnd = random.Random(seed)
+    return [
+        CatalogItem(i, f"Product {i}", Decimal(rnd.randrange(200, 50000)), rnd.choice(CATEGORIES),
+                    rnd.random() < 0.05, "", "")
+        for i in range(1, n + 1)
+    ]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+class Command(BaseCommand):
+    help = "Benchmark the array-backed catalog snapshot (synthetic catalog, no DB)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10000,100000,1000000")
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        for size in [int(s) for s in options["sizes"].split(",")]:
+            items = synthetic_items(size)
+            start = time.perf_counter()
+            snapshot = CatalogSnapshot(items)
+            build_ms = (time.perf_counter() - start) * 1000
+
+            # baseline: jo ORM query karta tha uska pure-Python equivalent (full scan + sort)
+            def scan_under():
+                return sorted((p for p in items if p.category == "Rings" and p.price <= 2000),
+                              key=lambda p: (p.price, p.id))[:5]
+
+            results = {
+                "rings_under_2000": timed(lambda: snapshot.under(2000, "Rings"), repeat),
+                "above_40000": timed(lambda: snapshot.above(40000), repeat),
+                "cheapest": timed(lambda: snapshot.cheapest(), repeat),
+                "most_expensive_rings": timed(lambda: snapshot.most_expensive("Rings"), repeat),
+                "python_scan_baseline": timed(scan_under, max(1, repeat // 10)),
+            }
+            self.stdout.write(f"products={size} build={build_ms:.1f}ms")
+            for name, ms in results.items():
+                self.stdout.write(f"  {name:<22} {ms:8.3f} ms/query")
@@ -0,0 +1,58 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from chatbot import pricing
+from chatbot.models import Product
+
+CATEGORIES = ["Rings", "Bangles", "Necklaces", "Chains", "Earrings", "Anklets"]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Benchmark repricing on the configured database: set-based pricing.reprice() over N synthetic "
+            "products vs the per-row save() an admin list_editable edit does (measured on a sample, "
+            "extrapolated). Everything runs in a transaction that is rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100000)
+        parser.add_argument("--row-sample", type=int, default=1000, help="rows saved one by one for the baseline")
+        parser.add_argument("--rate", default="92.50")
+
+    def handle(self, *args, **options):
+        n, rate = options["products"], pricing.parse_rate(options["rate"])
+        rnd = random.Random(7)
+        try:
+            with transaction.atomic():
+                start = time.perf_counter()
+                Product.objects.bulk_create(
+                    (Product(name=f"Bench {i}", category=rnd.choice(CATEGORIES), price=0,
+                             weight_grams=Decimal(rnd.randrange(2000, 80000)) / 1000,
+                             making_charge=Decimal(rnd.randrange(50, 1500)))
+                     for i in range(n)),
+                    batch_size=2000,
+                )
+                self.stdout.write(f"products={n} insert={time.perf_counter() - start:.2f}s")
+
+                updated, elapsed = pricing.reprice(rate)
+                self.stdout.write(f"  set_based_all       rows={updated:<7} {elapsed * 1000:9.1f} ms")
+                updated, elapsed = pricing.reprice(rate, category="Rings")
+                self.stdout.write(f"  set_based_category  rows={updated:<7} {elapsed * 1000:9.1f} ms")
+
+                sample = list(Product.objects.filter(name__startswith="Bench ")[:options["row_sample"]])
+                start = time.perf_counter()
+                for product in sample:  # what list_editable does: save() -> post_save -> version bump
+                    product.price = (product.weight_grams * rate + product.making_charge).quantize(Decimal("0.01"))
+                    product.save(update_fields=["price"])
+                per_row = (time.perf_counter() - start) / max(1, len(sample))
+                self.stdout.write(f"  per_row_save        rows={len(sample):<7} {per_row * 1000:9.3f} ms/row "
+                                  f"-> ~{per_row * n:.1f} s for {n}")
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,55 @@
+import random
+import tempfile
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from chatbot.metrics import percentile
+from chatbot.semantic import SemanticIndex, embed, product_text
+
+STYLES = ["oxidised", "antique", "temple", "minimal", "bridal", "kundan", "filigree", "plain", "ghungroo", "stone"]
+ITEMS = [("Jhumka", "Earrings"), ("Studs", "Earrings"), ("Kada", "Bangles"), ("Payal", "Anklets"),
+         ("Toe Ring", "Rings"), ("Band", "Rings"), ("Choker", "Necklaces"), ("Rope Chain", "Chains")]
+USES = ["daily wear", "weddings", "office", "gifting", "kids", "festivals", "men", "parties"]
+
+
+class Command(BaseCommand):
+    help = "Benchmark semantic search build time, query latency and recall@1 vs brute force (synthetic catalog)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100000)
+        parser.add_argument("--queries", type=int, default=300)
+        parser.add_argument("--nprobe", type=int, default=8)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(1)
+        rows = []
+        for pk in range(1, options["products"] + 1):
+            style, (item, category), use = rnd.choice(STYLES), rnd.choice(ITEMS), rnd.choice(USES)
+            name = f"{style.title()} {item} {pk}"
+            rows.append((pk, product_text(name, category, f"{rnd.choice(STYLES)} silver {item.lower()} for {use}")))
+
+        start = time.perf_counter()
+        index = SemanticIndex.build(rows)
+        build_s = time.perf_counter() - start
+        with tempfile.TemporaryDirectory() as tmp:
+            index.save(tmp)
+            index = SemanticIndex.load(tmp)  # memory-mapped, like production
+
+            queries = [f"{rnd.choice(STYLES)} {rnd.choice(ITEMS)[0].lower()} for {rnd.choice(USES)}"
+                       for _ in range(options["queries"])]
+            latencies, agree = [], 0
+            vectors = np.asarray(index.vectors)
+            for q in queries:
+                t = time.perf_counter()
+                hits = index.search(q, k=1, nprobe=options["nprobe"])
+                latencies.append(time.perf_counter() - t)
+                exact = int(index.ids[np.argmax(vectors @ embed(q))])
+                agree += bool(hits) and hits[0][0] == exact
+
+        self.stdout.write(f"products={len(rows)} lists={len(index.centroids)} build={build_s:.1f}s")
+        self.stdout.write("query_ms p50={:.2f} p99={:.2f} max={:.2f} (nprobe={})".format(
+            percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000,
+            max(latencies) * 1000, options["nprobe"]))
+        self.stdout.write(f"recall@1 vs brute force={agree / len(queries):.2%}")
@@ -0,0 +1,117 @@
+import random
+import string
+import time
+from difflib import get_close_matches
+
+from django.core.management.base import BaseCommand
+
+from chatbot.catalog import CatalogItem, CatalogSnapshot
+from chatbot.metrics import percentile
+from chatbot.spelling import SpellCorrector
+from chatbot.tenancy import TenantIndex, load_intents_file
+from chatbot.views import detect_intent_stage
+
+NAME_WORDS = ["oxidised", "silver", "temple", "kundan", "filigree", "jhumka", "chandbali", "kada", "payal",
+              "pendant", "charm", "twisted", "antique", "floral", "peacock", "ghungroo", "meenakari", "choker",
+              "solitaire", "toe", "ring", "bangle", "necklace", "earring", "anklet", "chain"]
+REAL_TYPOS = [("neckless", "necklace"), ("bengals", "bangles"), ("earings", "earrings"),
+              ("anklet's", "anklets"), ("necklase", "necklace"), ("brangles", "bangles"), ("chian", "chain")]
+
+
+def typo(word, rnd, edits):
+    for _ in range(edits):
+        i = rnd.randrange(len(word))
+        op = rnd.choice("dist")
+        if op == "d" and len(word) > 4:
+            word = word[:i] + word[i + 1:]
+        elif op == "i":
+            word = word[:i] + rnd.choice(string.ascii_lowercase) + word[i:]
+        elif op == "s":
+            word = word[:i] + rnd.choice(string.ascii_lowercase) + word[i + 1:]
+        elif i < len(word) - 1:
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word
+
+
+def latency_ms(fn, items):
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - start)
+    return percentile(samples, 50) * 1000, percentile(samples, 99) * 1000
+
+
+class Command(BaseCommand):
+    help = ("Accuracy and speed of the symmetric-delete spelling stage vs difflib fuzzy matching "
+            "(synthetic typos, no DB).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=2000)
+        parser.add_argument("--typos", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=11)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options["seed"])
+        intents, categories = load_intents_file()
+        index = TenantIndex(None, intents, categories)
+        items = [CatalogItem(i, " ".join(rnd.sample(NAME_WORDS, 3)).title(), 1000, "Rings", False, "", "")
+                 for i in range(1, options["products"] + 1)]
+        index._snapshot = CatalogSnapshot(items, version=0)
+        index.snapshot = lambda: index._snapshot  # synthetic catalog, no version check
+
+        start = time.perf_counter()
+        speller = index.speller()
+        build_ms = (time.perf_counter() - start) * 1000
+        vocab = sorted(w for w in speller.terms if len(w) >= 5)  # words a typo may be corrected to
+
+        # --- token level ---
+        cases = list(REAL_TYPOS)
+        while len(cases) < options["typos"]:
+            word = rnd.choice(vocab)
+            wrong = typo(word, rnd, rnd.choice((1, 2)))
+            if wrong != word and wrong not in speller.counts:
+                cases.append((wrong, word))
+
+        def difflib_lookup(token):
+            match = get_close_matches(token, vocab, n=1, cutoff=0.75)
+            return match[0] if match else token
+
+        cold = SpellCorrector(list(speller.counts.elements()), terms=speller.terms)
+        rows = []
+        for name, fn in (("symspell", cold.lookup), ("symspell_memo", cold.lookup), ("difflib", difflib_lookup)):
+            sample = cases if name != "difflib" else cases[:500]
+            start = time.perf_counter()
+            hits = sum(fn(wrong) == right for wrong, right in sample)
+            elapsed = time.perf_counter() - start
+            rows.append((name, hits / len(sample), len(sample) / elapsed))
+        real = sum(speller.lookup(wrong) == right for wrong, right in REAL_TYPOS)
+
+        # --- message level: one typo per intent phrase ---
+        messages = []
+        for intent, phrases in index.intents.items():
+            for phrase in phrases:
+                words = phrase.split()
+                long_words = [i for i, w in enumerate(words) if len(w) >= 5]
+                if long_words:
+                    i = rnd.choice(long_words)
+                    words[i] = typo(words[i], rnd, 1)
+                    messages.append((" ".join(words), intent))
+
+        def accuracy(spelling):
+            return sum(detect_intent_stage(m, index, spelling=spelling)[0] == want for m, want in messages) / len(messages)
+
+        fuzzy_only = accuracy(False)
+        with_spelling = accuracy(True)
+        fuzzy_lat = latency_ms(lambda m: detect_intent_stage(m[0], index, spelling=False), messages)
+        spell_lat = latency_ms(lambda m: detect_intent_stage(m[0], index, spelling=True), messages)
+
+        self.stdout.write(f"vocabulary={len(speller)} words, delete entries={len(speller.deletes)}, "
+                          f"build={build_ms:.1f}ms")
+        for name, acc, rate in rows:
+            self.stdout.write(f"  token {name:<14} accuracy={acc:6.1%}  {rate:>10,.0f} tokens/s")
+        self.stdout.write(f"  real-world typos corrected: {real}/{len(REAL_TYPOS)}")
+        self.stdout.write(f"messages={len(messages)} (one typo each)")
+        self.stdout.write(f"  intent accuracy  fuzzy only={fuzzy_only:.1%}  spelling+fuzzy={with_spelling:.1%}")
+        self.stdout.write("  latency_ms p50/p99  fuzzy only={:.3f}/{:.3f}  spelling+fuzzy={:.3f}/{:.3f}".format(
+            *fuzzy_lat, *spell_lat))
@@ -0,0 +1,62 @@
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from chatbot.catalog import CatalogSnapshot, catalog_version
+from chatbot.management.commands.bench_catalog import synthetic_items
+from chatbot.metrics import percentile
+from chatbot.tenancy import TenantIndex, load_intents_file
+from chatbot.views import detect_intent_stage, match_category
+
+MESSAGES = ["hi", "show me rings", "rings under 2000", "bulk price for anklets", "do you ship worldwide",
+            "where is your store located", "cheapest earrings", "suggest best selling items", "add ring to cart",
+            "helo silverbott", "light oxidised jhumka for daily wear"]  # last two: fuzzy stage
+
+
+class Command(BaseCommand):
+    help = "Memory per tenant index and p99 engine latency across many stores (synthetic, no DB)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenants", type=int, default=50)
+        parser.add_argument("--products", type=int, default=2000, help="products per tenant")
+        parser.add_argument("--requests", type=int, default=20000)
+
+    def build(self, store_id, intents, categories):
+        index = TenantIndex(store_id, intents, categories, {"store": f"Store {store_id} is in Mumbai"})
+        index._snapshot = CatalogSnapshot(synthetic_items(self.products, seed=store_id), catalog_version())
+        return index
+
+    def handle(self, *args, **options):
+        self.products = options["products"]
+        intents, categories = load_intents_file()
+
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        indexes = [self.build(n, intents, categories) for n in range(options["tenants"])]
+        total = tracemalloc.get_traced_memory()[0] - base
+        # matching data only (without catalog snapshot)
+        base = tracemalloc.get_traced_memory()[0]
+        extra = [TenantIndex(n, intents, categories) for n in range(options["tenants"])]
+        matching = tracemalloc.get_traced_memory()[0] - base
+        tracemalloc.stop()
+        del extra
+
+        rnd = random.Random(3)
+        latencies = []
+        for _ in range(options["requests"]):
+            index = indexes[min(int(rnd.paretovariate(1.2)) - 1, len(indexes) - 1)]  # skewed traffic
+            msg = rnd.choice(MESSAGES)
+            start = time.perf_counter()
+            intent, _ = detect_intent_stage(msg, index)
+            if intent == "price_filter":
+                index.snapshot().under(2000, match_category(msg, index))
+            latencies.append(time.perf_counter() - start)
+
+        n = options["tenants"]
+        self.stdout.write(f"tenants={n} products/tenant={self.products}")
+        self.stdout.write(f"memory/tenant={total / n / 1024:.1f} KiB "
+                          f"(intent matching data {matching / n / 1024:.1f} KiB, phrases shared)")
+        self.stdout.write("latency_ms p50={:.3f} p99={:.3f} max={:.3f}".format(
+            percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000, max(latencies) * 1000))
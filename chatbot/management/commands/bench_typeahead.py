@@ -0,0 +1,61 @@
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from chatbot import typeahead
+from chatbot.catalog import CatalogItem
+from chatbot.metrics import percentile
+from chatbot.tenancy import load_intents_file
+
+WORDS = ["silver", "oxidised", "jhumka", "kada", "payal", "chain", "ring", "bangle", "temple", "kundan",
+         "toe", "rope", "bridal", "kids", "mens", "antique", "filigree", "meenakari", "pearl", "stud"]
+CATEGORIES = ["Rings", "Bangles", "Necklaces", "Chains", "Earrings", "Anklets"]
+
+
+def synthetic_items(n, seed=7):
+    rnd = random.Random(seed)
+    return [
+        CatalogItem(i, " ".join(rnd.sample(WORDS, 3)).title() + f" {i}", rnd.randrange(200, 50000),
+                    rnd.choice(CATEGORIES), rnd.random() < 0.05, "", "")
+        for i in range(1, n + 1)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Benchmark the typeahead radix trie (synthetic catalog + intents.yml, no DB): build, memory, lookups."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1000,10000,100000")
+        parser.add_argument("--lookups", type=int, default=20000)
+
+    def handle(self, *args, **options):
+        intents, categories = load_intents_file()
+        rnd = random.Random(11)
+        for size in [int(s) for s in options["sizes"].split(",")]:
+            items = synthetic_items(size)
+            popularity = {typeahead.normalize(item.name): rnd.randrange(50) for item in rnd.sample(items, size // 10)}
+            tracemalloc.start()
+            start = time.perf_counter()
+            trie = typeahead.build(items, categories, intents, popularity)
+            build_ms = (time.perf_counter() - start) * 1000
+            memory_mb = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+            tracemalloc.stop()
+
+            # prefixes of 1-3 words as a user types them
+            prefixes = []
+            for _ in range(options["lookups"]):
+                words = rnd.choice(items).name.lower().split()
+                text = " ".join(words[rnd.randrange(len(words) - 1):])
+                prefixes.append(text[:rnd.randrange(2, len(text) + 1)])
+            latencies, hits = [], 0
+            for prefix in prefixes:
+                started = time.perf_counter()
+                hits += bool(trie.complete(prefix, 6))
+                latencies.append(time.perf_counter() - started)
+            self.stdout.write(
+                f"products={size} keys={trie.keys} build={build_ms:.0f}ms memory={memory_mb:.1f}MiB "
+                f"lookup_us p50={percentile(latencies, 50) * 1e6:.1f} p99={percentile(latencies, 99) * 1e6:.1f} "
+                f"hit_rate={hits / len(prefixes):.2f}"
+            )
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from chatbot import semantic
+
+
+class Command(BaseCommand):
+    help = ("Build the semantic product search index. Incremental by default: vectors of "
+            "unchanged products and the IVF centroids are reused from the live index "
+            "(centroids are retrained once the catalog size has drifted).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="re-embed everything and retrain centroids")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        index = semantic.rebuild(full=options["full"])
+        self.stdout.write(
+            f"indexed={len(index)} embedded={index.embedded} lists={len(index.centroids)} "
+            f"retrained={index.retrained} "
+            f"path={index.path} in {time.perf_counter() - start:.2f}s"
+        )
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot import invalidation
+
+
+class Command(BaseCommand):
+    help = ("Show or bump the cross-worker cache versions, or watch one until it reaches a "
+            "value (prints how long this process took to notice).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["show", "bump", "watch"])
+        parser.add_argument("name", nargs="?", default="catalog")
+        parser.add_argument("--until", type=int, help="watch: stop once the version is >= this")
+        parser.add_argument("--timeout", type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        name = options["name"]
+        if options["action"] == "show":
+            invalidation.refresh()
+            for key, version in sorted(invalidation._versions.items()):
+                self.stdout.write(f"{key}={version}")
+        elif options["action"] == "bump":
+            self.stdout.write(f"{name}={invalidation.bump(name)}")
+        else:
+            self.watch(name, options["until"], options["timeout"])
+
+    def watch(self, name, until, timeout):
+        if until is None:
+            until = invalidation.current(name) + 1
+        self.stdout.write(f"watching {name} (now {invalidation.current(name)})", ending="\n")
+        self.stdout.flush()
+        start = time.monotonic()
+        while time.monotonic() - start < timeout:
+            version = invalidation.current(name)
+            if version >= until:
+                self.stdout.write(f"{name}={version} seen_at={time.time():.3f}")
+                return
+            time.sleep(0.01)
+        raise CommandError(f"{name} did not reach {until} within {timeout}s")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from chatbot.partitions import clear_expired_sessions
+
+
+class Command(BaseCommand):
+    help = ("Delete expired django_session rows in small batches (short transactions, no long "
+            "table locks). Use instead of `clearsessions` on big session tables.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        deleted = clear_expired_sessions(options["batch_size"])
+        self.stdout.write(f"deleted={deleted}")
@@ -0,0 +1,104 @@
+import statistics
+import threading
+import time
+
+from django.core import signals
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+from chatbot.metrics import percentile
+from chatbot.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrent catalog-lookup stress test. Har iteration ek fake request hai "
+        "(request_started/request_finished fire hote hain) so CONN_MAX_AGE, "
+        "CONN_HEALTH_CHECKS and the psycopg pool behave exactly like under gunicorn."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--requests", type=int, default=200, help="requests per thread")
+        parser.add_argument("--think-ms", type=float, default=0.0,
+                            help="idle time between requests (bursty traffic simulation)")
+
+    def handle(self, *args, **options):
+        threads = options["threads"]
+        per_thread = options["requests"]
+        think = options["think_ms"] / 1000
+
+        lock = threading.Lock()
+        latencies = []
+        physical = set()
+        connects = [0]
+        errors = [0]
+
+        def on_connect(sender, connection, **kwargs):
+            with lock:
+                connects[0] += 1
+
+        connection_created.connect(on_connect, weak=False)
+
+        def backend_id():
+            # postgres pe server-side PID = real TCP/TLS connection; sqlite pe connection object
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_backend_pid()")
+                    return cursor.fetchone()[0]
+            return id(connection.connection)
+
+        def worker(n):
+            local_latencies = []
+            local_physical = set()
+            try:
+                for i in range(per_thread):
+                    signals.request_started.send(sender=self.__class__)
+                    start = time.perf_counter()
+                    try:
+                        list(Product.objects.filter(price__lte=1000 + (i % 50) * 100)
+                             .order_by("price")[:5])
+                        local_physical.add(backend_id())
+                    except Exception:
+                        with lock:
+                            errors[0] += 1
+                    finally:
+                        local_latencies.append(time.perf_counter() - start)
+                        signals.request_finished.send(sender=self.__class__)
+                    if think:
+                        time.sleep(think)
+            finally:
+                connection.close()
+                with lock:
+                    latencies.extend(local_latencies)
+                    physical.update(local_physical)
+
+        started = time.perf_counter()
+        pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - started
+        connection_created.disconnect(on_connect)
+
+        db = connection.settings_dict
+        pool_cfg = db.get("OPTIONS", {}).get("pool")
+        total = len(latencies)
+        self.stdout.write(
+            f"vendor={connection.vendor} pool={'on' if pool_cfg else 'off'} "
+            f"conn_max_age={db.get('CONN_MAX_AGE')} health_checks={db.get('CONN_HEALTH_CHECKS')}"
+        )
+        self.stdout.write(f"requests={total} errors={errors[0]} elapsed={elapsed:.2f}s "
+                          f"throughput={total / elapsed if elapsed else 0:.0f} req/s")
+        self.stdout.write(f"connects={connects[0]} physical_connections={len(physical)}")
+        self.stdout.write(
+            "latency_ms p50={:.2f} p95={:.2f} p99={:.2f} max={:.2f} mean={:.2f}".format(
+                percentile(latencies, 50) * 1000,
+                percentile(latencies, 95) * 1000,
+                percentile(latencies, 99) * 1000,
+                max(latencies, default=0) * 1000,
+                (statistics.mean(latencies) if latencies else 0) * 1000,
+            )
+        )
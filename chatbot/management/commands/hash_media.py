@@ -0,0 +1,37 @@
+import gzip
+import mimetypes
+import os
+import shutil
+
+from django.core.files.storage import storages
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.media import COMPRESSIBLE, HASHED_RE, MANIFEST_NAME, HashedMediaStorage
+
+
+class Command(BaseCommand):
+    help = ("Give every file under MEDIA_ROOT a content-hashed copy, precompress text-like types "
+            "and write media-manifest.json so image URLs resolve to the immutable names.")
+
+    def handle(self, *args, **options):
+        storage = storages["default"]
+        if not isinstance(storage, HashedMediaStorage):
+            raise CommandError("STORAGES['default'] must be chatbot.media.HashedMediaStorage")
+
+        paths = dict(storage.manifest)
+        hashed = 0
+        for root, _, files in os.walk(storage.location):
+            for filename in files:
+                name = os.path.relpath(os.path.join(root, filename), storage.location).replace(os.sep, "/")
+                if name == MANIFEST_NAME or HASHED_RE.search(name) or name.endswith((".gz", ".br", ".tmp")):
+                    continue
+                target = storage.hash_existing(name)
+                if paths.get(name) != target:
+                    paths[name] = target
+                    hashed += 1
+                if mimetypes.guess_type(name)[0] in COMPRESSIBLE and not storage.exists(target + ".gz"):
+                    with storage.open(target) as src, gzip.open(storage.path(target + ".gz"), "wb") as dst:
+                        shutil.copyfileobj(src, dst)
+
+        storage.save_manifest(paths)
+        self.stdout.write(f"files={len(paths)} newly_hashed={hashed} manifest={storage.path(MANIFEST_NAME)}")
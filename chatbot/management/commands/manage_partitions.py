@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from chatbot import partitions
+
+
+class Command(BaseCommand):
+    help = ("Create monthly Lead/QuotationRequest partitions ahead of time (Postgres). "
+            "Run daily from cron so rows never land in the default partition.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months-ahead", type=int, help="default: DATA_RETENTION['PARTITIONS_AHEAD']")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            self.stdout.write(f"{connection.vendor}: plain tables, nothing to partition")
+            return
+        for name in partitions.ensure_partitions(options["months_ahead"]):
+            self.stdout.write(f"created {name}")
+        for model in partitions.partitioned_models():
+            table = model._meta.db_table
+            names = [name for name, _ in partitions.list_partitions(table)]
+            self.stdout.write(f"{table}: {len(names)} partitions ({names[0] if names else '-'} .. "
+                              f"{names[-1] if names else '-'})")
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from chatbot.notifications import deliver_pending, get_transport
+
+
+class Command(BaseCommand):
+    help = ("Send new-lead digests to the sales team from the LeadNotification outbox. "
+            "Runs forever (polling every --interval seconds) unless --once is given.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="drain what is due and exit")
+        parser.add_argument("--interval", type=float, default=10.0)
+        parser.add_argument("--transport", help="console, file, smtp, twilio or a dotted class path")
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        transport = get_transport(options["transport"])
+        while True:
+            sent, failed = deliver_pending(transport, batch_size=options["batch_size"])
+            if sent or failed or options["once"]:
+                self.stdout.write(f"sent={sent} failed={failed}")
+            if options["once"]:
+                return
+            connection.close()  # don't hold a connection between polls
+            time.sleep(options["interval"])
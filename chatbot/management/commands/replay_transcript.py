@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+from importlib import import_module
+from itertools import chain, islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from chatbot.metrics import percentile
+from chatbot.transcripts import read_segment
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay transcript segment(s) through the chat engine for load testing. "
+        "Each sender's messages are replayed in order on its own session; "
+        "senders run concurrently."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("segments", nargs="+")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--limit", type=int, default=0, help="max records to replay (0 = all)")
+
+    def read(self, path):
+        try:
+            yield from read_segment(path)
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+
+    def handle(self, *args, **options):
+        from chatbot.views import _chatbot_response
+
+        conversations = OrderedDict()
+        records = chain.from_iterable(self.read(path) for path in options["segments"])
+        for total, record in enumerate(islice(records, options["limit"] or None)):
+            key = (record.get("channel"), record.get("sender") or f"anon-{total}")
+            conversations.setdefault(key, []).append(record)
+
+        session_store = import_module(settings.SESSION_ENGINE).SessionStore
+        factory = RequestFactory()
+        work = list(conversations.items())
+        lock = threading.Lock()
+        latencies = []
+        intents = Counter()
+        mismatches = [0]
+
+        def replay(conversation):
+            (channel, _), records = conversation
+            session = session_store()  # in-memory, never saved
+            for record in records:
+                request = factory.get("/get-response/", {"msg": record["message"]})
+                request.session = session
+                request.chat_channel = channel
+                request.chat_replay = True  # don't re-record
+                start = time.perf_counter()
+                _chatbot_response(request)
+                elapsed = time.perf_counter() - start
+                intent = getattr(request, "chat_intent", None)
+                with lock:
+                    latencies.append(elapsed)
+                    intents[intent] += 1
+                    if intent is not None and intent != record.get("intent"):
+                        mismatches[0] += 1
+
+        def worker():
+            while True:
+                with lock:
+                    if not work:
+                        return
+                    conversation = work.pop()
+                replay(conversation)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(options["concurrency"])]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"conversations={len(conversations)} messages={len(latencies)} "
+                          f"elapsed={elapsed:.2f}s throughput={len(latencies) / elapsed if elapsed else 0:.0f} msg/s")
+        self.stdout.write("latency_ms p50={:.2f} p95={:.2f} p99={:.2f} max={:.2f}".format(
+            percentile(latencies, 50) * 1000, percentile(latencies, 95) * 1000,
+            percentile(latencies, 99) * 1000, max(latencies, default=0) * 1000))
+        self.stdout.write(f"intent_changes_vs_recorded={mismatches[0]}")
+        for intent, count in intents.most_common():
+            self.stdout.write(f"  {intent}: {count}")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot import pricing
+from chatbot.models import Product, Store
+
+
+class Command(BaseCommand):
+    help = ("Reprice the catalog against the silver rate: price = weight_grams × rate + making_charge, "
+            "one set-based UPDATE in one transaction and one catalog version bump. "
+            "Products without a weight keep their price.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rate", required=True, help="silver spot rate, ₹ per gram")
+        parser.add_argument("--category", help="only this category (case-insensitive)")
+        parser.add_argument("--store", help="only this store (slug); default: every store")
+
+    def handle(self, *args, **options):
+        try:
+            rate = pricing.parse_rate(options["rate"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        queryset = Product.objects.all()
+        if options["store"]:
+            try:
+                queryset = queryset.for_store(Store.objects.get(slug=options["store"]))
+            except Store.DoesNotExist:
+                raise CommandError(f"Unknown store: {options['store']}")
+        updated, elapsed = pricing.reprice(rate, queryset, options["category"])
+        self.stdout.write(f"repriced={updated} rate={rate} elapsed={elapsed * 1000:.1f}ms")
@@ -0,0 +1,220 @@
+"""
+Production serving for uploaded product images.
+
+Storage: uploads are saved under a content-hashed name
+(products/ring.3f2a9c1b7d4e.jpg), so a URL never changes meaning and can be
+cached forever. Files that predate this (or were copied in by hand) get a
+hashed copy from `manage.py hash_media`, which also writes
+<MEDIA_ROOT>/media-manifest.json (original name -> hashed name).
+`storage.url()` resolves through the in-memory manifest - no stat per call.
+
+Serving (/media/<path>, DEBUG ya production dono mein):
+    - MEDIA_SERVING["ACCEL"] = "x-accel"    -> X-Accel-Redirect, nginx sends the file
+    - MEDIA_SERVING["ACCEL"] = "x-sendfile" -> X-Sendfile (Apache / lighttpd)
+    - otherwise Django streams it: FileResponse (sendfile via wsgi.file_wrapper),
+      ETag / Last-Modified -> 304, single byte Range -> 206, precompressed
+      .br / .gz siblings for text-like types.
+Hashed names get `Cache-Control: public, max-age=31536000, immutable`.
+"""
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+MANIFEST_NAME = "media-manifest.json"
+HASH_LENGTH = 12
+HASHED_RE = re.compile(r"\.[0-9a-f]{%d}\.[^./]+$" % HASH_LENGTH)
+IMMUTABLE = "public, max-age=31536000, immutable"
+COMPRESSIBLE = {"image/svg+xml", "application/json", "text/plain", "text/css", "application/javascript"}
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _conf():
+    return getattr(settings, "MEDIA_SERVING", {})
+
+
+def content_hash(chunks):
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(name, file_hash):
+    root, ext = os.path.splitext(name)
+    return f"{root}.{file_hash}{ext}"
+
+
+# --- Storage ---
+class HashedMediaStorage(FileSystemStorage):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._manifest = None
+        self._manifest_mtime = None
+        self._manifest_checked = 0.0
+        self._manifest_lock = threading.Lock()
+
+    # manifest file is stat'ed at most once a second and re-read only when it
+    # changed (hash_media may run while workers serve)
+    @property
+    def manifest(self):
+        now = time.monotonic()
+        if self._manifest is None or now - self._manifest_checked >= 1.0:
+            with self._manifest_lock:
+                self._manifest_checked = now
+                try:
+                    mtime = os.stat(self.path(MANIFEST_NAME)).st_mtime_ns
+                    if mtime != self._manifest_mtime:
+                        with open(self.path(MANIFEST_NAME), encoding="utf-8") as f:
+                            self._manifest = json.load(f).get("paths", {})
+                        self._manifest_mtime = mtime
+                except (OSError, ValueError):
+                    self._manifest = self._manifest or {}
+        return self._manifest
+
+    def save_manifest(self, paths):
+        tmp = self.path(MANIFEST_NAME + ".tmp")
+        os.makedirs(os.path.dirname(tmp), exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "paths": paths}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path(MANIFEST_NAME))
+        self._manifest, self._manifest_mtime = dict(paths), None
+
+    def _save(self, name, content):
+        if HASHED_RE.search(name):
+            return super()._save(name, content)
+        content.seek(0)
+        name = hashed_name(name, content_hash(content.chunks()))
+        content.seek(0)
+        if self.exists(name):
+            return name  # same bytes already uploaded
+        return super()._save(name, content)
+
+    def url(self, name):
+        return super().url(self.manifest.get(name, name) if name else name)
+
+    def hash_existing(self, name):
+        """Hashed copy of an already stored file; returns the hashed name."""
+        with self.open(name) as f:
+            target = hashed_name(name, content_hash(f.chunks()))
+            if not self.exists(target):
+                f.seek(0)
+                super()._save(target, ContentFile(f.read()))
+        return target
+
+
+# --- Serving ---
+def _etag(path, stat):
+    match = HASHED_RE.search(path)
+    tag = match.group(0).split(".")[1] if match else f"{int(stat.st_mtime):x}-{stat.st_size:x}"
+    return quote_etag(tag)
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        return etag in [t.strip() for t in if_none_match.split(",")] or if_none_match.strip() == "*"
+    since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    return since is not None and int(mtime) <= since
+
+
+def _byte_range(request, etag, size):
+    """(start, end) inclusive for a satisfiable single Range, None for a full response, False if unsatisfiable."""
+    header = request.headers.get("Range")
+    if not header or size == 0:
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range.strip() != etag:
+        return None  # representation changed: send it whole
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None  # multi-range / garbage: ignore as RFC 9110 allows
+    first, last = match.groups()
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(0, size - int(last)), size - 1
+    return (start, end) if start <= end and start < size else False
+
+
+def _file_slice(path, start, length, chunk=64 * 1024):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            data = f.read(min(chunk, length))
+            if not data:
+                return
+            length -= len(data)
+            yield data
+
+
+def _precompressed(request, path, content_type):
+    if content_type not in COMPRESSIBLE:
+        return path, None
+    accepted = request.headers.get("Accept-Encoding", "")
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if encoding in accepted and os.path.exists(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+def serve_media(request, path):
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponse(status=405, headers={"Allow": "GET, HEAD"})
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (OSError, ValueError, SuspiciousFileOperation):
+        raise Http404("media not found")
+    if not os.path.isfile(full_path) or os.path.basename(path) == MANIFEST_NAME:
+        raise Http404("media not found")
+
+    content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    cache_control = IMMUTABLE if HASHED_RE.search(path) else f"public, max-age={_conf().get('MAX_AGE', 3600)}"
+    etag = _etag(path, stat)
+    headers = {"ETag": etag, "Last-Modified": http_date(stat.st_mtime), "Cache-Control": cache_control}
+
+    if _not_modified(request, etag, stat.st_mtime):
+        return HttpResponseNotModified(headers=headers)
+
+    accel = _conf().get("ACCEL")
+    if accel == "x-accel":  # nginx does sendfile, Range and conditional requests itself
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response["X-Accel-Redirect"] = _conf().get("ACCEL_PREFIX", "/protected-media/") + path.lstrip("/")
+        return response
+    if accel == "x-sendfile":
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response["X-Sendfile"] = full_path
+        return response
+
+    headers["Accept-Ranges"] = "bytes"
+    byte_range = _byte_range(request, etag, stat.st_size)
+    if byte_range is False:
+        return HttpResponse(status=416, headers={"Content-Range": f"bytes */{stat.st_size}"})
+    if byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(_file_slice(full_path, start, end - start + 1),
+                                         status=206, content_type=content_type, headers=headers)
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+        response["Content-Length"] = str(end - start + 1)
+        return response
+
+    send_path, encoding = _precompressed(request, full_path, content_type)
+    if content_type in COMPRESSIBLE:
+        headers["Vary"] = "Accept-Encoding"
+    # FileResponse -> wsgi.file_wrapper -> os.sendfile under gunicorn (zero-copy)
+    response = FileResponse(open(send_path, "rb"), content_type=content_type, headers=headers)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    return response
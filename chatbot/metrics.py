@@ -0,0 +1,45 @@
+"""
+Tiny process-local metrics registry.
+
+Counters are incremented on the request path (cheap dict update under a
+lock); gauges are callables evaluated only when /metrics/ is scraped.
+"""
+import threading
+from collections import Counter
+
+_lock = threading.Lock()
+_counters = Counter()
+_gauges = {}
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+
+def register_gauge(name, func):
+    _gauges[name] = func
+
+
+def snapshot():
+    with _lock:
+        data = dict(_counters)
+    for name, func in list(_gauges.items()):
+        try:
+            data[name] = func()
+        except Exception:  # gauge kabhi scrape ko fail na kare
+            data[name] = None
+    return data
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
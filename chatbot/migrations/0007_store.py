@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0006_created_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Store',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(unique=True)),
+                ('hosts', models.CharField(blank=True, help_text='Comma separated hostnames, e.g. shop.example.com', max_length=255)),
+                ('whatsapp_number', models.CharField(blank=True, db_index=True, help_text='Twilio number, e.g. +14155238886', max_length=30)),
+                ('intents_file', models.CharField(blank=True, help_text='File in chatbot/intents/, default intents.yml', max_length=100)),
+                ('business_info', models.JSONField(blank=True, default=dict, help_text='Reply overrides: {"store": "...", "catalog": "...", "customize": "...", "gold": "...", "default": "..."}')),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='store',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='chatbot.store'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='store',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='chatbot.store'),
+        ),
+        migrations.AddField(
+            model_name='quotationrequest',
+            name='store',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='chatbot.store'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def partition_tables(apps, schema_editor):
+    # Postgres only; SQLite/MySQL keep plain tables (archive_records deletes in batches there)
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    from chatbot.partitions import convert_to_partitioned
+
+    for name in ("Lead", "QuotationRequest"):
+        convert_to_partitioned(apps.get_model("chatbot", name), schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0009_lead_notifications'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='leadnotification',
+            name='lead',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='notification', to='chatbot.lead'),
+        ),
+        # partitioned tables stay regular tables as far as Django is concerned
+        migrations.RunPython(partition_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0010_partitions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('store_key', models.PositiveIntegerField(default=0, help_text='Store id, 0 = default store')),
+                ('metric', models.CharField(max_length=20)),
+                ('key', models.CharField(blank=True, default='', max_length=100)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'store_key', 'metric', 'key'), name='rollup_day_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0011_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='making_charge',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Added to the metal value, per piece', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='weight_grams',
+            field=models.DecimalField(blank=True, decimal_places=3, help_text='Silver weight; blank = fixed price, not repriced', max_digits=9, null=True),
+        ),
+    ]
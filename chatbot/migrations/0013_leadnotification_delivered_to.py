@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0012_product_weight_making_charge'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leadnotification',
+            name='delivered_to',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
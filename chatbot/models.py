@@ -1,4 +1,27 @@
 from django.db import models
+from django.utils import timezone
+
+
+class Store(models.Model):  # 🏬 one row per storefront (multi-store deployment)
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(unique=True)
+    hosts = models.CharField(max_length=255, blank=True, help_text="Comma separated hostnames, e.g. shop.example.com")
+    whatsapp_number = models.CharField(max_length=30, blank=True, db_index=True, help_text="Twilio number, e.g. +14155238886")
+    intents_file = models.CharField(max_length=100, blank=True, help_text="File in chatbot/intents/, default intents.yml")
+    business_info = models.JSONField(default=dict, blank=True, help_text='Reply overrides: {"store": "...", "catalog": "...", "customize": "...", "gold": "...", "default": "..."}')
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return self.name
+
+
+class TenantQuerySet(models.QuerySet):
+    def for_store(self, store):
+        # store=None -> single-store rows (store not set), so old deployments keep working
+        if store is None:
+            return self.filter(store__isnull=True)
+        return self.filter(store=store)
+
 
 class Product(models.Model):
     name = models.CharField(max_length=100)
@@ -7,6 +30,12 @@ class Product(models.Model):
     image = models.ImageField(upload_to="products/", blank=True, null=True)
     category = models.CharField(max_length=100, default="Uncategorized")
     best_seller = models.BooleanField(default=False)  # 🔥 For Best selling filter 
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, null=True, blank=True)
+    # repricing against the silver rate (see pricing.py): price = weight × rate + making charge
+    weight_grams = models.DecimalField(max_digits=9, decimal_places=3, null=True, blank=True, help_text="Silver weight; blank = fixed price, not repriced")
+    making_charge = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Added to the metal value, per piece")
+
+    objects = TenantQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.name} ({self.price})"
@@ -18,7 +47,10 @@ class QuotationRequest(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True)  # ✅ allow null
     quantity = models.PositiveIntegerField()
     message = models.TextField(blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, null=True, blank=True)
+
+    objects = TenantQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.customer_name} - {self.product.name if self.product else 'No product'}"
@@ -28,7 +60,56 @@ class Lead(models.Model):  # 🔥 for Interested users
     name = models.CharField(max_length=100)
     email = models.EmailField(blank=True, null=True)
     phone = models.CharField(max_length=15, blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    message = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, null=True, blank=True)
+
+    objects = TenantQuerySet.as_manager()
 
     def __str__(self):
         return f"Lead: {self.name} ({self.phone})"
+
+
+class LeadNotification(models.Model):  # 📬 outbox row per new Lead (see notifications.py)
+    PENDING, SENT, FAILED = "pending", "sent", "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (SENT, "Sent"), (FAILED, "Failed")]
+
+    # no DB-level FK: on Postgres chatbot_lead is partitioned (see partitions.py)
+    lead = models.OneToOneField(Lead, on_delete=models.CASCADE, related_name="notification", db_constraint=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    # recipients that already got this lead (per-recipient transports): retries skip them
+    delivered_to = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"], name="leadnotif_due_idx")]
+
+    def __str__(self):
+        return f"Notification for lead {self.lead_id} ({self.status})"
+
+
+class CacheVersion(models.Model):  # 🔄 cross-worker cache invalidation (see invalidation.py)
+    name = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class DailyRollup(models.Model):  # 📊 per-day conversation analytics counters (see analytics.py)
+    day = models.DateField()
+    store_key = models.PositiveIntegerField(default=0, help_text="Store id, 0 = default store")
+    metric = models.CharField(max_length=20)  # messages / intent / stage / cart_add / lead / quotation
+    key = models.CharField(max_length=100, blank=True, default="")
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["day", "store_key", "metric", "key"], name="rollup_day_uniq")]
+
+    def __str__(self):
+        return f"{self.day} {self.metric}:{self.key} = {self.count}"
@@ -0,0 +1,225 @@
+"""
+Sales notifications for new leads, off the request path.
+
+Lead save hone par chat request sirf ek LeadNotification outbox row insert
+karta hai (signals.py). `manage.py notify_leads` picks up due rows in
+batches, sends one digest per batch through a pluggable transport and
+retries failures with exponential backoff:
+
+    attempt 1 fails -> retry after BACKOFF_BASE s, then 2x, 4x ... (<= BACKOFF_MAX)
+    MAX_ATTEMPTS failures -> status "failed" (visible in the admin, not retried)
+
+Transports: "console", "file", "smtp" (Django email backend) and "twilio"
+(WhatsApp message to staff numbers), or a dotted path to any class with
+send(subject, body). A transport that messages recipients one by one
+(twilio) also has `recipients` and send_to(recipient, subject, body): each
+successful recipient is recorded on the outbox rows (delivered_to), so a
+retry after recipient N failed doesn't send the digest to 1..N-1 again.
+
+Settings (settings.LEAD_NOTIFICATIONS): TRANSPORT, RECIPIENTS, FROM, FILE,
+BATCH_SIZE, MAX_ATTEMPTS, BACKOFF_BASE, BACKOFF_MAX.
+"""
+import sys
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import metrics
+
+
+def _conf():
+    return getattr(settings, "LEAD_NOTIFICATIONS", {})
+
+
+# --- Transports ---
+class ConsoleTransport:
+    def __init__(self, stream=None, **options):
+        self.stream = stream or sys.stdout
+
+    def send(self, subject, body):
+        self.stream.write(f"{subject}\n{body}\n\n")
+        self.stream.flush()
+
+
+class FileTransport:
+    def __init__(self, path=None, **options):
+        self.path = path or _conf().get("FILE") or "lead_notifications.log"
+
+    def send(self, subject, body):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(f"{subject}\n{body}\n\n")
+
+
+class SMTPTransport:
+    """Uses Django's EMAIL_* settings / EMAIL_BACKEND."""
+
+    def __init__(self, recipients=None, from_email=None, **options):
+        self.recipients = recipients if recipients is not None else _conf().get("RECIPIENTS", [])
+        self.from_email = from_email or _conf().get("FROM") or settings.DEFAULT_FROM_EMAIL
+
+    def send(self, subject, body):
+        from django.core.mail import send_mail
+
+        send_mail(subject, body, self.from_email, self.recipients, fail_silently=False)
+
+
+class TwilioTransport:
+    """WhatsApp digest to staff numbers; twilio SDK is imported only here."""
+
+    def __init__(self, recipients=None, from_number=None, **options):
+        conf = _conf()
+        self.recipients = recipients if recipients is not None else conf.get("RECIPIENTS", [])
+        self.from_number = from_number or conf.get("FROM", "")
+        self.account_sid = options.get("account_sid") or conf.get("TWILIO_ACCOUNT_SID", "")
+        self.auth_token = options.get("auth_token") or conf.get("TWILIO_AUTH_TOKEN", "")
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from twilio.rest import Client
+
+            self._client = Client(self.account_sid, self.auth_token)
+        return self._client
+
+    def send(self, subject, body):
+        for number in self.recipients:
+            self.send_to(number, subject, body)
+
+    def send_to(self, number, subject, body):
+        self.client.messages.create(
+            from_=f"whatsapp:{self.from_number}", to=f"whatsapp:{number}", body=f"{subject}\n{body}"[:1600]
+        )
+
+
+TRANSPORTS = {
+    "console": ConsoleTransport,
+    "file": FileTransport,
+    "smtp": SMTPTransport,
+    "twilio": TwilioTransport,
+}
+
+
+def get_transport(name=None, **options):
+    name = name or _conf().get("TRANSPORT", "console")
+    cls = TRANSPORTS.get(name) or import_string(name)
+    return cls(**options)
+
+
+# --- Digest ---
+def format_digest(leads):
+    subject = f"🔔 {len(leads)} new lead{'s' if len(leads) != 1 else ''} from SilverBot"
+    lines = []
+    for lead in leads:
+        store = f" [{lead.store.name}]" if lead.store_id else ""
+        contact = ", ".join(filter(None, [lead.phone, lead.email]))
+        lines.append(f"- {lead.name} ({contact}){store}: {lead.message or 'General inquiry'}")
+    return subject, "\n".join(lines)
+
+
+def backoff_delay(attempts):
+    conf = _conf()
+    base, cap = conf.get("BACKOFF_BASE", 30), conf.get("BACKOFF_MAX", 3600)
+    return min(cap, base * 2 ** (attempts - 1))
+
+
+# --- Outbox processing ---
+def enqueue(lead):
+    """The only work done on the chat request: one INSERT."""
+    from .models import LeadNotification
+
+    LeadNotification.objects.create(lead=lead)
+
+
+def _claim(now, batch_size):
+    from .models import LeadNotification
+
+    due = (LeadNotification.objects
+           .filter(status=LeadNotification.PENDING, next_attempt_at__lte=now)
+           .select_related("lead__store")
+           .order_by("next_attempt_at", "id"))
+    if connection.features.has_select_for_update_skip_locked:
+        # do workers ek saath chalein to bhi ek lead do baar na jaye
+        due = due.select_for_update(skip_locked=True, of=("self",))
+    return list(due[:batch_size])
+
+
+def deliver_batch(transport, now=None, batch_size=None):
+    """Send one digest for up to BATCH_SIZE due notifications. Returns (sent, failed)."""
+    from .models import LeadNotification
+
+    conf = _conf()
+    now = now or timezone.now()
+    with transaction.atomic():
+        batch = _claim(now, batch_size or conf.get("BATCH_SIZE", 50))
+        if not batch:
+            return 0, 0
+        ids = [n.pk for n in batch]
+        try:
+            if hasattr(transport, "send_to"):
+                send_per_recipient(transport, batch)
+            else:
+                transport.send(*format_digest([n.lead for n in batch]))
+        except Exception as exc:
+            failed = retry_later(batch, exc, now, conf.get("MAX_ATTEMPTS", 8))
+            metrics.incr("notifications.errors")
+            metrics.incr("notifications.failed", failed)
+            return 0, failed
+        LeadNotification.objects.filter(pk__in=ids).update(
+            status=LeadNotification.SENT, sent_at=now, attempts=F("attempts") + 1, last_error=""
+        )
+    metrics.incr("notifications.sent", len(ids))
+    return len(ids), 0
+
+
+def send_per_recipient(transport, batch):
+    """
+    Digest per recipient, of the leads it hasn't had yet. Every recipient is
+    tried; successes are recorded in delivered_to, the first error is raised.
+    """
+    error = None
+    for recipient in transport.recipients:
+        pending = [n for n in batch if recipient not in n.delivered_to]
+        if not pending:
+            continue  # got it on an earlier attempt
+        try:
+            transport.send_to(recipient, *format_digest([n.lead for n in pending]))
+        except Exception as exc:
+            error = error or exc
+            continue
+        for notification in pending:
+            notification.delivered_to.append(recipient)
+    if error is not None:
+        raise error
+
+
+def retry_later(batch, exc, now, max_attempts):
+    from .models import LeadNotification
+
+    failed = 0
+    for notification in batch:
+        notification.attempts += 1
+        notification.last_error = f"{type(exc).__name__}: {exc}"[:1000]
+        if notification.attempts >= max_attempts:
+            notification.status = LeadNotification.FAILED
+            failed += 1
+        else:
+            notification.next_attempt_at = now + timedelta(seconds=backoff_delay(notification.attempts))
+    LeadNotification.objects.bulk_update(batch, ["attempts", "last_error", "status", "next_attempt_at",
+                                                 "delivered_to"])
+    return failed
+
+
+def deliver_pending(transport, now=None, batch_size=None):
+    """Drain everything that is due right now, one digest per batch."""
+    sent = failed = 0
+    while True:
+        batch_sent, batch_failed = deliver_batch(transport, now, batch_size)
+        sent += batch_sent
+        failed += batch_failed
+        if not batch_sent:
+            return sent, failed
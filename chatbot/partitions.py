@@ -0,0 +1,247 @@
+"""
+Monthly partitions + retention for the append-only tables (Lead, QuotationRequest).
+
+Postgres pe dono tables `PARTITION BY RANGE (created_at)` hain (migration 0010):
+
+    chatbot_lead                 partitioned parent, PK (id, created_at)
+    chatbot_lead_p2026_10        [2026-10-01, 2026-11-01)
+    chatbot_lead_default         anything outside the created months
+
+`manage.py manage_partitions` creates the coming months ahead of time (run it
+from cron), and `manage.py archive_records` exports every month older than
+the retention window to <ARCHIVE_DIR>/<table>-YYYY-MM.csv.gz and then drops
+the partition - an instant metadata change instead of a huge DELETE.
+
+Other backends keep plain tables; the same archive command deletes archived
+months there in small batches.
+
+Settings (settings.DATA_RETENTION): MONTHS, ARCHIVE_DIR, PARTITIONS_AHEAD,
+DELETE_BATCH_SIZE.
+"""
+import csv
+import gzip
+import os
+import re
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import connection as default_connection, transaction
+
+PARTITION_COLUMN = "created_at"
+_NAME_RE = re.compile(r"_p(\d{4})_(\d{2})$")
+
+
+def _conf():
+    return getattr(settings, "DATA_RETENTION", {})
+
+
+def partitioned_models():
+    from .models import Lead, QuotationRequest
+    return [Lead, QuotationRequest]
+
+
+# --- Month math ---
+def month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+
+def partition_month(name):
+    match = _NAME_RE.search(name)
+    return datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc) if match else None
+
+
+# --- Introspection ---
+def is_partitioned(table, connection=default_connection):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [table])
+        return cursor.fetchone() is not None
+
+
+def list_partitions(table, connection=default_connection):
+    """Monthly partitions of `table` as [(name, month)], oldest first (default partition excluded)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass", [table])
+        names = [row[0] for row in cursor.fetchall()]
+    return sorted((name, partition_month(name)) for name in names if partition_month(name))
+
+
+# --- Creating partitions ---
+def create_partition(table, month, connection=default_connection):
+    name = partition_name(table, month)
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {qn(name)} PARTITION OF {qn(table)} "
+            f"FOR VALUES FROM (%s) TO (%s)", [month, add_months(month, 1)])
+    return name
+
+
+def ensure_partitions(months_ahead=None, now=None, connection=default_connection):
+    """Current month + `months_ahead` future months for every partitioned table. Returns names created."""
+    months_ahead = _conf().get("PARTITIONS_AHEAD", 3) if months_ahead is None else months_ahead
+    this_month = month_start(now or datetime.now(timezone.utc))
+    created = []
+    for model in partitioned_models():
+        table = model._meta.db_table
+        if not is_partitioned(table, connection):
+            continue
+        existing = {name for name, _ in list_partitions(table, connection)}
+        for n in range(months_ahead + 1):
+            month = add_months(this_month, n)
+            if partition_name(table, month) not in existing:
+                created.append(create_partition(table, month, connection))
+    return created
+
+
+def convert_to_partitioned(model, connection, months_ahead=3):
+    """
+    Rebuild `model`'s plain table as a partitioned one, keeping data, sequence,
+    indexes and FKs. Used by migration 0010; Postgres only.
+    """
+    table = model._meta.db_table
+    old = f"{table}_unpartitioned"
+    qn = connection.ops.quote_name
+    pk = model._meta.pk.column
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT MIN({qn(PARTITION_COLUMN)}), MAX({qn(pk)}) FROM {qn(table)}")
+        oldest, max_id = cursor.fetchone()
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(old)}")
+        cursor.execute(f"CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING DEFAULTS) "
+                       f"PARTITION BY RANGE ({qn(PARTITION_COLUMN)})")
+        cursor.execute(f"CREATE TABLE {qn(table + '_default')} PARTITION OF {qn(table)} DEFAULT")
+
+        this_month = month_start(datetime.now(timezone.utc))
+        month = month_start(oldest) if oldest else this_month
+        while month <= add_months(this_month, months_ahead):
+            create_partition(table, month, connection)
+            month = add_months(month, 1)
+
+        cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(old)}")
+        cursor.execute(f"DROP TABLE {qn(old)} CASCADE")  # identity sequence goes with it
+
+        # identity columns need PG 17 on partitioned tables; an owned sequence works everywhere
+        seq = f"{table}_{pk}_seq"
+        cursor.execute(f"CREATE SEQUENCE {qn(seq)} OWNED BY {qn(table)}.{qn(pk)}")
+        cursor.execute("SELECT setval(%s, %s, %s)", [seq, max_id or 1, max_id is not None])
+        cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN {qn(pk)} SET DEFAULT nextval(%s::regclass)", [seq])
+        # unique constraints on a partitioned table must include the partition key
+        cursor.execute(f"ALTER TABLE {qn(table)} ADD PRIMARY KEY ({qn(pk)}, {qn(PARTITION_COLUMN)})")
+
+        for field in model._meta.concrete_fields:
+            if field.primary_key or not (field.db_index or field.is_relation):
+                continue
+            column = field.column
+            cursor.execute(f"CREATE INDEX {qn(f'{table}_{column}_idx')} ON {qn(table)} ({qn(column)})")
+            if field.is_relation and field.db_constraint:
+                target = field.related_model._meta
+                cursor.execute(
+                    f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(f'{table}_{column}_fk')} "
+                    f"FOREIGN KEY ({qn(column)}) REFERENCES {qn(target.db_table)} ({qn(target.pk.column)}) "
+                    f"DEFERRABLE INITIALLY DEFERRED")
+
+
+# --- Retention / archival ---
+def _export(cursor, path, sql, params, chunk=5000):
+    """Stream a query into a gzip CSV (written as .part, renamed when complete)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cursor.execute(sql, params)
+    rows = 0
+    with gzip.open(path + ".part", "wt", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([col[0] for col in cursor.description])
+        while True:
+            batch = cursor.fetchmany(chunk)
+            if not batch:
+                break
+            writer.writerows(batch)
+            rows += len(batch)
+    os.replace(path + ".part", path)
+    return rows
+
+
+def _delete_dependents(cursor, model, where, params):
+    # LeadNotification.lead has no DB-level FK (partitioned parent), clean it up here
+    from .models import LeadNotification
+
+    if model is LeadNotification.lead.field.related_model:
+        qn = default_connection.ops.quote_name
+        cursor.execute(
+            f"DELETE FROM {qn(LeadNotification._meta.db_table)} WHERE lead_id IN "
+            f"(SELECT id FROM {qn(model._meta.db_table)} WHERE {where})", params)
+
+
+def archive_months(retention_months=None, archive_dir=None, now=None, dry_run=False):
+    """
+    Export + remove every whole month older than the retention window.
+    Returns [(table, "YYYY-MM", rows, path)].
+    """
+    conf = _conf()
+    retention_months = conf.get("MONTHS", 12) if retention_months is None else retention_months
+    archive_dir = archive_dir or conf.get("ARCHIVE_DIR", os.path.join(settings.BASE_DIR, "archive"))
+    cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -retention_months)
+    qn = default_connection.ops.quote_name
+    done = []
+    for model in partitioned_models():
+        table = model._meta.db_table
+        column = qn(model._meta.get_field(PARTITION_COLUMN).column)
+        for month in _months_before(model, cutoff):
+            path = os.path.join(archive_dir, f"{table}-{month:%Y-%m}.csv.gz")
+            where, params = f"{column} >= %s AND {column} < %s", [month, add_months(month, 1)]
+            if dry_run:
+                done.append((table, f"{month:%Y-%m}", model.objects.filter(
+                    created_at__gte=month, created_at__lt=add_months(month, 1)).count(), path))
+                continue
+            with transaction.atomic(), default_connection.cursor() as cursor:
+                rows = _export(cursor, path, f"SELECT * FROM {qn(table)} WHERE {where} ORDER BY {column}", params)
+                _delete_dependents(cursor, model, where, params)
+                name = partition_name(table, month)
+                if is_partitioned(table) and name in dict(list_partitions(table)):
+                    cursor.execute(f"DROP TABLE {qn(name)}")
+            if not is_partitioned(table):
+                delete_in_batches(table, where, params, conf.get("DELETE_BATCH_SIZE", 5000))
+            done.append((table, f"{month:%Y-%m}", rows, path))
+    return done
+
+
+def _months_before(model, cutoff):
+    table = model._meta.db_table
+    if is_partitioned(table):
+        return [month for _, month in list_partitions(table) if month < cutoff]
+    # plain table: only months that actually have rows
+    return [month_start(day) for day in model.objects.filter(created_at__lt=cutoff).dates("created_at", "month")]
+
+
+def delete_in_batches(table, where, params, batch_size=5000, pk="id"):
+    """DELETE in short autocommitted batches so no statement holds locks for long."""
+    qn = default_connection.ops.quote_name
+    total = 0
+    while True:
+        with transaction.atomic(), default_connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {qn(table)} WHERE {qn(pk)} IN "
+                f"(SELECT {qn(pk)} FROM {qn(table)} WHERE {where} LIMIT %s)", [*params, batch_size])
+            deleted = cursor.rowcount
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+def clear_expired_sessions(batch_size=5000, now=None):
+    """Batched version of `clearsessions` for the database session backend."""
+    from django.contrib.sessions.models import Session
+
+    return delete_in_batches(Session._meta.db_table, "expire_date < %s",
+                             [now or datetime.now(timezone.utc)], batch_size, pk="session_key")
@@ -0,0 +1,61 @@
+"""
+Repricing against the silver spot rate.
+
+    price = weight_grams × rate (₹/g) + making_charge
+
+The database computes it for the whole catalog (or one category / store /
+admin selection) in a single statement,
+
+    UPDATE chatbot_product SET price = ROUND(weight_grams * %s + making_charge, 2)
+    WHERE weight_grams IS NOT NULL [AND ...]
+
+inside one transaction, followed by ONE catalog version bump: snapshots and
+category summaries rebuild once on every worker instead of once per edited
+row (list_editable save = one UPDATE + post_save + version bump each).
+Products without a weight are fixed-price and keep their price.
+"""
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Value
+from django.db.models.functions import Round
+
+from .catalog import bump_catalog_version
+
+
+def parse_rate(value):
+    """Rate per gram as a positive Decimal; ValueError otherwise."""
+    try:
+        rate = Decimal(str(value).strip())
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"invalid silver rate: {value!r}")
+    if not rate.is_finite() or rate <= 0:
+        raise ValueError(f"silver rate must be positive: {value!r}")
+    return rate
+
+
+def price_expression(rate):
+    money = DecimalField(max_digits=10, decimal_places=2)
+    value = F("weight_grams") * Value(parse_rate(rate), output_field=DecimalField(max_digits=10, decimal_places=4))
+    return Round(ExpressionWrapper(value + F("making_charge"), output_field=money), 2, output_field=money)
+
+
+def reprice(rate, queryset=None, category=None):
+    """
+    Set-based reprice of `queryset` (default: all products), optionally one
+    category. Returns (rows updated, elapsed seconds incl. the version bump).
+    """
+    from .models import Product
+
+    qs = Product.objects.all() if queryset is None else queryset
+    qs = qs.filter(weight_grams__isnull=False)
+    if category:
+        qs = qs.filter(category__iexact=category)
+    expression = price_expression(rate)
+    started = time.perf_counter()
+    with transaction.atomic():
+        updated = qs.order_by().update(price=expression)
+        if updated:
+            bump_catalog_version()
+    return updated, time.perf_counter() - started
@@ -0,0 +1,284 @@
+"""
+On-demand profiling of live chat requests.
+
+A request is profiled when one of these is true:
+
+    - random sample:  CHAT_PROFILING["SAMPLE_RATE"] (0.0 = off)
+    - signed header:  X-Chat-Profile: <token from the admin profiles page>
+    - admin toggle:   "profile everything for N minutes" on /admin/chatbot/profiles/
+                      (at most MAX_TOGGLE_MINUTES)
+
+Baaki requests ke liye middleware sirf yeh teen cheap checks karta hai (no
+profiler, no allocation); with ENABLED off (the default) it is removed
+entirely (MiddlewareNotUsed). Turn it on with CHAT_PROFILING_ENABLED=1.
+
+Profiled requests run under a stack sampler (a thread reading the request
+thread's frame every INTERVAL_MS) or cProfile (MODE="cprofile"). Each profile
+is one JSON file in DIR with collapsed stacks ("a;b;c 12", flamegraph.pl /
+speedscope compatible); only the newest MAX_FILES are kept.
+"""
+import cProfile
+import hashlib
+import hmac
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .aio import HybridMiddleware
+from .transcripts import mask_pii
+
+HEADER = "X-Chat-Profile"
+
+
+def _conf():
+    return getattr(settings, "CHAT_PROFILING", {})
+
+
+def profile_dir():
+    return _conf().get("DIR", os.path.join(settings.BASE_DIR, "profiles"))
+
+
+# --- Signed header token ---
+def _signature(expires):
+    return hmac.new(settings.SECRET_KEY.encode(), f"profile:{expires}".encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def make_token(ttl=None):
+    expires = int(time.time() + (ttl or _conf().get("TOKEN_TTL", 900)))
+    return f"{expires}.{_signature(expires)}"
+
+
+def valid_token(token):
+    expires, _, signature = (token or "").partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(int(expires)))
+
+
+# --- Admin toggle (a file in DIR, so every worker sees it) ---
+_toggle = (0.0, 0.0)  # (checked at, enabled until)
+
+
+def toggle_until():
+    global _toggle
+    checked_at, until = _toggle
+    now = time.monotonic()
+    if now - checked_at >= 1.0:  # file re-read at most once a second
+        try:
+            with open(os.path.join(profile_dir(), "ENABLED_UNTIL")) as f:
+                until = float(f.read().strip() or 0)
+        except (OSError, ValueError):
+            until = 0.0
+        _toggle = (now, until)
+    return until
+
+
+def max_toggle_minutes():
+    return _conf().get("MAX_TOGGLE_MINUTES", 60)
+
+
+def set_toggle(minutes):
+    global _toggle
+    minutes = max(0, min(minutes, max_toggle_minutes()))
+    os.makedirs(profile_dir(), exist_ok=True)
+    until = time.time() + minutes * 60 if minutes else 0
+    with open(os.path.join(profile_dir(), "ENABLED_UNTIL"), "w") as f:
+        f.write(str(until))
+    _toggle = (0.0, 0.0)
+    return until
+
+
+# --- Profilers ---
+def _label(filename, name):
+    path = filename.replace("\\", "/").split("/")
+    return f"{'/'.join(path[-2:])}:{name}" if filename and filename != "~" else name
+
+
+def collapse(frame):
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code.co_filename, frame.f_code.co_name))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Samples one thread's stack every `interval` seconds from a helper thread."""
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self.target = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class CProfiler:
+    """
+    Deterministic profile. cProfile keeps no full stacks, so the collapsed
+    output is "caller;callee" pairs weighted by the callee's own time in µs.
+    """
+
+    def __init__(self, interval=None):
+        self.profile = cProfile.Profile()
+        self.stacks = Counter()
+
+    def __enter__(self):
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.disable()
+        for (filename, _, name), (_, _, tottime, _, callers) in pstats.Stats(self.profile).stats.items():
+            label = _label(filename, name)
+            calls = sum(caller[0] for caller in callers.values())
+            if not calls:
+                self.stacks[label] += int(tottime * 1e6)
+                continue
+            for (c_file, _, c_name), caller in callers.items():
+                weight = int(tottime * 1e6 * caller[0] / calls)
+                if weight:
+                    self.stacks[f"{_label(c_file, c_name)};{label}"] += weight
+
+
+PROFILERS = {"sample": StackSampler, "cprofile": CProfiler}
+
+
+# --- Ring of profile files ---
+def write_profile(record, directory=None, max_files=None):
+    directory = directory or profile_dir()
+    max_files = max_files or _conf().get("MAX_FILES", 200)
+    os.makedirs(directory, exist_ok=True)
+    name = f"profile-{time.time_ns()}-{os.getpid()}.json"
+    tmp = os.path.join(directory, name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(record, f)
+    os.replace(tmp, os.path.join(directory, name))
+    for old in list_profiles(directory)[max_files:]:
+        try:
+            os.remove(os.path.join(directory, old))
+        except OSError:
+            pass  # another worker pruned it first
+    return name
+
+
+def list_profiles(directory=None):
+    """Profile file names, newest first."""
+    try:
+        names = os.listdir(directory or profile_dir())
+    except OSError:
+        return []
+    return sorted((n for n in names if n.startswith("profile-") and n.endswith(".json")), reverse=True)
+
+
+def read_profile(name, directory=None):
+    with open(os.path.join(directory or profile_dir(), os.path.basename(name)), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def merge_stacks(records):
+    total = Counter()
+    for record in records:
+        total.update(record["stacks"])
+    return total
+
+
+def hotspots(stacks, limit=20):
+    """(self, inclusive) counters per frame from collapsed stacks."""
+    own, inclusive = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for frame in set(frames):
+            inclusive[frame] += count
+    return own.most_common(limit), inclusive.most_common(limit)
+
+
+def collapsed_text(stacks):
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+
+
+# --- Middleware ---
+class ProfilingMiddleware(HybridMiddleware):
+    def __init__(self, get_response):
+        conf = _conf()
+        if not conf.get("ENABLED"):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.rate = conf.get("SAMPLE_RATE", 0.0)
+        self.profiler = PROFILERS[conf.get("MODE", "sample")]
+        self.interval = conf.get("INTERVAL_MS", 1) / 1000
+
+    def _reason(self, request):
+        token = request.META.get("HTTP_X_CHAT_PROFILE")
+        if token and valid_token(token):
+            return "header"
+        if self.rate and random.random() < self.rate:
+            return "sample"
+        if toggle_until() > time.time():
+            return "toggle"
+        return None
+
+    def _record(self, request, response, reason, duration, profiler):
+        stage = getattr(request, "chat_stage", None)
+        return {
+            "ts": time.time(),
+            "method": request.method,
+            "path": request.path,
+            "msg": mask_pii(request.GET.get("msg", ""), stage)[:200],  # same masking as transcripts
+            "intent": getattr(request, "chat_intent", None),
+            "stage": stage,
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 3),
+            "mode": _conf().get("MODE", "sample"),
+            "reason": reason,
+            "stacks": dict(profiler.stacks),
+        }
+
+    def handle(self, request):
+        reason = self._reason(request)
+        if reason is None:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        with self.profiler(self.interval) as profiler:
+            response = self.get_response(request)
+        write_profile(self._record(request, response, reason, time.perf_counter() - started, profiler))
+        return response
+
+    async def ahandle(self, request):
+        # under ASGI the event loop thread is profiled: the stacks also show
+        # whatever other requests ran on the loop meanwhile
+        reason = self._reason(request)
+        if reason is None:
+            return await self.get_response(request)
+
+        started = time.perf_counter()
+        with self.profiler(self.interval) as profiler:
+            response = await self.get_response(request)
+        record = self._record(request, response, reason, time.perf_counter() - started, profiler)
+        await sync_to_async(write_profile)(record)
+        return response
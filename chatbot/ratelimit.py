@@ -0,0 +1,248 @@
+"""
+Per-sender rate limiting for the public chat endpoints.
+
+Check request ke sabse pehle hota hai (before intent detection, session load
+or any DB access) so a spammy WhatsApp number or scraper only costs us a dict
+lookup. Configure via settings.CHAT_RATE_LIMIT:
+
+    CHAT_RATE_LIMIT = {
+        "BACKEND": "chatbot.ratelimit.MemoryBackend",   # or CacheBackend
+        "RATE": 30,      # messages allowed per PERIOD
+        "PERIOD": 60,    # seconds
+        "BURST": 10,     # max messages back-to-back (token bucket capacity)
+        "PROXY_HOPS": 1, # trusted proxies appending to X-Forwarded-For (0 = use REMOTE_ADDR)
+        "OPTIONS": {},   # backend kwargs
+    }
+
+The in-memory backend is a token bucket: it refills continuously, so it
+already slides (no window edges to burst across) and BURST caps
+back-to-back messages. The shared backend is a sliding-window counter
+instead, because a bucket is a read-modify-write of two values that a plain
+Django cache can't do atomically, while cache.incr is atomic on Redis and
+Memcached.
+
+Web senders are keyed by session only once that session has been found in
+the session store on this worker (remember_session, after the view ran);
+until then - and for made-up cookies - they share their IP's budget.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from . import metrics
+
+
+class MemoryBackend:
+    """Token bucket per key, held in a bounded LRU dict (per worker process)."""
+
+    def __init__(self, rate, period, burst, max_keys=50000, clock=time.monotonic):
+        self.refill_per_sec = rate / period
+        self.capacity = max(1, burst or rate)
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = OrderedDict()  # key -> [tokens, last_refill]
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        """Returns (allowed, retry_after_seconds)."""
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.capacity), now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)  # coldest sender
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.refill_per_sec)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True, 0
+            return False, math.ceil((1 - bucket[0]) / self.refill_per_sec)
+
+    async def aallow(self, key):
+        return self.allow(key)  # in-memory, never blocks
+
+    def tracked_keys(self):
+        return len(self._buckets)
+
+
+class CacheBackend:
+    """
+    Shared limiter on top of a Django cache (Redis/Memcached) so all workers
+    and nodes see the same budget. Uses a sliding-window counter: current
+    fixed window + weighted previous window, with atomic cache.incr. Bursts
+    are bounded by the window itself, so `burst` is accepted but unused.
+    """
+
+    def __init__(self, rate, period, burst=None, cache_alias="default", prefix="rl", clock=time.time):
+        self.limit = rate
+        self.period = period
+        self.cache = caches[cache_alias]
+        self.prefix = prefix
+        self.clock = clock
+
+    def _incr(self, key):
+        self.cache.add(key, 0, self.period * 2)
+        try:
+            return self.cache.incr(key)
+        except ValueError:  # expired between add and incr
+            self.cache.set(key, 1, self.period * 2)
+            return 1
+
+    def allow(self, key):
+        now = self.clock()
+        window = int(now // self.period)
+        elapsed = (now % self.period) / self.period
+        previous = self.cache.get(f"{self.prefix}:{key}:{window - 1}", 0)
+        current = self._incr(f"{self.prefix}:{key}:{window}")
+        return self._decide(previous, current, elapsed)
+
+    async def _aincr(self, key):
+        await self.cache.aadd(key, 0, self.period * 2)
+        try:
+            return await self.cache.aincr(key)
+        except ValueError:
+            await self.cache.aset(key, 1, self.period * 2)
+            return 1
+
+    async def aallow(self, key):
+        now = self.clock()
+        window = int(now // self.period)
+        elapsed = (now % self.period) / self.period
+        previous = await self.cache.aget(f"{self.prefix}:{key}:{window - 1}", 0)
+        current = await self._aincr(f"{self.prefix}:{key}:{window}")
+        return self._decide(previous, current, elapsed)
+
+    def _decide(self, previous, current, elapsed):
+        estimated = previous * (1 - elapsed) + current
+        if estimated <= self.limit:
+            return True, 0
+        return False, math.ceil(self.period * (1 - elapsed)) or 1
+
+    def tracked_keys(self):
+        return None  # shared store, not known per worker
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                conf = getattr(settings, "CHAT_RATE_LIMIT", {})
+                backend = import_string(conf.get("BACKEND", "chatbot.ratelimit.MemoryBackend"))
+                _limiter = backend(
+                    rate=conf.get("RATE", 30),
+                    period=conf.get("PERIOD", 60),
+                    burst=conf.get("BURST", 10),
+                    **conf.get("OPTIONS", {}),
+                )
+                metrics.register_gauge("ratelimit.tracked_keys", _limiter.tracked_keys)
+    return _limiter
+
+
+def reset_limiter():
+    global _limiter
+    _limiter = None
+    _sessions.clear()
+
+
+# --- Key functions ---
+_sessions = OrderedDict()  # session keys seen in the session store (per worker, bounded)
+_sessions_lock = threading.Lock()
+MAX_SESSIONS = 50000
+
+
+def client_ip(request):
+    """
+    Client address as seen by the last trusted proxy. X-Forwarded-For
+    entries to the left of the ones our PROXY_HOPS proxies appended are
+    whatever the client sent, so they are never used.
+    """
+    hops = getattr(settings, "CHAT_RATE_LIMIT", {}).get("PROXY_HOPS", 1)
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR")  # Render proxy ke peeche
+    if hops and forwarded:
+        entries = [entry.strip() for entry in forwarded.split(",")]
+        if len(entries) >= hops:
+            return entries[-hops]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def web_key(request):
+    # session cookie sirf padha jaata hai, session load nahi hota (no DB hit)
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if session_key and session_key in _sessions:
+        return f"web:{session_key}"
+    return f"ip:{client_ip(request)}"  # no cookie, or not (yet) known to exist
+
+
+def remember_session(request):
+    """After the view: key this sender on its session if the cookie's session was loaded from the store."""
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    session = getattr(request, "session", None)
+    # a cookie with no stored session loads as an empty session whose key is reset
+    if not session_key or session is None or not session.accessed or session.session_key != session_key:
+        return
+    with _sessions_lock:
+        _sessions[session_key] = True
+        _sessions.move_to_end(session_key)
+        if len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+
+
+def whatsapp_key(request):
+    sender = request.POST.get("From") if request.method == "POST" else None
+    return f"wa:{sender}" if sender else f"ip:{client_ip(request)}"
+
+
+def rate_limit(key_func, on_limited, channel, after=None):
+    """View decorator: rejects over-budget senders before the view runs; after(request) runs once it has."""
+
+    def counted(allowed):
+        metrics.incr(f"ratelimit.{'allowed' if allowed else 'limited'}.{channel}")
+        return allowed
+
+    def decorator(view):
+        if iscoroutinefunction(view):  # async views (ASGI): the limiter check is awaited
+            @wraps(view)
+            async def awrapped(request, *args, **kwargs):
+                if not getattr(settings, "CHAT_RATE_LIMIT", {}).get("ENABLED", True):
+                    return await view(request, *args, **kwargs)
+                allowed, retry_after = await get_limiter().aallow(key_func(request))
+                if not counted(allowed):
+                    return on_limited(request, retry_after)
+                response = await view(request, *args, **kwargs)
+                if after is not None:
+                    after(request)
+                return response
+
+            return awrapped
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not getattr(settings, "CHAT_RATE_LIMIT", {}).get("ENABLED", True):
+                return view(request, *args, **kwargs)
+            allowed, retry_after = get_limiter().allow(key_func(request))
+            if not counted(allowed):
+                return on_limited(request, retry_after)
+            response = view(request, *args, **kwargs)
+            if after is not None:
+                after(request)
+            return response
+
+        return wrapped
+
+    return decorator
@@ -0,0 +1,134 @@
+"""
+Primary / read-replica database routing.
+
+With DATABASE_REPLICA_URL set, settings adds a "replica" database and
+ReplicaRouter sends catalog reads (DB_ROUTING["REPLICA_MODELS"], default
+Product: price filters, category search, best sellers, fuzzy name
+resolution, admin changelists) there. Sessions, Lead, QuotationRequest,
+cache versions and every write use the primary. Without a replica the
+router and middleware do nothing.
+
+Read-your-writes: a write made while handling a request pins the rest of
+that request to the primary and sets a short-lived cookie (PIN_COOKIE for
+PIN_SECONDS, longer than the replica lag), so the next messages of the same
+conversation - web session or Twilio's cookie on WhatsApp - read from the
+primary too. Session saves don't pin (sessions never come from the replica).
+
+Cache (re)builds - catalog snapshot, category summaries, semantic index -
+run under use_primary(): they follow a catalog version bump and must not
+cache rows the replica hasn't received yet.
+
+Settings (settings.DB_ROUTING): REPLICA, REPLICA_MODELS, PIN_COOKIE, PIN_SECONDS.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .aio import HybridMiddleware
+
+NEVER_PIN = {"sessions.Session"}
+
+_request = ContextVar("db_request_pin", default=None)  # _RequestPin while a request is handled
+_forced = ContextVar("db_force_primary", default=False)
+
+
+def _conf():
+    return getattr(settings, "DB_ROUTING", {})
+
+
+def replica_alias():
+    """Configured replica alias, or None when there is no replica."""
+    alias = _conf().get("REPLICA", "replica")
+    return alias if alias in connections.settings else None
+
+
+class _RequestPin:
+    __slots__ = ("pinned", "wrote")
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def pinned():
+    if _forced.get():
+        return True
+    state = _request.get()
+    return state is not None and (state.pinned or state.wrote)
+
+
+@contextmanager
+def use_primary():
+    """Read everything from the primary inside this block (also usable as a decorator)."""
+    token = _forced.set(True)
+    try:
+        yield
+    finally:
+        _forced.reset(token)
+
+
+@contextmanager
+def request_scope(pinned=False):
+    """What the middleware does around a request; yields the pin state."""
+    state = _RequestPin(pinned)
+    token = _request.set(state)
+    try:
+        yield state
+    finally:
+        _request.reset(token)
+
+
+# --- Router ---
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replica = replica_alias()
+        if replica is None:
+            return None
+        if model._meta.label in _conf().get("REPLICA_MODELS", ("chatbot.Product",)) and not pinned():
+            return replica
+        return DEFAULT_DB_ALIAS  # explicit: objects fetched from the replica don't drag related reads there
+
+    def db_for_write(self, model, **hints):
+        state = _request.get()
+        if state is not None and model._meta.label not in NEVER_PIN:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        dbs = {DEFAULT_DB_ALIAS, _conf().get("REPLICA", "replica")}
+        if obj1._state.db in dbs and obj2._state.db in dbs:
+            return True  # same data, replicated
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == _conf().get("REPLICA", "replica"):
+            return False  # schema arrives through replication
+        return None
+
+
+# --- Middleware ---
+class ReadYourWritesMiddleware(HybridMiddleware):
+    def __init__(self, get_response):
+        if replica_alias() is None:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.cookie = _conf().get("PIN_COOKIE", "db_pin")
+
+    def _finish(self, state, response):
+        if state.wrote:
+            response.set_cookie(self.cookie, "1", max_age=_conf().get("PIN_SECONDS", 15),
+                                httponly=True, samesite="Lax")
+        return response
+
+    def handle(self, request):
+        with request_scope(self.cookie in request.COOKIES) as state:
+            response = self.get_response(request)
+        return self._finish(state, response)
+
+    async def ahandle(self, request):
+        with request_scope(self.cookie in request.COOKIES) as state:
+            response = await self.get_response(request)
+        return self._finish(state, response)
@@ -0,0 +1,305 @@
+"""
+CPU-only semantic product search.
+
+"light oxidised jhumka for daily wear" jaise descriptions na CATEGORY_SYNONYMS
+se match hote hain na difflib se. Here every product (name + category +
+description) becomes a hashed character n-gram vector (no model download,
+no GPU), and queries go through a small IVF index:
+
+    <DIR>/CURRENT            name of the live version directory
+    <DIR>/v<N>/vectors.npy   float32 [n, dim], rows grouped by IVF list (memory-mapped)
+    <DIR>/v<N>/ids.npy       product id per row
+    <DIR>/v<N>/hashes.npy    content hash per row (incremental rebuilds reuse vectors)
+    <DIR>/v<N>/centroids.npy float32 [nlist, dim]
+    <DIR>/v<N>/offsets.npy   row range of each list
+
+A query scores the centroids, scans only the `nprobe` closest lists and
+returns the best products, so latency stays flat as the catalog grows.
+Incremental rebuilds keep the centroids until the catalog size drifts away
+from the one they were trained for (nlist ~ sqrt(n)); then they're retrained.
+"""
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+from django.conf import settings
+
+from .routers import use_primary
+
+DIM = 512
+NGRAMS = (3, 4, 5)
+_SPACES = re.compile(r"\s+")
+
+
+# --- Embedding ---
+def _features(text):
+    text = _SPACES.sub(" ", (text or "").lower()).strip()
+    padded = f" {text} "
+    feats = [padded[i:i + n] for n in NGRAMS for i in range(len(padded) - n + 1)]
+    feats += ["w:" + word for word in text.split()]
+    return feats
+
+
+def embed(text, dim=DIM):
+    """Signed feature-hashing of char n-grams -> L2 normalized float32 vector."""
+    vec = np.zeros(dim, dtype=np.float32)
+    feats = _features(text)
+    if not feats:
+        return vec
+    hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in feats), dtype=np.uint32, count=len(feats))
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    np.add.at(vec, (hashes % dim).astype(np.intp), signs)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def product_text(name, category, description):
+    # name do baar: title match description se zyada important hai
+    return f"{name} {name} {category or ''} {description or ''}"
+
+
+def content_hash(text):
+    return zlib.crc32(text.encode("utf-8"))
+
+
+# --- IVF training ---
+def train_centroids(vectors, nlist, iterations=10, seed=0):
+    rng = np.random.default_rng(seed)
+    sample = vectors if len(vectors) <= 50 * nlist else vectors[rng.choice(len(vectors), 50 * nlist, replace=False)]
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = sample[assign == c]
+            if len(members):
+                mean = members.mean(axis=0)
+                norm = np.linalg.norm(mean)
+                centroids[c] = mean / norm if norm else mean
+    return centroids.astype(np.float32)
+
+
+def assign_lists(vectors, centroids, chunk=20000):
+    out = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk):
+        out[start:start + chunk] = np.argmax(vectors[start:start + chunk] @ centroids.T, axis=1)
+    return out
+
+
+# --- Index ---
+# nlist ~ sqrt(n) keeps both the centroid scan and each probed list ~ sqrt(n)
+NLIST_DRIFT = 2      # retrain once sqrt(n) is 2x off the trained nlist (n ~4x off nlist²)
+MAX_IMBALANCE = 8    # ...or one list holds 8x its fair share of rows
+MIN_IMBALANCE_ROWS = 256
+
+
+def target_nlist(n):
+    return max(1, min(n, int(np.sqrt(n)) or 1))
+
+
+def needs_retrain(lists, trained_nlist, nlist):
+    if not trained_nlist or trained_nlist * NLIST_DRIFT < nlist or trained_nlist > nlist * NLIST_DRIFT:
+        return True
+    largest = np.bincount(lists, minlength=trained_nlist).max() if len(lists) else 0
+    return largest >= MIN_IMBALANCE_ROWS and largest > MAX_IMBALANCE * len(lists) / trained_nlist
+
+
+class SemanticIndex:
+    def __init__(self, vectors, ids, hashes, centroids, offsets, path=None):
+        self.vectors = vectors
+        self.ids = ids
+        self.hashes = hashes
+        self.centroids = centroids
+        self.offsets = offsets
+        self.path = path
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, path):
+        def arr(name, **kw):
+            return np.load(os.path.join(path, name), **kw)
+        return cls(arr("vectors.npy", mmap_mode="r"), arr("ids.npy"), arr("hashes.npy"),
+                   arr("centroids.npy"), arr("offsets.npy"), path)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name in ("vectors", "ids", "hashes", "centroids", "offsets"):
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        self.path = path
+
+    @classmethod
+    def build(cls, rows, previous=None, nlist=None, dim=DIM):
+        """
+        rows: iterable of (id, text). Vectors of rows whose text hash matches
+        `previous` are reused, and previous centroids are kept, so catalog
+        edits only re-embed what changed. Centroids are retrained when the
+        catalog has outgrown (or shrunk away from) their nlist, or when one
+        list holds far more than its share - see needs_retrain().
+        """
+        rows = list(rows)
+        ids = np.fromiter((pk for pk, _ in rows), dtype=np.int64, count=len(rows))
+        hashes = np.fromiter((content_hash(text) for _, text in rows), dtype=np.uint32, count=len(rows))
+        vectors = np.empty((len(rows), dim), dtype=np.float32)
+
+        reused = {}
+        if previous is not None and previous.vectors.shape[1] == dim:
+            reused = {int(pk): i for i, pk in enumerate(previous.ids)}
+        embedded = 0
+        for i, (pk, text) in enumerate(rows):
+            j = reused.get(pk)
+            if j is not None and previous.hashes[j] == hashes[i]:
+                vectors[i] = previous.vectors[j]
+            else:
+                vectors[i] = embed(text, dim)
+                embedded += 1
+
+        nlist = nlist or target_nlist(len(rows))
+        centroids, lists, retrained = None, None, True
+        if previous is not None and len(previous.centroids) and previous.centroids.shape[1] == dim:
+            centroids = previous.centroids
+            lists = assign_lists(vectors, centroids) if len(rows) else np.zeros(0, np.int32)
+            retrained = needs_retrain(lists, len(centroids), nlist)
+        if retrained:
+            centroids = train_centroids(vectors, nlist) if len(rows) else np.zeros((0, dim), np.float32)
+            lists = assign_lists(vectors, centroids) if len(rows) else np.zeros(0, np.int32)
+
+        order = np.argsort(lists, kind="stable")
+        offsets = np.searchsorted(lists[order], np.arange(len(centroids) + 1)).astype(np.int64)
+        index = cls(vectors[order], ids[order], hashes[order], centroids, offsets)
+        index.embedded = embedded
+        index.retrained = retrained
+        return index
+
+    def search(self, text, k=3, nprobe=8):
+        if not len(self.ids):
+            return []
+        q = embed(text, self.vectors.shape[1])
+        nprobe = min(nprobe, len(self.centroids))
+        probe = np.argpartition(-(self.centroids @ q), nprobe - 1)[:nprobe]
+        rows = np.concatenate([np.arange(self.offsets[c], self.offsets[c + 1]) for c in probe])
+        if not rows.size:
+            return []
+        scores = np.asarray(self.vectors[rows]) @ q
+        k = min(k, rows.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.ids[rows[i]]), float(scores[i])) for i in top]
+
+
+# --- Versioned on-disk index + per-process cache ---
+def index_dir():
+    return getattr(settings, "SEMANTIC_INDEX", {}).get("DIR", os.path.join(settings.BASE_DIR, "semantic_index"))
+
+
+def current_path(directory=None):
+    directory = directory or index_dir()
+    try:
+        with open(os.path.join(directory, "CURRENT")) as f:
+            return os.path.join(directory, f.read().strip())
+    except OSError:
+        return None
+
+
+def publish(index, directory=None, keep=2):
+    """Write index as a new version and atomically flip CURRENT to it."""
+    directory = directory or index_dir()
+    os.makedirs(directory, exist_ok=True)
+    version = f"v{time.time_ns()}"
+    index.save(os.path.join(directory, version))
+    tmp = os.path.join(directory, f"CURRENT.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(directory, "CURRENT"))
+    # purane versions hatao (open mmaps on POSIX stay valid)
+    old = sorted(d for d in os.listdir(directory) if d.startswith("v") and d != version)
+    for name in old[:-keep] if keep else old:
+        path = os.path.join(directory, name)
+        for f in os.listdir(path):
+            os.remove(os.path.join(path, f))
+        os.rmdir(path)
+    return index
+
+
+def catalog_rows():
+    from .models import Product
+
+    for pk, name, category, description in (Product.objects.order_by("id")
+                                            .values_list("id", "name", "category", "description")
+                                            .iterator(chunk_size=5000)):
+        yield pk, product_text(name, category, description)
+
+
+@use_primary()  # runs after catalog edits: the replica may not have them yet
+def rebuild(full=False, directory=None):
+    previous = None
+    if not full:
+        path = current_path(directory)
+        if path:
+            try:
+                previous = SemanticIndex.load(path)
+            except OSError:
+                previous = None
+    return publish(SemanticIndex.build(catalog_rows(), previous=previous), directory)
+
+
+_lock = threading.Lock()
+_loaded = (None, None)  # (path, index)
+_checked_at = 0.0
+
+
+def get_index():
+    """Live index for this worker; CURRENT is re-read at most once per second."""
+    global _loaded, _checked_at
+    now = time.monotonic()
+    if now - _checked_at < 1.0:
+        return _loaded[1]
+    with _lock:
+        _checked_at = now
+        path = current_path()
+        if path and path != _loaded[0]:
+            try:
+                _loaded = (path, SemanticIndex.load(path))
+            except OSError:
+                pass
+        elif not path:
+            _loaded = (None, None)
+    return _loaded[1]
+
+
+def semantic_search(text, k=1):
+    index = get_index()
+    if index is None:
+        return []
+    conf = getattr(settings, "SEMANTIC_INDEX", {})
+    hits = index.search(text, k=k, nprobe=conf.get("NPROBE", 8))
+    return [(pk, score) for pk, score in hits if score >= conf.get("MIN_SCORE", 0.3)]
+
+
+# --- Debounced background rebuild on catalog edits ---
+_rebuild_timer = None
+
+
+def schedule_rebuild(delay=None):
+    global _rebuild_timer
+    conf = getattr(settings, "SEMANTIC_INDEX", {})
+    if not conf.get("AUTO_REBUILD"):
+        return
+    with _lock:
+        if _rebuild_timer is not None:
+            _rebuild_timer.cancel()
+        _rebuild_timer = threading.Timer(conf.get("REBUILD_DELAY", 5.0) if delay is None else delay, _rebuild_in_background)
+        _rebuild_timer.daemon = True
+        _rebuild_timer.start()
+
+
+def _rebuild_in_background():
+    from django.db import connection
+
+    try:
+        rebuild()
+    finally:
+        connection.close()
@@ -0,0 +1,66 @@
+from django.core.signals import request_finished
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import analytics, invalidation, notifications, summaries, tenancy
+from .catalog import CATALOG, bump_catalog_version
+from .models import Lead, Product, QuotationRequest, Store
+
+INTENTS = "intents"
+
+
+# --- Catalog changes -> in-memory snapshot / category summaries refresh ---
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    version = bump_catalog_version()
+    summaries.product_saved(instance, version)
+    from . import semantic  # numpy; loaded on the first catalog edit, not at startup
+    semantic.schedule_rebuild()
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    version = bump_catalog_version()
+    summaries.product_deleted(instance, version)
+    from . import semantic
+    semantic.schedule_rebuild()
+
+
+# --- Store edits -> routing table + that store's index ---
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+def store_changed(sender, instance, **kwargs):
+    tenancy.reset_routes()
+    tenancy.evict_tenant(instance.pk)
+    invalidation.bump(INTENTS)
+
+
+# --- New lead -> outbox row for the notify_leads worker ---
+@receiver(post_save, sender=Lead)
+def lead_created(sender, instance, created, **kwargs):
+    if created:
+        notifications.enqueue(instance)
+
+
+# --- Conversions -> daily rollups (see analytics.py) ---
+@receiver(post_save, sender=Lead)
+def lead_counted(sender, instance, created, **kwargs):
+    if created:
+        analytics.incr(analytics.LEAD, "", instance.store_id, day=timezone.localdate(instance.created_at))
+
+
+@receiver(post_save, sender=QuotationRequest)
+def quotation_counted(sender, instance, created, **kwargs):
+    if created:
+        product = instance.product.name if instance.product_id else ""
+        analytics.incr(analytics.QUOTATION, product, instance.store_id, day=timezone.localdate(instance.created_at))
+
+
+request_finished.connect(analytics.maybe_flush)
+
+
+# --- Same changes made on other workers (see invalidation.py) ---
+invalidation.subscribe(CATALOG, tenancy.refresh_snapshots)
+invalidation.subscribe(CATALOG, summaries.refresh_in_background)
+invalidation.subscribe(INTENTS, tenancy.reset_tenants)
@@ -0,0 +1,137 @@
+"""
+Typo correction for customer messages ("neckless", "earings", "anklet's").
+
+Symmetric-delete (SymSpell style) dictionary: every vocabulary word is stored
+under all its deletions up to MAX_DISTANCE, so correcting a token is just
+generating the token's own deletions and looking them up - no scan over the
+vocabulary. Candidates are verified with a bounded Damerau (OSA) distance and
+ranked by (distance, word frequency).
+
+Vowel confusions beyond distance 2 ("bengals" -> "bangles", "neckless" ->
+"necklace") are caught by a second, exact lookup on a sound-alike key
+(consonant skeleton), accepted at most one edit past the limit. Results are
+memoized per token.
+
+Known words = intents.yml phrases + category synonyms + product names of the
+store; typos are only corrected *to* catalog words (category synonyms and
+product names, see TenantIndex.speller()). Intent phrases are short,
+everyday English - correcting towards them turned "watch" into "which" (and
+so a greeting) and "weight" into "right"; intent typos are left to the
+fuzzy stage.
+"""
+import re
+from collections import Counter
+
+MAX_DISTANCE = 2
+MIN_LENGTH = 4          # "hi", "me", "100" are left alone
+CACHE_SIZE = 50000
+
+_TOKEN_RE = re.compile(r"[a-z][a-z']*")
+_WORD_RE = re.compile(r"[a-z]+")
+_VOWELS = str.maketrans("", "", "aeiouy")
+_REPEATS = re.compile(r"(.)\1+")
+_SOUNDS = ((re.compile(r"c(?=[eiy])"), "s"), (re.compile(r"ph"), "f"), (re.compile(r"ck|c|q"), "k"),
+           (re.compile(r"z"), "s"), (_REPEATS, r"\1"))
+
+
+def vocabulary(phrases):
+    return [word for phrase in phrases for word in _WORD_RE.findall(str(phrase).lower()) if len(word) >= 3]
+
+
+def sound_key(word):
+    """Consonant skeleton: necklace/neckless -> "nkls", bangles/bengals -> "bngls"."""
+    for pattern, repl in _SOUNDS:
+        word = pattern.sub(repl, word)
+    return _REPEATS.sub(r"\1", word[:1] + word[1:].translate(_VOWELS))
+
+
+def _deletes(word, distance):
+    found = {word}
+    edge = {word}
+    for _ in range(distance):
+        edge = {w[:i] + w[i + 1:] for w in edge for i in range(len(w))} - found
+        found |= edge
+    return found
+
+
+def distance(a, b, limit=MAX_DISTANCE):
+    """Optimal string alignment distance, or limit + 1 if it is larger than limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            row[j] = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], prev2[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+        prev2, prev = prev, row
+    return prev[-1] if prev[-1] <= limit else limit + 1
+
+
+class SpellCorrector:
+    def __init__(self, words, max_distance=MAX_DISTANCE, terms=None):
+        """
+        `words`: known words, left as they are. `terms`: the words a typo may
+        be corrected to (default: all of `words`; TenantIndex: catalog words).
+        """
+        self.max_distance = max_distance
+        self.counts = Counter(words)
+        self.deletes = {}
+        self.sounds = {}
+        self.terms = frozenset(self.counts if terms is None else terms)
+        for word, count in self.counts.items():
+            if word not in self.terms:
+                continue
+            for variant in _deletes(word, max_distance):
+                self.deletes.setdefault(variant, []).append(word)
+            if len(word) >= MIN_LENGTH:
+                key = sound_key(word)
+                best = self.sounds.get(key)
+                if best is None or count > self.counts[best]:
+                    self.sounds[key] = word
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.counts)
+
+    def lookup(self, token):
+        """Best vocabulary word for token (token itself if known or uncorrectable)."""
+        cached = self._cache.get(token)
+        if cached is not None:
+            return cached
+        word = token.replace("'", "")
+        if word not in self.counts and len(word) >= MIN_LENGTH:
+            word = self._suggest(word) or word
+        if len(self._cache) >= CACHE_SIZE:
+            self._cache.clear()
+        self._cache[token] = word
+        return word
+
+    def _suggest(self, word):
+        limit = 1 if len(word) <= MIN_LENGTH else self.max_distance
+        candidates = set()
+        for variant in _deletes(word, limit):
+            candidates.update(self.deletes.get(variant, ()))
+        best, best_key = None, None
+        for candidate in candidates:
+            d = distance(word, candidate, limit)
+            if d > limit:
+                continue
+            key = (d, -self.counts[candidate], candidate)
+            if best_key is None or key < best_key:
+                best, best_key = candidate, key
+        if best is not None:
+            return best
+        # sound-alike: only one edit past the limit ("neckless" -> "necklace" is 3), else
+        # ordinary words with a colliding skeleton ("colour" -> "clear") get rewritten
+        sounds_like = self.sounds.get(sound_key(word))
+        if sounds_like is not None and distance(word, sounds_like, limit + 1) <= limit + 1:
+            return sounds_like
+        return None
+
+    def correct(self, text):
+        return _TOKEN_RE.sub(lambda m: self.lookup(m.group(0)), text.lower())
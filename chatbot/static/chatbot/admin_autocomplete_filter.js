@@ -0,0 +1,15 @@
+'use strict';
+// Autocomplete list filter: selecting a product reloads the changelist filtered by it.
+window.addEventListener('load', function() {
+    django.jQuery('select[data-autocomplete-filter]').on('change', function() {
+        const url = new URL(window.location.href);
+        const param = this.dataset.autocompleteFilter;
+        if (this.value) {
+            url.searchParams.set(param, this.value);
+        } else {
+            url.searchParams.delete(param);
+        }
+        url.searchParams.delete('p');
+        window.location.href = url.toString();
+    });
+});
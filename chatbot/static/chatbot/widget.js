@@ -0,0 +1,131 @@
+function sendMessage(customMsg=null) {
+    let input = document.getElementById("userInput");
+    let chatbox = document.getElementById("chatbox");
+    let message = customMsg || input.value;
+
+    if (message.trim() === "") return;
+    hideSuggestions();
+
+    // Show user message
+    let userMsg = document.createElement("div");
+    userMsg.className = "message user";
+    userMsg.innerHTML = `<div class="msg-text">${message}</div><div class="avatar">👤</div>`;
+    chatbox.appendChild(userMsg);
+
+    // Call Django backend
+    fetch(`/get-response/?msg=${encodeURIComponent(message)}`)
+    .then(res => res.json())
+    .then(data => {
+        let botMsg = document.createElement("div");
+        botMsg.className = "message bot";
+        botMsg.innerHTML = `<div class="avatar">🤖</div><div class="msg-text">${data.reply}</div>`;
+        chatbox.appendChild(botMsg);
+
+        // Agar product image hai
+        if (data.img) {
+            let productCard = document.createElement("div");
+            productCard.className = "product-card";
+            productCard.innerHTML = `
+                <img src="${data.img}" alt="Product">
+                <button class="add-btn" onclick="sendMessage('add')">➕ Add to Cart</button>
+            `;
+            chatbox.appendChild(productCard);
+        }
+
+        chatbox.scrollTop = chatbox.scrollHeight;
+
+        if (message.toLowerCase() === "end") {
+            setTimeout(() => { chatbox.innerHTML = ""; }, 1000);
+        }
+    })
+    .catch(err => {
+        let errorMsg = document.createElement("div");
+        errorMsg.className = "message bot";
+        errorMsg.innerHTML = `<div class="avatar">⚠️</div><div class="msg-text">Error: Could not connect to server.</div>`;
+        chatbox.appendChild(errorMsg);
+    });
+
+    input.value = "";
+}
+
+function endConversation() {
+    sendMessage("end");
+}
+
+
+// --- Typeahead: debounced /suggest/ calls, so users pick exact product names ---
+const SUGGEST_DELAY_MS = 150;
+const SUGGEST_MIN_CHARS = 2;
+const suggestCache = new Map();  // prefix -> suggestions (server also sends Cache-Control)
+let suggestTimer = null;
+let suggestAbort = null;
+let activeSuggestion = -1;
+
+function hideSuggestions() {
+    clearTimeout(suggestTimer);
+    if (suggestAbort) suggestAbort.abort();
+    let list = document.getElementById("suggestions");
+    list.innerHTML = "";
+    list.hidden = true;
+    activeSuggestion = -1;
+}
+
+function renderSuggestions(items) {
+    let list = document.getElementById("suggestions");
+    list.innerHTML = "";
+    activeSuggestion = -1;
+    items.forEach(item => {
+        let li = document.createElement("li");
+        li.className = `suggestion ${item.kind}`;
+        li.setAttribute("role", "option");
+        li.textContent = item.text;
+        // mousedown (not click): fires before the input loses focus
+        li.addEventListener("mousedown", e => { e.preventDefault(); sendMessage(item.text); });
+        list.appendChild(li);
+    });
+    list.hidden = items.length === 0;
+}
+
+function fetchSuggestions(q) {
+    if (suggestCache.has(q)) return renderSuggestions(suggestCache.get(q));
+    if (suggestAbort) suggestAbort.abort();  // only the latest keystroke matters
+    suggestAbort = new AbortController();
+    fetch(`/suggest/?q=${encodeURIComponent(q)}`, { signal: suggestAbort.signal })
+    .then(res => res.json())
+    .then(data => {
+        suggestCache.set(q, data.suggestions);
+        if (document.getElementById("userInput").value.trim().toLowerCase() === q) renderSuggestions(data.suggestions);
+    })
+    .catch(() => {});  // aborted or offline: no suggestions, chat still works
+}
+
+function moveSuggestion(step) {
+    let items = document.querySelectorAll("#suggestions .suggestion");
+    if (!items.length) return false;
+    if (activeSuggestion >= 0) items[activeSuggestion].classList.remove("active");
+    activeSuggestion = (activeSuggestion + step + items.length) % items.length;
+    items[activeSuggestion].classList.add("active");
+    return true;
+}
+
+(function setupTypeahead() {
+    let input = document.getElementById("userInput");
+    input.addEventListener("input", () => {
+        let q = input.value.trim().toLowerCase();
+        clearTimeout(suggestTimer);
+        if (q.length < SUGGEST_MIN_CHARS) return hideSuggestions();
+        suggestTimer = setTimeout(() => fetchSuggestions(q), SUGGEST_DELAY_MS);
+    });
+    input.addEventListener("keydown", e => {
+        if (e.key === "ArrowDown" || e.key === "ArrowUp") {
+            if (moveSuggestion(e.key === "ArrowDown" ? 1 : -1)) e.preventDefault();
+        } else if (e.key === "Enter") {
+            let active = document.querySelectorAll("#suggestions .suggestion")[activeSuggestion];
+            sendMessage(active ? active.textContent : null);
+        } else if (e.key === "Escape") {
+            hideSuggestions();
+        }
+    });
+    input.addEventListener("blur", hideSuggestions);
+})();
+
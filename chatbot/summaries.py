@@ -0,0 +1,168 @@
+"""
+Precomputed per-category product summaries.
+
+"show me rings" jaise questions ka answer sirf catalog change hone par badalta
+hai, so we keep a map of (store, lowercased category) -> CategorySummary (count,
+min/max price, cheapest-5, best-seller-5 and ready-to-send reply per
+channel). The map is built once on first use and then refreshed one
+category at a time from Product post_save/post_delete, so a category
+answer is a dict lookup. Edits made on other workers arrive through the
+catalog version (invalidation.py) and trigger a full background rebuild.
+"""
+import threading
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max, Min
+
+from .aio import on_event_loop
+from .catalog import acatalog_version, catalog_version
+from .formatting import FORMATTERS
+from .routers import use_primary
+
+SUMMARY_SIZE = 5
+REPLY_HEADER = "🔎 Matching items:"
+
+SummaryItem = namedtuple("SummaryItem", ["id", "name", "price"])
+CategorySummary = namedtuple(
+    "CategorySummary",
+    ["category", "count", "min_price", "max_price", "cheapest", "best_sellers", "replies"],
+)
+
+_lock = threading.RLock()
+_summaries = {}         # (store id, "rings") -> CategorySummary
+_product_category = {}  # product id -> (store id, "rings") (to refresh the old key on edits)
+_built = False
+_built_version = None   # catalog version the map reflects
+
+
+def _items(queryset):
+    return tuple(SummaryItem(*row) for row in queryset.values_list("id", "name", "price")[:SUMMARY_SIZE])
+
+
+@use_primary()  # summaries are cached under the catalog version: read the primary
+def summarize(category, store_id=None):
+    """Build one category's summary from the DB (None if the category is empty)."""
+    from .models import Product
+
+    products = Product.objects.for_store(store_id).filter(category__iexact=category)
+    stats = products.aggregate(count=Count("id"), min_price=Min("price"), max_price=Max("price"))
+    if not stats["count"]:
+        return None
+    rows = list(products.order_by("price", "id").values_list("id", "name", "price", "category")[:SUMMARY_SIZE])
+    cheapest = tuple(SummaryItem(*row[:3]) for row in rows)
+    best_sellers = _items(products.filter(best_seller=True).order_by("price", "id"))
+    return CategorySummary(
+        category=rows[0][3],
+        count=stats["count"],
+        min_price=stats["min_price"],
+        max_price=stats["max_price"],
+        cheapest=cheapest,
+        best_sellers=best_sellers,
+        replies={channel: fmt(cheapest, REPLY_HEADER) for channel, fmt in FORMATTERS.items()},
+    )
+
+
+@use_primary()
+def build_all():
+    from .models import Product
+
+    global _built, _built_version
+    with _lock:
+        version = catalog_version()
+        _summaries.clear()
+        _product_category.clear()
+        keys = set()
+        for pk, store_id, category in Product.objects.values_list("id", "store_id", "category").iterator():
+            key = (store_id, (category or "").lower())
+            _product_category[pk] = key
+            keys.add(key)
+        for store_id, category in keys:
+            summary = summarize(category, store_id)
+            if summary:
+                _summaries[(store_id, category)] = summary
+        _built = True
+        _built_version = version
+
+
+def refresh_category(category, store_id=None):
+    key = (store_id, (category or "").lower())
+    summary = summarize(key[1], store_id)
+    with _lock:
+        if summary:
+            _summaries[key] = summary
+        else:
+            _summaries.pop(key, None)
+
+
+def get_category_summary(category, store_id=None):
+    if not category:
+        return None
+    if not _built:
+        with _lock:
+            if not _built:  # cold start: whoever got the lock first already built it
+                build_all()
+    elif _built_version != catalog_version() and not on_event_loop() and _lock.acquire(blocking=False):
+        # catalog changed on another worker; if a background rebuild already
+        # holds the lock (or we're on the event loop), keep answering from the
+        # current map meanwhile
+        try:
+            if _built_version != catalog_version():
+                build_all()
+        finally:
+            _lock.release()
+    return _summaries.get((store_id, category.lower()))
+
+
+async def aget_category_summary(category, store_id=None):
+    """get_category_summary for async code: a (re)build runs in a thread."""
+    if category and (not _built or _built_version != await acatalog_version()):
+        return await sync_to_async(get_category_summary)(category, store_id)
+    return get_category_summary(category, store_id)
+
+
+def refresh_in_background():
+    if _built:
+        build_all()
+
+
+# --- Incremental refresh (wired in signals.py) ---
+def _advance(version):
+    # our own bump: the incremental refresh below keeps the map current. If
+    # another worker bumped in between, leave it stale for a full rebuild.
+    global _built_version
+    if version is not None and _built_version == version - 1:
+        _built_version = version
+
+
+def product_saved(instance, version=None):
+    if not _built:
+        return
+    _advance(version)
+    new = (instance.store_id, (instance.category or "").lower())
+    with _lock:
+        old = _product_category.get(instance.pk)
+        _product_category[instance.pk] = new
+    refresh_category(new[1], new[0])
+    if old is not None and old != new:
+        refresh_category(old[1], old[0])
+
+
+def product_deleted(instance, version=None):
+    if not _built:
+        return
+    _advance(version)
+    with _lock:
+        old = _product_category.pop(instance.pk, None)
+    if old is None:
+        old = (instance.store_id, instance.category)
+    refresh_category(old[1], old[0])
+
+
+def invalidate():
+    global _built, _built_version
+    with _lock:
+        _built = False
+        _built_version = None
+        _summaries.clear()
+        _product_category.clear()
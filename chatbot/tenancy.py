@@ -0,0 +1,298 @@
+"""
+Multi-store tenancy.
+
+Ek deployment, kai storefronts: every request is mapped to a Store (by the
+Twilio "To" number on the WhatsApp webhook, otherwise by Host header) and the
+engine answers from that store's TenantIndex - its intents.yml variant,
+category synonyms, business-info replies and catalog snapshot.
+
+Indexes are built lazily and kept in a small LRU (settings.CHAT_TENANT_CACHE_SIZE),
+so cold stores are evicted instead of every worker holding every catalog.
+Phrases are interned and identical phrase tuples are shared, so stores that
+use the same intents file (the common case) don't pay for a copy each.
+store=None is the default/single-store tenant (rows with no store set).
+"""
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import yaml
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+
+from . import typeahead
+from .aio import HybridMiddleware
+from .catalog import CatalogSnapshot, acatalog_version, catalog_version
+from .spelling import SpellCorrector, vocabulary
+
+logger = logging.getLogger(__name__)
+
+INTENTS_DIR = os.path.join(os.path.dirname(__file__), "intents")
+DEFAULT_INTENTS_FILE = "intents.yml"
+
+DEFAULT_BUSINESS_INFO = {
+    "store": "🏬 Our store is located at: Mumbai, India. We also deliver PAN-India 🌍",
+    "catalog": "📖 You can view our full catalog on our website or ask me for specific categories.",
+    "customize": "🎨 Yes, we do customize silver jewelry on request.",
+    "gold": "✨ We specialize in silver jewelry only, not gold.",
+    "default": "ℹ️ We are a silver jewelry manufacturer. Ask me about store, catalog, or customization.",
+}
+
+
+# --- Shared phrase storage ---
+_shared_lock = threading.Lock()
+_shared_tuples = {}
+
+
+def intern_phrases(phrases):
+    """Interned, lowercased phrase tuple; equal tuples are shared across tenants."""
+    value = tuple(sys.intern(str(p).lower()) for p in phrases)
+    with _shared_lock:
+        return _shared_tuples.setdefault(value, value)
+
+
+@lru_cache(maxsize=64)
+def load_intents_file(name=DEFAULT_INTENTS_FILE):
+    path = os.path.join(INTENTS_DIR, os.path.basename(name or DEFAULT_INTENTS_FILE))
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f)
+    return data["intents"], data.get("categories", {})
+
+
+class TenantIndex:
+    """Per-store matching data + lazily built catalog snapshot."""
+
+    def __init__(self, store_id, intents, categories, business_info=None):
+        self.store_id = store_id
+        self.intents = {sys.intern(intent): intern_phrases(phrases) for intent, phrases in intents.items()}
+        # substring stage tries longer phrases first
+        self.by_length = {
+            intent: intern_phrases(sorted(phrases, key=len, reverse=True))
+            for intent, phrases in self.intents.items()
+        }
+        self.exact = {}
+        for intent, phrases in self.intents.items():
+            for phrase in phrases:
+                self.exact.setdefault(phrase, intent)
+        self.categories = {sys.intern(k.lower()): sys.intern(v) for k, v in categories.items()}
+        # whole words, longest first: "earrings" must not match the "ring" key
+        keys = sorted(self.categories, key=len, reverse=True)
+        self.category_re = re.compile(r"\b(%s)\b" % "|".join(map(re.escape, keys))) if keys else None
+        self.business_info = {**DEFAULT_BUSINESS_INFO, **(business_info or {})}
+        self._snapshot = None
+        self._speller = (None, None)  # (snapshot version, SpellCorrector)
+        self._typeahead = (None, 0.0, None)  # (snapshot version, built at, RadixTrie)
+        self._typeahead_refreshing = False
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()  # held by the background rebuild thread
+
+    @classmethod
+    def for_store(cls, store):
+        if store is None:
+            intents, categories = load_intents_file()
+            return cls(None, intents, categories)
+        intents, categories = load_intents_file(store.intents_file or DEFAULT_INTENTS_FILE)
+        return cls(store.pk, intents, categories, store.business_info)
+
+    def snapshot(self):
+        """
+        Current catalog snapshot. Only a cold index builds on the calling
+        thread; after a catalog change the old snapshot keeps being served
+        while a background thread rebuilds and swaps it in.
+        """
+        version = catalog_version()
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                return self._rebuild(version)
+        if snapshot.version != version:
+            self.refresh_in_background()
+        return snapshot
+
+    def refresh_in_background(self):
+        """Start a snapshot rebuild thread unless one is already running."""
+        if not self._refreshing.acquire(blocking=False):
+            return
+        name = f"rebuild-snapshot-{self.store_id or 'default'}"
+        threading.Thread(target=self._refresh, name=name, daemon=True).start()
+
+    def _refresh(self):
+        try:
+            self.refresh_snapshot()
+        except Exception:
+            logger.exception("catalog snapshot rebuild for store %s failed", self.store_id)
+        finally:
+            self._refreshing.release()
+            connection.close()  # thread ka apna DB connection
+
+    async def awarm(self):
+        """Async engine: build a cold snapshot / stale speller in a thread (no-op when warm)."""
+        version = await acatalog_version()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != version or self._speller[0] != snapshot.version:
+            await sync_to_async(self.speller)()
+
+    def refresh_snapshot(self):
+        """Background rebuild after another worker changed the catalog."""
+        if self._snapshot is None:
+            return  # never used on this worker, build lazily
+        with self._lock:
+            self._rebuild(catalog_version())
+
+    def speller(self):
+        """Typo corrector over intent phrases, category synonyms and this store's product names."""
+        snapshot = self.snapshot()
+        version, speller = self._speller
+        if speller is None or version != snapshot.version:
+            phrases = [p for ps in self.intents.values() for p in ps]
+            # category words count extra so "rngs" prefers "rings" over a rare product word
+            catalog_words = vocabulary(self.categories) + vocabulary(i.name for i in snapshot.items)
+            words = vocabulary(phrases) + vocabulary(self.categories) * 4 + catalog_words
+            speller = SpellCorrector(words, terms=catalog_words)
+            self._speller = (snapshot.version, speller)
+        return speller
+
+    def typeahead(self):
+        """Prefix trie for /suggest/; rebuilt in the background on catalog changes and every REFRESH_SECONDS."""
+        snapshot = self.snapshot()
+        version, built_at, trie = self._typeahead
+        if trie is None:
+            return self._build_typeahead(snapshot)
+        refresh = getattr(settings, "CHAT_TYPEAHEAD", {}).get("REFRESH_SECONDS", 600)
+        stale = version != snapshot.version or time.monotonic() - built_at > refresh
+        if stale and not self._typeahead_refreshing:  # keep serving the old trie meanwhile
+            self._typeahead_refreshing = True
+            threading.Thread(target=self._refresh_typeahead, name="typeahead-refresh", daemon=True).start()
+        return trie
+
+    def _build_typeahead(self, snapshot):
+        trie = typeahead.build(snapshot.items, self.categories, self.intents, typeahead.popularity(self.store_id))
+        self._typeahead = (snapshot.version, time.monotonic(), trie)
+        return trie
+
+    def _refresh_typeahead(self):
+        try:
+            self._build_typeahead(self.snapshot())
+        finally:
+            self._typeahead_refreshing = False
+            connection.close()  # thread ka apna DB connection
+
+    def _rebuild(self, version):
+        if self._snapshot is None or self._snapshot.version != version:
+            self._snapshot = CatalogSnapshot.from_db(version, store=self.store_id)
+        return self._snapshot
+
+
+# --- LRU of tenant indexes ---
+_lock = threading.Lock()
+_indexes = OrderedDict()  # store id (None = default) -> TenantIndex
+
+
+def get_tenant_index(store=None):
+    key = store.pk if store is not None else None
+    with _lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+    index = TenantIndex.for_store(store)  # build outside the lock
+    with _lock:
+        index = _indexes.setdefault(key, index)
+        _indexes.move_to_end(key)
+        while len(_indexes) > getattr(settings, "CHAT_TENANT_CACHE_SIZE", 32):
+            _indexes.popitem(last=False)  # coldest tenant
+    return index
+
+
+def evict_tenant(store_id):
+    with _lock:
+        _indexes.pop(store_id, None)
+
+
+def refresh_snapshots():
+    with _lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        index.refresh_snapshot()
+
+
+def reset_tenants():
+    reset_routes()
+    with _lock:
+        _indexes.clear()
+
+
+# --- Request -> Store resolution ---
+_routes = None  # (hosts {host: Store}, numbers {"+1415...": Store})
+_routes_lock = threading.Lock()
+
+
+def normalize_number(number):
+    number = (number or "").strip()
+    if number.startswith("whatsapp:"):
+        number = number[len("whatsapp:"):]
+    return number.replace(" ", "")
+
+
+def _load_routes():
+    from .models import Store
+
+    hosts, numbers = {}, {}
+    for store in Store.objects.filter(is_active=True):
+        for host in store.hosts.split(","):
+            if host.strip():
+                hosts[host.strip().lower()] = store
+        if store.whatsapp_number:
+            numbers[normalize_number(store.whatsapp_number)] = store
+    return hosts, numbers
+
+
+def get_routes():
+    global _routes
+    routes = _routes
+    if routes is None:
+        with _routes_lock:
+            if _routes is None:
+                _routes = _load_routes()
+            routes = _routes
+    return routes
+
+
+async def aget_routes():
+    routes = _routes
+    if routes is None:
+        routes = await sync_to_async(get_routes)()
+    return routes
+
+
+def reset_routes():
+    global _routes
+    with _routes_lock:
+        _routes = None
+
+
+def resolve_store(request, routes=None):
+    hosts, numbers = routes or get_routes()
+    if not hosts and not numbers:
+        return None  # single-store deployment
+    if request.method == "POST" and request.path.rstrip("/").endswith("whatsapp-webhook"):
+        store = numbers.get(normalize_number(request.POST.get("To")))
+        if store is not None:
+            return store
+    return hosts.get(request.get_host().split(":")[0].lower())
+
+
+class TenantMiddleware(HybridMiddleware):
+    def handle(self, request):
+        request.store = resolve_store(request)
+        return self.get_response(request)
+
+    async def ahandle(self, request):
+        request.store = resolve_store(request, await aget_routes())
+        return await self.get_response(request)
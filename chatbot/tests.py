@@ -1,3 +1,1319 @@
-from django.test import TestCase
+import csv
+import glob
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.models import F
+from django.test import (AsyncRequestFactory, Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import analytics, invalidation, media, metrics, notifications, partitions, pricing, profiling, routers, semantic, spelling, summaries, tenancy, transcripts, typeahead, views
+from .catalog import CATALOG, CatalogItem, CatalogSnapshot, catalog_version, get_snapshot
+from .models import CacheVersion, DailyRollup, Lead, LeadNotification, Product, QuotationRequest, Store
+from .ratelimit import CacheBackend, MemoryBackend, client_ip, reset_limiter
+from .whatsapp import twiml_message
 
 # Create your tests here.
+
+# templates render {% static %} without a collectstatic manifest in tests
+PLAIN_STATIC = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+# --- DB connection stress ---
+class DbStressCommandTests(TransactionTestCase):
+    def test_reports_latency_and_connection_churn(self):
+        out = StringIO()
+        call_command("db_stress", threads=4, requests=10, stdout=out)
+        report = out.getvalue()
+        self.assertIn("requests=40 errors=0", report)
+        self.assertIn("physical_connections=", report)
+        self.assertIn("p99=", report)
+
+
+# --- Catalog snapshot ---
+class CatalogSnapshotTests(TestCase):
+    def setUp(self):
+        # versions live in the DB now and restart after each test's rollback
+        invalidation._versions.pop(CATALOG, None)
+        self.addCleanup(tenancy.reset_tenants)
+
+    def make_snapshot(self):
+        items = [
+            CatalogItem(1, "Silver Ring", 900, "Rings", False, "", ""),
+            CatalogItem(2, "Oxidised Ring", 1500, "rings", True, "", ""),
+            CatalogItem(3, "Kada Bangle", 2500, "Bangles", False, "", ""),
+            CatalogItem(4, "Toe Ring", 400, "Rings", False, "", ""),
+            CatalogItem(5, "Temple Necklace", 8000, "Necklaces", False, "", ""),
+        ]
+        return CatalogSnapshot(items)
+
+    def test_category_under_is_sorted_by_price(self):
+        names = [p.name for p in self.make_snapshot().under(1500, "Rings")]
+        self.assertEqual(names, ["Toe Ring", "Silver Ring", "Oxidised Ring"])
+
+    def test_above_cheapest_and_most_expensive(self):
+        snapshot = self.make_snapshot()
+        self.assertEqual([p.id for p in snapshot.above(2000)], [3, 5])
+        self.assertEqual([p.id for p in snapshot.cheapest(k=2)], [4, 1])
+        self.assertEqual([p.id for p in snapshot.most_expensive("rings", k=1)], [2])
+        self.assertEqual(snapshot.under(1000, "Gold"), [])
+
+    def test_price_filter_reply(self):
+        Product.objects.create(name="Silver Ring", price=900, category="Rings")
+        Product.objects.create(name="Kada Bangle", price=1200, category="Bangles")
+        reply = self.client.get("/get-response/", {"msg": "rings under 1000"}).json()["reply"]
+        self.assertIn("Rings under ₹1000", reply)
+        self.assertIn("Silver Ring", reply)
+        self.assertNotIn("Kada Bangle", reply)
+
+
+# --- Import cost / WhatsApp channel ---
+class ImportTimeTests(SimpleTestCase):
+    # budget for a cold worker start: django.setup() + `import chatbot.views`
+    # (apps.ready pulls in signals, tenancy, summaries... so they count too)
+    BUDGET_MS = float(os.environ.get("CHAT_VIEWS_IMPORT_BUDGET_MS", "1500"))
+    HEAVY_MODULES = ("numpy", "twilio", "aiohttp", "requests")
+
+    def test_views_import_budget(self):
+        code = (
+            "import json, sys, time; start = time.perf_counter(); "
+            "import django; django.setup(); import chatbot.views; "
+            "print(json.dumps([(time.perf_counter() - start) * 1000, "
+            f"[m for m in {self.HEAVY_MODULES!r} if m in sys.modules]]))"
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE="jewelry_chatbot.settings")
+        proc = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        elapsed_ms, loaded = json.loads(proc.stdout.strip().splitlines()[-1])
+        self.assertEqual(loaded, [], "heavy modules imported at worker startup")
+        self.assertLess(elapsed_ms, self.BUDGET_MS)
+
+
+class WhatsAppTests(TestCase):
+    def test_twiml_writer_escapes_body(self):
+        self.assertEqual(
+            twiml_message("a < b & ₹"),
+            '<?xml version="1.0" encoding="UTF-8"?><Response><Message>a &lt; b &amp; ₹</Message></Response>',
+        )
+
+    def test_webhook_replies_with_twiml(self):
+        resp = self.client.post("/whatsapp-webhook/", {"Body": "hi", "From": "whatsapp:+911234567890"})
+        self.assertEqual(resp["Content-Type"], "application/xml")
+        self.assertIn("<Message>Hi 👋", resp.content.decode())
+
+
+# --- Rate limiting ---
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class MemoryBackendTests(SimpleTestCase):
+    def test_burst_then_refill(self):
+        clock = FakeClock()
+        limiter = MemoryBackend(rate=60, period=60, burst=3, clock=clock)
+        self.assertEqual([limiter.allow("a")[0] for _ in range(4)], [True, True, True, False])
+        self.assertEqual(limiter.allow("a"), (False, 1))
+        self.assertTrue(limiter.allow("b")[0])  # per-sender buckets
+
+        clock.now += 1
+        self.assertTrue(limiter.allow("a")[0])
+        self.assertFalse(limiter.allow("a")[0])
+
+    def test_key_table_is_bounded(self):
+        limiter = MemoryBackend(rate=1, period=60, burst=1, max_keys=2)
+        for key in "abc":
+            limiter.allow(key)
+        self.assertEqual(limiter.tracked_keys(), 2)
+
+
+class CacheBackendTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.clock.now = 6000.0  # start of a window
+        self.limiter = CacheBackend(rate=3, period=60, prefix=f"rl-test-{self._testMethodName}", clock=self.clock)
+
+    def test_sliding_window_counts_the_previous_window(self):
+        self.assertEqual([self.limiter.allow("a")[0] for _ in range(4)], [True, True, True, False])
+        self.assertTrue(self.limiter.allow("b")[0])  # per-sender counters
+
+        self.clock.now += 60 + 15  # next window, 25% in: 4 (incl. the denied one) × 0.75 still counts
+        allowed, retry_after = self.limiter.allow("a")
+        self.assertFalse(allowed)
+        self.assertEqual(retry_after, 45)
+
+        self.clock.now += 30  # 75% in: 4 × 0.25 + 2
+        self.assertTrue(self.limiter.allow("a")[0])
+
+    def test_async_path_shares_the_counters(self):
+        async def run():
+            return [(await self.limiter.aallow("a"))[0] for _ in range(2)]
+        self.limiter.allow("a")
+        self.assertEqual(async_to_sync(run)(), [True, True])
+        self.assertFalse(self.limiter.allow("a")[0])
+
+
+RATE_LIMIT_2 = {"BACKEND": "chatbot.ratelimit.MemoryBackend", "RATE": 1, "PERIOD": 60, "BURST": 2}
+
+
+@override_settings(CHAT_RATE_LIMIT=RATE_LIMIT_2, METRICS_TOKEN="s3cret")
+class RateLimitedViewTests(TestCase):
+    def setUp(self):
+        reset_limiter()
+        metrics.reset()
+        self.addCleanup(reset_limiter)
+        self.client.get("/get-response/", {"msg": "hi"})  # first message creates the session cookie
+        self.client.get("/get-response/", {"msg": "hi"})  # ...which is keyed on once it's found in the store
+        metrics.reset()
+
+    def test_web_endpoint_returns_429_without_db_work(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get("/get-response/", {"msg": "hi"}).status_code, 200)
+        with self.assertNumQueries(0):
+            resp = self.client.get("/get-response/", {"msg": "hi"})
+        self.assertEqual(resp.status_code, 429)
+        self.assertIn("Retry-After", resp)
+
+    def test_made_up_session_cookies_share_the_ip_budget(self):
+        client = Client(REMOTE_ADDR="10.0.0.9")
+        statuses = []
+        for i in range(3):
+            client.cookies[settings.SESSION_COOKIE_NAME] = f"random{i:026d}"
+            statuses.append(client.get("/get-response/", {"msg": "hi"}, HTTP_X_FORWARDED_FOR=f"1.2.3.{i}, 10.0.0.9")
+                            .status_code)
+        self.assertEqual(statuses, [200, 200, 429])  # spoofed left-most X-Forwarded-For ignored too
+
+    def test_client_ip_uses_the_trusted_proxy_hop(self):
+        request = RequestFactory().get("/", HTTP_X_FORWARDED_FOR="6.6.6.6, 203.0.113.7", REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(client_ip(request), "203.0.113.7")
+        with override_settings(CHAT_RATE_LIMIT={**RATE_LIMIT_2, "PROXY_HOPS": 0}):
+            self.assertEqual(client_ip(request), "10.0.0.1")
+        with override_settings(CHAT_RATE_LIMIT={**RATE_LIMIT_2, "PROXY_HOPS": 3}):
+            self.assertEqual(client_ip(request), "10.0.0.1")  # fewer hops than proxies: header not trusted
+
+    def test_whatsapp_limits_per_sender(self):
+        spam = {"Body": "hi", "From": "whatsapp:+910000000001"}
+        for _ in range(3):
+            resp = self.client.post("/whatsapp-webhook/", spam)
+        self.assertIn("too fast", resp.content.decode())
+
+        other = self.client.post("/whatsapp-webhook/", {"Body": "hi", "From": "whatsapp:+910000000002"})
+        self.assertIn("SilverBot", other.content.decode())
+
+    def test_metrics_expose_limiter_state(self):
+        for _ in range(3):
+            self.client.get("/get-response/", {"msg": "hi"})
+        self.assertEqual(self.client.get("/metrics/").status_code, 403)
+        data = self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer s3cret").json()
+        self.assertEqual(data["ratelimit.allowed.web"], 2)
+        self.assertEqual(data["ratelimit.limited.web"], 1)
+        self.assertEqual(data["ratelimit.tracked_keys"], 2)  # cookie-less first message + session
+
+
+# --- Category summaries ---
+class CategorySummaryTests(TestCase):
+    def setUp(self):
+        summaries.invalidate()
+        self.addCleanup(summaries.invalidate)
+        self.ring = Product.objects.create(name="Silver Ring", price=900, category="Rings", best_seller=True)
+        Product.objects.create(name="Toe Ring", price=400, category="Rings")
+        Product.objects.create(name="Kada Bangle", price=2500, category="Bangles")
+
+    def test_summary_contents(self):
+        summary = summaries.get_category_summary("rings")
+        self.assertEqual((summary.category, summary.count), ("Rings", 2))
+        self.assertEqual((summary.min_price, summary.max_price), (400, 900))
+        self.assertEqual([p.name for p in summary.cheapest], ["Toe Ring", "Silver Ring"])
+        self.assertEqual([p.name for p in summary.best_sellers], ["Silver Ring"])
+        self.assertIn("- Toe Ring (₹400.00)<br>", summary.replies["web"])
+        self.assertIn("- Toe Ring (₹400.00)\n", summary.replies["whatsapp"])
+
+    def test_lookup_is_query_free_once_built(self):
+        summaries.get_category_summary("rings")
+        with self.assertNumQueries(0):
+            self.assertEqual(summaries.get_category_summary("Bangles").count, 1)
+
+    def test_cold_cache_is_built_once(self):
+        with mock.patch.object(summaries, "build_all", wraps=summaries.build_all) as build_all:
+            with summaries._lock:  # first request building; the others queue up on the lock
+                threads = [threading.Thread(target=summaries.get_category_summary, args=("rings",))
+                           for _ in range(4)]
+                for thread in threads:
+                    thread.start()
+                time.sleep(0.05)
+                summaries.build_all()
+            for thread in threads:
+                thread.join(5)
+        self.assertEqual(build_all.call_count, 1)
+
+    def test_refreshed_incrementally_on_save_and_delete(self):
+        summaries.get_category_summary("rings")
+        self.ring.category = "Bangles"
+        self.ring.save()
+        self.assertEqual(summaries.get_category_summary("rings").count, 1)
+        self.assertEqual(summaries.get_category_summary("bangles").count, 2)
+
+        Product.objects.get(name="Toe Ring").delete()
+        self.assertIsNone(summaries.get_category_summary("rings"))
+
+    def test_category_reply_per_channel(self):
+        web = self.client.get("/get-response/", {"msg": "show me rings"}).json()["reply"]
+        self.assertTrue(web.startswith("🔎 Matching items:<br>- Toe Ring"))
+        wa = self.client.post("/whatsapp-webhook/", {"Body": "show me rings", "From": "whatsapp:+91999"})
+        self.assertIn("🔎 Matching items:\n- Toe Ring", wa.content.decode())
+
+
+# --- Admin changelists ---
+@override_settings(STORAGES=PLAIN_STATIC)
+class AdminChangelistQueryTests(TestCase):
+    # session + user + store filter + count + rows, then category filter values
+    # (product) or date_hierarchy min/max + distinct days (quotation, lead);
+    # must not grow per row
+    EXPECTED_QUERIES = {
+        "/admin/chatbot/product/": 6,
+        "/admin/chatbot/quotationrequest/": 7,
+        "/admin/chatbot/lead/": 7,
+    }
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.client.force_login(self.admin)
+        self.client.get("/admin/")  # warm per-process caches (store routing table)
+
+    def add_rows(self, n):
+        for i in range(n):
+            product = Product.objects.create(name=f"Ring {i}", price=100 + i, category="Rings")
+            QuotationRequest.objects.create(customer_name=f"C{i}", contact="99", product=product, quantity=1)
+            Lead.objects.create(name=f"L{i}", phone="99")
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_changelist_query_counts(self):
+        self.add_rows(3)
+        small = {url: self.count_queries(url) for url in self.EXPECTED_QUERIES}
+        self.add_rows(15)
+        for url, expected in self.EXPECTED_QUERIES.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), small[url])
+                with self.assertNumQueries(expected):
+                    self.client.get(url)
+
+    def test_product_filter_does_not_list_products(self):
+        self.add_rows(3)
+        product = Product.objects.get(name="Ring 1")
+        resp = self.client.get("/admin/chatbot/quotationrequest/", {"product__id__exact": product.pk})
+        html = resp.content.decode()
+        self.assertIn("data-autocomplete-filter", html)
+        self.assertNotIn("?product__id__exact=%s" % Product.objects.get(name="Ring 2").pk, html)
+        self.assertEqual(list(resp.context["cl"].queryset), list(product.quotationrequest_set.all()))
+
+
+# --- Conversation transcripts ---
+class TranscriptRecorderTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        metrics.reset()
+
+    def test_rotates_into_compressed_segments(self):
+        recorder = transcripts.TranscriptRecorder(self.dir, max_bytes=200, flush_interval=0.05)
+        for i in range(10):
+            recorder.record({"message": f"msg {i}", "intent": "greeting"})
+            time.sleep(0.01)  # spread over several writer batches
+        recorder.close()
+        segments = sorted(glob.glob(os.path.join(self.dir, "*.jsonl.gz")))
+        self.assertGreater(len(segments), 1)
+        self.assertEqual(glob.glob(os.path.join(self.dir, "*.part")), [])
+        messages = [r["message"] for path in segments for r in transcripts.read_segment(path)]
+        self.assertEqual(sorted(messages), sorted(f"msg {i}" for i in range(10)))
+
+    def test_dead_writers_part_segment_is_finalized(self):
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        orphan = os.path.join(self.dir, f"transcripts-20261019T101500-{dead.pid}-0001.jsonl.gz.part")
+        with gzip.open(orphan, "wb") as f:
+            f.write(b'{"message": "hi"}\n')
+        live = os.path.join(self.dir, f"transcripts-20261019T101500-{os.getpid()}-0009.jsonl.gz.part")
+        open(live, "wb").close()
+
+        self.assertEqual(transcripts.finalize_orphans(self.dir), [orphan[:-len(".part")]])
+        self.assertTrue(os.path.exists(live))
+        self.assertEqual([r["message"] for r in transcripts.read_segment(orphan[:-len(".part")])], ["hi"])
+
+    def test_contact_details_are_masked(self):
+        self.assertEqual(transcripts.mask_pii("call me on +91 98765 43210 or a.b@mail.in"),
+                         "call me on +00 00000 00000 or customer@example.com")
+        self.assertEqual(transcripts.mask_pii("rings under 2000"), "rings under 2000")
+        self.assertEqual(transcripts.mask_pii("Priya Sharma", stage="flow"), "customer")
+        self.assertEqual(transcripts.mask_pii("9876543210", stage="flow"), "0000000000")
+
+    def test_drops_with_counter_when_queue_is_full(self):
+        recorder = transcripts.TranscriptRecorder(self.dir, queue_size=1)
+        recorder._thread = threading.Thread()  # writer never started: queue can't drain
+        recorder.record({"message": "a"})
+        recorder.record({"message": "b"})
+        self.assertEqual(metrics.snapshot()["transcripts.dropped"], 1)
+
+
+class TranscriptHookTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        transcripts.reset_recorder()
+        self.addCleanup(transcripts.reset_recorder)
+
+    def test_replayed_inquiry_creates_no_lead(self):
+        segment = os.path.join(self.dir, "inquiry.jsonl.gz")
+        with gzip.open(segment, "wt", encoding="utf-8") as f:
+            for message in ("i'm interested", "customer", "0000000000", "customer@example.com"):
+                f.write(json.dumps({"channel": "web", "sender": "abc", "message": message, "intent": "inquiry"}) + "\n")
+        out = StringIO()
+        call_command("replay_transcript", segment, concurrency=1, stdout=out)
+        self.assertIn("messages=4", out.getvalue())
+        self.assertEqual((Lead.objects.count(), QuotationRequest.objects.count(), LeadNotification.objects.count()),
+                         (0, 0, 0))
+
+    def test_engine_records_and_replay_tool_reads_segment(self):
+        conf = {"ENABLED": True, "DIR": self.dir, "FLUSH_INTERVAL": 0.05}
+        with override_settings(CHAT_TRANSCRIPTS=conf):
+            self.client.get("/get-response/", {"msg": "hi"})
+            self.client.post("/whatsapp-webhook/", {"Body": "do you customize jewelry", "From": "whatsapp:+91999"})
+            transcripts.reset_recorder()
+
+        [segment] = glob.glob(os.path.join(self.dir, "*.jsonl.gz"))
+        records = list(transcripts.read_segment(segment))
+        self.assertEqual([(r["channel"], r["intent"], r["stage"]) for r in records],
+                         [("web", "greeting", "exact"), ("whatsapp", "business_info", "exact")])
+        self.assertEqual(records[1]["sender"], transcripts.hash_sender("whatsapp:+91999"))
+        self.assertNotIn("+91999", json.dumps(records))
+
+        out = StringIO()
+        call_command("replay_transcript", segment, concurrency=2, stdout=out)
+        self.assertIn("messages=2", out.getvalue())
+        self.assertIn("intent_changes_vs_recorded=0", out.getvalue())
+
+        out = StringIO()  # --limit covers all segments, not each one
+        call_command("replay_transcript", segment, segment, segment, limit=3, stdout=out)
+        self.assertIn("messages=3", out.getvalue())
+
+
+# --- Semantic search ---
+class SemanticSearchTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        settings_patch = override_settings(SEMANTIC_INDEX={"DIR": self.dir, "MIN_SCORE": 0.3, "NPROBE": 4})
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+        semantic._checked_at = 0.0
+        self.jhumka = Product.objects.create(
+            name="Oxidised Jhumka", price=650, category="Earrings",
+            description="Lightweight oxidised silver jhumkas, perfect for daily wear")
+        Product.objects.create(name="Temple Necklace", price=9000, category="Necklaces",
+                               description="Heavy bridal temple work")
+        Product.objects.create(name="Kids Payal", price=800, category="Anklets",
+                               description="Payal with ghungroo for kids")
+
+    def test_incremental_rebuild_reembeds_only_changed_products(self):
+        first = semantic.rebuild()
+        self.assertEqual((len(first), first.embedded), (3, 3))
+        self.jhumka.description = "Statement jhumka"
+        self.jhumka.save()
+        second = semantic.rebuild()
+        self.assertEqual((len(second), second.embedded), (3, 1))
+        self.assertEqual(semantic.current_path(), second.path)
+
+    def test_growing_catalog_retrains_centroids(self):
+        first = semantic.rebuild()
+        self.assertEqual(len(first.centroids), 1)
+        Product.objects.create(name="Silver Ring", price=900, category="Rings")
+        self.assertFalse(semantic.rebuild().retrained)  # small drift: centroids kept
+
+        Product.objects.bulk_create(Product(name=f"Design {i} Bangle", price=1000 + i, category="Bangles",
+                                            description=f"Kada pattern {i}") for i in range(96))
+        grown = semantic.rebuild()
+        self.assertTrue(grown.retrained)
+        self.assertEqual(len(grown.centroids), semantic.target_nlist(100))
+
+    def test_fallback_uses_semantic_index(self):
+        semantic.rebuild()
+        self.assertEqual(semantic.semantic_search("light oxidised jhumka for daily wear")[0][0], self.jhumka.pk)
+        self.assertEqual(semantic.semantic_search("where is your store located"), [])
+
+        reply = self.client.get("/get-response/", {"msg": "light oxidised jhumka for daily wear"}).json()
+        self.assertIn("Our Oxidised Jhumka is available", reply["reply"])
+
+
+# --- Chat page HTTP caching ---
+
+@override_settings(STORAGES=PLAIN_STATIC, CHAT_PAGE_MAX_AGE=300)
+class ChatPageCachingTests(TestCase):
+    def setUp(self):
+        views._home_page = None
+        self.addCleanup(setattr, views, "_home_page", None)
+
+    def test_page_shell_is_cacheable_and_sessionless(self):
+        with self.assertNumQueries(0):
+            resp = self.client.get("/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, resp.cookies)
+        self.assertIn("public", resp["Cache-Control"])
+        self.assertIn("max-age=300", resp["Cache-Control"])
+        self.assertTrue(resp.has_header("ETag"))
+        self.assertFalse(resp.has_header("Last-Modified"))  # per-worker render time would break 304s
+        self.assertIn('src="/static/chatbot/widget.js"', resp.content.decode())
+        self.assertNotIn("function sendMessage", resp.content.decode())
+
+    def test_conditional_get_returns_304(self):
+        first = self.client.get("/")
+        self.assertEqual(self.client.get("/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+        views._home_page = None  # another worker / after a restart: same page, same ETag
+        self.assertEqual(self.client.get("/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+    def test_session_created_on_first_message(self):
+        resp = self.client.get("/get-response/", {"msg": "hi"})
+        self.assertIn(settings.SESSION_COOKIE_NAME, resp.cookies)
+
+
+# --- Multi-store tenancy ---
+@override_settings(ALLOWED_HOSTS=["testserver", "ooh.example.com"], CHAT_TENANT_CACHE_SIZE=2)
+class TenancyTests(TestCase):
+    def setUp(self):
+        for reset in (tenancy.reset_routes, summaries.invalidate):
+            reset()
+            self.addCleanup(reset)
+        self.addCleanup(tenancy._indexes.clear)
+        self.store = Store.objects.create(
+            name="Ooh Silver", slug="ooh", hosts="ooh.example.com", whatsapp_number="+14155550100",
+            business_info={"store": "🏬 Ooh Silver is in Pune."})
+        Product.objects.create(name="Ooh Ring", price=500, category="Rings", store=self.store)
+        Product.objects.create(name="Default Ring", price=700, category="Rings")
+
+    def test_resolves_store_by_host_and_twilio_number(self):
+        web = self.client.get("/get-response/", {"msg": "show me rings"}, HTTP_HOST="ooh.example.com")
+        self.assertIn("Ooh Ring", web.json()["reply"])
+        self.assertNotIn("Default Ring", web.json()["reply"])
+
+        wa = self.client.post("/whatsapp-webhook/", {"Body": "where is your store located",
+                                                     "From": "whatsapp:+91999", "To": "whatsapp:+14155550100"})
+        self.assertIn("Ooh Silver is in Pune", wa.content.decode())
+
+        default = self.client.get("/get-response/", {"msg": "rings under 1000"})
+        self.assertIn("Default Ring", default.json()["reply"])
+        self.assertNotIn("Ooh Ring", default.json()["reply"])
+
+    def test_scoped_querysets(self):
+        self.assertEqual([p.name for p in Product.objects.for_store(self.store)], ["Ooh Ring"])
+        self.assertEqual([p.name for p in Product.objects.for_store(None)], ["Default Ring"])
+
+    def test_lru_evicts_cold_tenants_and_shares_phrases(self):
+        other = Store.objects.create(name="Two", slug="two")
+        third = Store.objects.create(name="Three", slug="three")
+        first = tenancy.get_tenant_index(self.store)
+        second = tenancy.get_tenant_index(other)
+        self.assertIs(first.intents["greeting"], second.intents["greeting"])  # shared tuple
+
+        tenancy.get_tenant_index(third)
+        self.assertNotIn(self.store.pk, tenancy._indexes)
+        self.assertEqual(list(tenancy._indexes), [other.pk, third.pk])
+
+
+class CacheInvalidationTests(TestCase):
+    def setUp(self):
+        self.fired = threading.Event()
+        invalidation._versions.pop("test-family", None)
+        invalidation.subscribe("test-family", self.fired.set)
+        self.addCleanup(invalidation._subscribers.pop, "test-family", None)
+        for reset in (tenancy.reset_tenants, summaries.invalidate):
+            self.addCleanup(reset)
+        self.addCleanup(self.join_rebuilds)
+
+    def join_rebuilds(self):
+        for thread in threading.enumerate():
+            if thread.name.startswith("rebuild-"):
+                thread.join(5)
+
+    def test_remote_bump_runs_subscribers_local_bump_does_not(self):
+        CacheVersion.objects.create(name="test-family", version=1)
+        invalidation.refresh()
+        self.assertEqual(invalidation.current("test-family"), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(invalidation.bump("test-family"), 2)  # this worker: current on commit
+        invalidation.refresh()
+        self.assertFalse(self.fired.wait(0.2))
+
+        CacheVersion.objects.filter(name="test-family").update(version=5)  # "another worker"
+        invalidation.refresh()
+        self.assertTrue(self.fired.wait(2))
+        self.assertEqual(invalidation.current("test-family"), 5)
+
+    def test_rolled_back_bump_leaves_the_local_version(self):
+        CacheVersion.objects.create(name="test-family", version=1)
+        invalidation.refresh()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                self.assertEqual(invalidation.bump("test-family"), 2)
+                self.assertEqual(invalidation._versions["test-family"], 1)  # not committed yet
+                transaction.set_rollback(True)
+        self.assertEqual(callbacks, [])
+        invalidation.refresh()
+        self.assertEqual(invalidation.current("test-family"), 1)
+        self.assertFalse(self.fired.wait(0.2))
+
+
+
+# Real background threads: TransactionTestCase, so they can read committed rows
+class SnapshotRebuildTests(TransactionTestCase):
+    def setUp(self):
+        invalidation._versions.pop(CATALOG, None)
+        invalidation.force_check()
+        tenancy.reset_tenants()
+        for reset in (tenancy.reset_tenants, summaries.invalidate):
+            self.addCleanup(reset)
+        self.addCleanup(self.join_rebuilds)
+
+    def join_rebuilds(self):
+        for thread in threading.enumerate():
+            if thread.name.startswith("rebuild-"):
+                thread.join(5)
+
+    def test_cold_build_then_stale_served_until_background_swap(self):
+        Product.objects.create(name="Silver Ring", price=900, category="Rings")
+        first = get_snapshot()  # cold: built on this thread
+        self.assertEqual(len(first), 1)
+        with self.assertNumQueries(0):
+            self.assertIs(get_snapshot(), first)
+
+        Product.objects.create(name="Toe Ring", price=400, category="Rings")  # local bump, committed
+        with self.assertNumQueries(0):
+            self.assertIs(get_snapshot(), first)  # no inline rebuild: old snapshot + background thread
+        self.join_rebuilds()
+        second = tenancy.get_tenant_index()._snapshot
+        self.assertEqual(second.version, catalog_version())
+        self.assertEqual([p.name for p in second.under(1000, "Rings")], ["Toe Ring", "Silver Ring"])
+
+    def test_remote_bump_swaps_in_the_background(self):
+        Product.objects.create(name="Ring", price=500, category="Rings")
+        index = tenancy.get_tenant_index()
+        old = index.snapshot()
+        CacheVersion.objects.filter(name="catalog").update(version=F("version") + 1)  # "another worker"
+        invalidation.force_check()
+        with index._lock:  # rebuild held: requests keep getting the old snapshot
+            for _ in range(3):
+                self.assertIs(index.snapshot(), old)
+            self.assertTrue(any(t.name.startswith("rebuild-") for t in threading.enumerate()))
+        self.join_rebuilds()
+        self.assertEqual(index._snapshot.version, old.version + 1)
+        self.assertIsNot(index._snapshot, old)
+
+
+class CrossProcessInvalidationTests(SimpleTestCase):
+    INTERVAL_MS = 100
+    WORKERS = 3
+
+    def test_every_worker_sees_a_bump_within_the_interval(self):
+        tmp = tempfile.mkdtemp()
+        db = os.path.join(tmp, "bus.sqlite3")
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{db}", CACHE_CHECK_INTERVAL_MS=str(self.INTERVAL_MS),
+                   DJANGO_SETTINGS_MODULE="jewelry_chatbot.settings")
+        manage = [sys.executable, "manage.py"]
+        subprocess.run(manage + ["migrate", "-v", "0"], cwd=settings.BASE_DIR, env=env, check=True)
+
+        watchers = [
+            subprocess.Popen(manage + ["cache_version", "watch", "catalog", "--until", "1", "--timeout", "20"],
+                             cwd=settings.BASE_DIR, env=env, stdout=subprocess.PIPE, text=True)
+            for _ in range(self.WORKERS)
+        ]
+        for proc in watchers:
+            self.addCleanup(proc.kill)
+            self.assertTrue(proc.stdout.readline().startswith("watching catalog"))
+
+        with sqlite3.connect(db) as conn:  # plain UPDATE, no Django in this process
+            conn.execute("INSERT INTO chatbot_cacheversion (name, version, updated_at) "
+                         "VALUES ('catalog', 1, datetime('now'))")
+        bumped_at = time.time()
+
+        for proc in watchers:
+            out, _ = proc.communicate(timeout=20)
+            self.assertEqual(proc.returncode, 0)
+            seen_at = float(out.split("seen_at=")[1])
+            # one poll interval + process scheduling slack
+            self.assertLess(seen_at - bumped_at, self.INTERVAL_MS / 1000 + 0.5)
+
+
+# --- Lead notification outbox ---
+class FailingTransport:
+    def send(self, subject, body):
+        raise OSError("smtp down")
+
+
+class FlakyRecipientTransport:
+    recipients = ["+911", "+912", "+913"]
+
+    def __init__(self, down=()):
+        self.down = set(down)
+        self.sent = []
+
+    def send_to(self, recipient, subject, body):
+        if recipient in self.down:
+            raise OSError(f"{recipient} unreachable")
+        self.sent.append((recipient, body))
+
+
+@override_settings(LEAD_NOTIFICATIONS={"BATCH_SIZE": 2, "MAX_ATTEMPTS": 2, "BACKOFF_BASE": 30, "BACKOFF_MAX": 3600})
+class LeadNotificationTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def make_leads(self, n):
+        return [Lead.objects.create(name=f"Customer {i}", phone=f"98765000{i:02d}", message="Inquiry about Ring")
+                for i in range(n)]
+
+    def test_inquiry_flow_creates_lead_and_only_queues_notification(self):
+        Product.objects.create(name="Silver Ring", price=900, category="Rings")
+        self.client.get("/get-response/", {"msg": "add silver ring to cart"})
+        for msg in ("I'm interested", "Asha", "9876543210"):
+            self.client.get("/get-response/", {"msg": msg})
+        reply = self.client.get("/get-response/", {"msg": "asha@example.com"}).json()["reply"]
+
+        self.assertIn("Our team will contact you soon", reply)
+        lead = Lead.objects.get()
+        self.assertEqual((lead.phone, lead.message), ("9876543210", "Inquiry about Silver Ring"))
+        self.assertEqual(lead.notification.status, LeadNotification.PENDING)
+        self.assertNotIn("notifications.sent", metrics.snapshot())
+
+    def test_worker_sends_digests_in_batches(self):
+        self.make_leads(3)
+        out = StringIO()
+        sent, failed = notifications.deliver_pending(notifications.ConsoleTransport(out))
+
+        self.assertEqual((sent, failed), (3, 0))
+        self.assertEqual(out.getvalue().count("from SilverBot"), 2)  # 2 + 1
+        self.assertIn("- Customer 0 (9876500000): Inquiry about Ring", out.getvalue())
+        self.assertFalse(LeadNotification.objects.exclude(status=LeadNotification.SENT).exists())
+        self.assertEqual(notifications.deliver_pending(notifications.ConsoleTransport(out)), (0, 0))
+
+    def test_failures_back_off_then_give_up(self):
+        self.make_leads(1)
+        now = timezone.now()
+        self.assertEqual(notifications.deliver_pending(FailingTransport(), now=now), (0, 0))
+        notification = LeadNotification.objects.get()
+        self.assertEqual((notification.status, notification.attempts), (LeadNotification.PENDING, 1))
+        self.assertEqual(notification.next_attempt_at, now + timedelta(seconds=30))
+        self.assertIn("smtp down", notification.last_error)
+
+        # not due yet
+        self.assertEqual(notifications.deliver_batch(FailingTransport(), now=now + timedelta(seconds=29)), (0, 0))
+        self.assertEqual(notifications.deliver_batch(FailingTransport(), now=now + timedelta(seconds=30)), (0, 1))
+        self.assertEqual(LeadNotification.objects.get().status, LeadNotification.FAILED)
+        self.assertEqual(notifications.backoff_delay(3), 120)
+
+    def test_retry_only_resends_to_failed_recipients(self):
+        self.make_leads(1)
+        now = timezone.now()
+        flaky = FlakyRecipientTransport(down={"+912"})
+        self.assertEqual(notifications.deliver_batch(flaky, now=now), (0, 0))
+        self.assertEqual([r for r, _ in flaky.sent], ["+911", "+913"])
+        self.assertEqual(LeadNotification.objects.get().delivered_to, ["+911", "+913"])
+
+        recovered = FlakyRecipientTransport()
+        self.assertEqual(notifications.deliver_batch(recovered, now=now + timedelta(seconds=30)), (1, 0))
+        self.assertEqual([r for r, _ in recovered.sent], ["+912"])
+        self.assertEqual(LeadNotification.objects.get().status, LeadNotification.SENT)
+
+    def test_command_file_transport(self):
+        self.make_leads(1)
+        path = os.path.join(tempfile.mkdtemp(), "leads.log")
+        out = StringIO()
+        with override_settings(LEAD_NOTIFICATIONS={"FILE": path}):
+            call_command("notify_leads", once=True, transport="file", stdout=out)
+        self.assertIn("sent=1 failed=0", out.getvalue())
+        with open(path, encoding="utf-8") as f:
+            self.assertIn("1 new lead from SilverBot", f.read())
+
+
+# --- Partitions / retention ---
+class RetentionTests(TestCase):
+    def test_month_math_and_partition_names(self):
+        from datetime import datetime, timezone as dt_timezone
+        jan = datetime(2026, 1, 15, 10, tzinfo=dt_timezone.utc)
+        month = partitions.month_start(jan)
+        self.assertEqual(partitions.add_months(month, -1), datetime(2025, 12, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(partitions.add_months(month, 13), datetime(2027, 2, 1, tzinfo=dt_timezone.utc))
+        name = partitions.partition_name("chatbot_lead", month)
+        self.assertEqual(name, "chatbot_lead_p2026_01")
+        self.assertEqual(partitions.partition_month(name), month)
+        self.assertIsNone(partitions.partition_month("chatbot_lead_default"))
+
+    def test_archive_exports_old_months_and_deletes_them(self):
+        now = timezone.now()
+        old = Lead.objects.create(name="Old", phone="1")
+        Lead.objects.create(name="New", phone="2")
+        QuotationRequest.objects.create(customer_name="Old", contact="1", quantity=1)
+        Lead.objects.filter(pk=old.pk).update(created_at=now - timedelta(days=500))
+        QuotationRequest.objects.update(created_at=now - timedelta(days=500))
+        directory = tempfile.mkdtemp()
+
+        done = partitions.archive_months(retention_months=12, archive_dir=directory)
+
+        self.assertEqual(sorted((table, rows) for table, _, rows, _ in done),
+                         [("chatbot_lead", 1), ("chatbot_quotationrequest", 1)])
+        self.assertEqual(list(Lead.objects.values_list("name", flat=True)), ["New"])
+        self.assertFalse(QuotationRequest.objects.exists())
+        self.assertEqual(LeadNotification.objects.count(), 1)  # old lead's outbox row went too
+        lead_file = [path for table, _, _, path in done if table == "chatbot_lead"][0]
+        with gzip.open(lead_file, "rt", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([(r["name"], r["phone"]) for r in rows], [("Old", "1")])
+
+    def test_expired_sessions_cleared_in_batches(self):
+        from django.contrib.sessions.models import Session
+
+        past, future = timezone.now() - timedelta(days=1), timezone.now() + timedelta(days=1)
+        Session.objects.bulk_create([Session(session_key=f"old{i}", session_data="", expire_date=past)
+                                     for i in range(5)] + [Session(session_key="live", session_data="",
+                                                                   expire_date=future)])
+        out = StringIO()
+        call_command("clear_sessions_batched", batch_size=2, stdout=out)
+        self.assertIn("deleted=5", out.getvalue())
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), ["live"])
+
+
+# --- Spelling correction ---
+class SpellingTests(SimpleTestCase):
+    def setUp(self):
+        intents, categories = tenancy.load_intents_file()
+        self.index = tenancy.TenantIndex(None, intents, categories)
+        self.index._snapshot = CatalogSnapshot([CatalogItem(1, "Oxidised Jhumka", 900, "Earrings", False, "", "")])
+        self.index.snapshot = lambda: self.index._snapshot
+
+    def test_corrects_common_typos(self):
+        speller = self.index.speller()
+        for wrong, right in [("neckless", "necklace"), ("bengals", "bangles"), ("earings", "earrings"),
+                             ("anklet's", "anklets"), ("jhumkaa", "jhumka")]:
+            self.assertEqual(speller.lookup(wrong), right, wrong)
+        self.assertEqual(speller.correct("Show me RINGS under 2000"), "show me rings under 2000")
+        self.assertEqual(speller.lookup("hii"), "hii")  # too short to guess
+        self.assertEqual(spelling.distance("earings", "earrings"), 1)
+
+    def test_ordinary_words_are_not_rewritten_by_sound(self):
+        speller = self.index.speller()
+        # consonant skeletons collide with vocabulary words (clear, bulk, demanded, please, chain)
+        for word in ("colour", "black", "diamond", "policy", "chennai"):
+            self.assertEqual(speller.lookup(word), word)
+        self.assertEqual(speller.correct("black colour diamond neckless"), "black colour diamond necklace")
+
+    def test_common_words_keep_the_baseline_intent(self):
+        speller = self.index.speller()
+        for message in ("watch", "do you have a watch", "tell me about silver purity", "whats the weight",
+                        "open today"):
+            self.assertEqual(speller.correct(message), message)
+            self.assertEqual(views.detect_intent_stage(message, self.index),
+                             views.detect_intent_stage(message, self.index, spelling=False), message)
+
+    def test_corrected_message_drives_intent_and_category(self):
+        self.assertEqual(views.detect_intent_stage("do you have earings", self.index), ("product_search", "spelling"))
+        self.assertEqual(views.match_category("bengals under 2000", self.index), "Bangles")
+        self.assertEqual(views.match_category("show me earrings", self.index), "Earrings")  # not "ring"
+        self.assertIsNone(views.match_category("bengals", self.index, spelling=False))
+
+    def test_speller_rebuilt_with_catalog_and_memoized(self):
+        speller = self.index.speller()
+        speller.lookup("neckless")
+        self.assertIn("neckless", speller._cache)
+        self.assertIs(self.index.speller(), speller)
+        self.index._snapshot = CatalogSnapshot([CatalogItem(2, "Kundan Choker", 900, "Necklaces", False, "", "")],
+                                               version=1)
+        self.assertEqual(self.index.speller().lookup("chokar"), "choker")
+
+
+# --- Request profiling ---
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        patch = override_settings(CHAT_PROFILING={"ENABLED": True, "SAMPLE_RATE": 0, "MODE": "cprofile",
+                                                  "DIR": self.dir, "MAX_FILES": 3}, STORAGES=PLAIN_STATIC)
+        patch.enable()
+        self.addCleanup(patch.disable)
+        profiling._toggle = (0.0, 0.0)
+        self.addCleanup(setattr, profiling, "_toggle", (0.0, 0.0))
+
+    def test_only_signed_requests_are_profiled(self):
+        self.client.get("/get-response/", {"msg": "hi"})
+        self.client.get("/get-response/", {"msg": "hi"}, HTTP_X_CHAT_PROFILE="123.forged")
+        self.assertEqual(profiling.list_profiles(), [])
+
+        self.client.get("/get-response/", {"msg": "show me rings"}, HTTP_X_CHAT_PROFILE=profiling.make_token())
+        [name] = profiling.list_profiles()
+        record = profiling.read_profile(name)
+        self.assertEqual((record["path"], record["reason"], record["msg"]), ("/get-response/", "header", "show me rings"))
+        self.assertTrue(any("views.py:chat_engine" in stack for stack in record["stacks"]))
+
+    def test_profiled_message_is_masked(self):
+        self.client.get("/get-response/", {"msg": "mail me at ravi@gmail.com or +91 98765 43210"},
+                        HTTP_X_CHAT_PROFILE=profiling.make_token())
+        [name] = profiling.list_profiles()
+        record = profiling.read_profile(name)
+        self.assertEqual(record["msg"], "mail me at customer@example.com or +00 00000 00000")
+        self.assertNotIn("ravi", json.dumps(record))
+
+    def test_ring_keeps_newest_files(self):
+        for i in range(5):
+            profiling.write_profile({"n": i, "stacks": {}})
+        self.assertEqual([profiling.read_profile(n)["n"] for n in profiling.list_profiles()], [4, 3, 2])
+
+    def test_sampler_collapses_stacks(self):
+        def busy():
+            end = time.perf_counter() + 0.05
+            while time.perf_counter() < end:
+                pass
+
+        with profiling.StackSampler(0.001) as sampler:
+            busy()
+        self.assertTrue(any(stack.endswith("chatbot/tests.py:busy") for stack in sampler.stacks))
+        own, inclusive = profiling.hotspots(sampler.stacks)
+        self.assertEqual(own[0][0], "chatbot/tests.py:busy")
+
+    def test_admin_page_toggle_and_collapsed_download(self):
+        User.objects.create_superuser("admin", "a@example.com", "pw")
+        self.client.login(username="admin", password="pw")
+        profiling.write_profile({"ts": 0, "method": "GET", "path": "/get-response/", "msg": "hi", "status": 200,
+                                 "duration_ms": 1.0, "mode": "sample", "reason": "sample",
+                                 "stacks": {"views.py:chat_engine;views.py:detect_intent_stage": 7}})
+        page = self.client.get("/admin/chatbot/profiles/")
+        self.assertContains(page, "views.py:detect_intent_stage")
+        collapsed = self.client.get("/admin/chatbot/profiles/", {"format": "collapsed"})
+        self.assertIn("views.py:chat_engine;views.py:detect_intent_stage 7", collapsed.content.decode())
+
+        self.client.post("/admin/chatbot/profiles/", {"minutes": "5"})
+        self.assertGreater(profiling.toggle_until(), time.time())
+        self.client.get("/get-response/", {"msg": "hi"})
+        self.assertEqual(profiling.read_profile(profiling.list_profiles()[0])["reason"], "toggle")
+
+        page = self.client.post("/admin/chatbot/profiles/", {"minutes": "lots"}, follow=True)
+        self.assertContains(page, "Minutes must be a whole number.")
+        self.client.post("/admin/chatbot/profiles/", {"minutes": "100000"})
+        self.assertLessEqual(profiling.toggle_until(), time.time() + profiling.max_toggle_minutes() * 60 + 1)
+
+
+# --- Media serving ---
+MEDIA_STORAGES = {**PLAIN_STATIC, "default": {"BACKEND": "chatbot.media.HashedMediaStorage"}}
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        patch = override_settings(MEDIA_ROOT=self.dir, STORAGES=MEDIA_STORAGES,
+                                  MEDIA_SERVING={"ACCEL": "", "ACCEL_PREFIX": "/protected-media/", "MAX_AGE": 60})
+        patch.enable()
+        self.addCleanup(patch.disable)
+        os.makedirs(os.path.join(self.dir, "products"))
+        with open(os.path.join(self.dir, "products", "ring.jpg"), "wb") as f:
+            f.write(bytes(range(256)) * 4)
+
+    def test_uploads_get_hashed_deduplicated_names(self):
+        storage = media.HashedMediaStorage(location=self.dir)
+        first = storage.save("products/bangle.jpg", ContentFile(b"silver"))
+        second = storage.save("products/bangle.jpg", ContentFile(b"silver"))
+        self.assertRegex(first, r"^products/bangle\.[0-9a-f]{12}\.jpg$")
+        self.assertEqual(first, second)
+
+    def test_hash_media_writes_manifest_used_by_url(self):
+        call_command("hash_media", stdout=StringIO())
+        storage = media.HashedMediaStorage(location=self.dir)
+        hashed = storage.manifest["products/ring.jpg"]
+        self.assertTrue(storage.exists(hashed))
+        self.assertEqual(storage.url("products/ring.jpg"), "/media/" + hashed)
+
+        response = self.client.get("/media/" + hashed)
+        self.assertEqual(response["Cache-Control"], media.IMMUTABLE)
+        self.assertEqual(b"".join(response.streaming_content), bytes(range(256)) * 4)
+        again = self.client.get("/media/" + hashed, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(self.client.get("/media/" + media.MANIFEST_NAME).status_code, 404)
+
+    def test_range_requests(self):
+        partial = self.client.get("/media/products/ring.jpg", HTTP_RANGE="bytes=10-19")
+        self.assertEqual((partial.status_code, partial["Content-Range"]), (206, "bytes 10-19/1024"))
+        self.assertEqual(b"".join(partial.streaming_content), bytes(range(10, 20)))
+        suffix = self.client.get("/media/products/ring.jpg", HTTP_RANGE="bytes=-4")
+        self.assertEqual(b"".join(suffix.streaming_content), bytes(range(252, 256)))
+        self.assertEqual(self.client.get("/media/products/ring.jpg", HTTP_RANGE="bytes=5000-").status_code, 416)
+        full = self.client.get("/media/products/ring.jpg", HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(full.status_code, 200)
+
+    def test_accel_redirect_and_traversal(self):
+        with override_settings(MEDIA_SERVING={"ACCEL": "x-accel", "ACCEL_PREFIX": "/protected-media/"}):
+            response = self.client.get("/media/products/ring.jpg")
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/products/ring.jpg")
+        self.assertEqual(response.content, b"")
+        self.assertEqual(self.client.get("/media/../settings.py").status_code, 404)
+        self.assertEqual(self.client.get("/media/products/%2e%2e/%2e%2e/etc/passwd").status_code, 404)
+
+
+# --- Async chat engine (ASGI) ---
+class AsyncEngineTests(TestCase):
+    CONVERSATION = ["hi", "show me rings", "rings under 2000", "price for 20 rings", "add silver ring to cart", "show my cart",
+                    "i'm interested", "asha", "9876543210", "asha@example.com", "suggest best selling items",
+                    "kada bangle", "bye"]
+
+    def setUp(self):
+        for reset in (tenancy.reset_tenants, summaries.invalidate):
+            reset()
+            self.addCleanup(reset)
+        Product.objects.create(name="Silver Ring", price=900, category="Rings", best_seller=True)
+        Product.objects.create(name="Toe Ring", price=400, category="Rings")
+        Product.objects.create(name="Kada Bangle", price=2500, category="Bangles")
+
+    def test_async_engine_gives_the_same_answers(self):
+        session = SessionStore()
+        expected = []
+        for msg in self.CONVERSATION:
+            request = RequestFactory().get("/get-response/", {"msg": msg})
+            request.session = session
+            expected.append(views.chat_engine(request))
+
+        async def converse():
+            session = SessionStore()
+            answers = []
+            for msg in self.CONVERSATION:
+                request = AsyncRequestFactory().get("/get-response/", {"msg": msg})
+                request.session = session
+                answers.append(await views.achat_engine(request))
+            return answers
+
+        self.assertEqual(async_to_sync(converse)(), expected)
+        self.assertEqual(Lead.objects.filter(email="asha@example.com").count(), 2)
+        self.assertEqual([e[1] for e in expected[4:6]], ["cart_management"] * 2)
+
+    @override_settings(CHAT_RATE_LIMIT=RATE_LIMIT_2)
+    def test_async_view_is_rate_limited(self):
+        reset_limiter()
+        self.addCleanup(reset_limiter)
+
+        async def send():
+            factory = AsyncRequestFactory()
+            factory.cookies[settings.SESSION_COOKIE_NAME] = "spammer"
+            statuses = []
+            for _ in range(3):
+                request = factory.get("/get-response/", {"msg": "hi"})
+                request.session = SessionStore()
+                statuses.append((await views.achatbot_response(request)).status_code)
+            return statuses
+
+        self.assertEqual(async_to_sync(send)(), [200, 200, 429])
+
+    def test_cache_versions_never_queried_on_the_event_loop(self):
+        before = invalidation.current(CATALOG)
+        CacheVersion.objects.update_or_create(name=CATALOG, defaults={"version": before + 7})
+        invalidation.force_check()
+
+        async def read():
+            stale = invalidation.current(CATALOG)  # would raise SynchronousOnlyOperation if it queried
+            return stale, await invalidation.acurrent(CATALOG)
+
+        self.assertEqual(async_to_sync(read)(), (before, before + 7))
+
+    @override_settings(DEBUG=True)
+    def test_asgi_middleware_stack_is_fully_async(self):
+        with self.assertLogs("django.request", "DEBUG") as logs:
+            ASGIHandler()
+            logging.getLogger("django.request").debug("loaded")
+        self.assertEqual([line for line in logs.output if "adapted" in line], [])  # "Synchronous handler adapted for ..."
+
+
+# --- Daily analytics rollups ---
+@override_settings(CHAT_ANALYTICS={"ENABLED": True, "FLUSH_INTERVAL": 3600}, STORAGES=PLAIN_STATIC)
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        for reset in (analytics.reset, tenancy.reset_tenants, summaries.invalidate):
+            reset()
+            self.addCleanup(reset)
+        Product.objects.create(name="Silver Ring", price=900, category="Rings")
+
+    def rollups(self, metric):
+        return dict(DailyRollup.objects.filter(metric=metric).values_list("key", "count"))
+
+    def test_flush_upserts_increments(self):
+        analytics.incr(analytics.INTENT, "greeting")
+        analytics.incr(analytics.INTENT, "greeting", n=2)
+        analytics.incr(analytics.INTENT, "greeting", store_id=7)
+        self.assertEqual(analytics.flush(), 2)
+        analytics.incr(analytics.INTENT, "greeting", n=4)
+        analytics.incr(analytics.INTENT, "fallback")
+        self.assertEqual(analytics.flush(), 2)
+        self.assertEqual(analytics.flush(), 0)
+
+        rows = DailyRollup.objects.filter(metric=analytics.INTENT).values_list("store_key", "key", "count")
+        self.assertEqual(sorted(rows), [(0, "fallback", 1), (0, "greeting", 7), (7, "greeting", 1)])
+
+    def test_chat_traffic_is_counted(self):
+        for msg in ["hi", "qwzx plmk", "add silver ring to cart", "i'm interested", "asha", "9876543210",
+                    "asha@example.com"]:
+            self.client.get("/get-response/", {"msg": msg})
+        analytics.flush()
+
+        self.assertEqual(self.rollups(analytics.MESSAGES), {"": 7})
+        self.assertEqual(self.rollups(analytics.INTENT)["fallback"], 1)
+        self.assertEqual(sum(self.rollups(analytics.STAGE).values()), 7)
+        self.assertEqual(self.rollups(analytics.CART_ADD), {"Silver Ring": 1})
+        self.assertEqual(self.rollups(analytics.LEAD), {"": 1})
+        self.assertEqual(sum(self.rollups(analytics.QUOTATION).values()), 1)
+
+    @override_settings(CHAT_ANALYTICS={"ENABLED": True, "FLUSH_INTERVAL": 0})
+    def test_flushed_when_requests_finish(self):
+        self.client.get("/get-response/", {"msg": "hi"})
+        self.assertEqual(self.rollups(analytics.MESSAGES), {"": 1})
+        self.assertEqual(analytics.pending(), {})
+
+    def test_dashboard_reads_rollups(self):
+        today = timezone.localdate()
+        DailyRollup.objects.bulk_create([
+            DailyRollup(day=today, metric=analytics.MESSAGES, count=200),
+            DailyRollup(day=today, metric=analytics.INTENT, key="fallback", count=30),
+            DailyRollup(day=today, metric=analytics.STAGE, key="spelling", count=12),
+            DailyRollup(day=today, metric=analytics.LEAD, count=4),
+            DailyRollup(day=today - timedelta(days=60), metric=analytics.MESSAGES, count=999),
+        ])
+        User.objects.create_superuser("admin", "a@example.com", "pw")
+        self.client.login(username="admin", password="pw")
+
+        response = self.client.get("/admin/chatbot/analytics/", {"days": "14"})
+        self.assertEqual(response.status_code, 200)
+        report = response.context["report"]
+        self.assertEqual((report["messages"], report["leads"]), (200, 4))
+        self.assertEqual(report["fallback_rate"], 15.0)
+        self.assertContains(response, "spelling")
+
+    def test_backfill_is_idempotent(self):
+        ring = Product.objects.get(name="Silver Ring")
+        for _ in range(3):
+            QuotationRequest.objects.create(customer_name="a", contact="1", product=ring, quantity=5)
+        Lead.objects.create(name="a", phone="1")
+        QuotationRequest.objects.update(created_at=timezone.now() - timedelta(days=3))
+        Lead.objects.update(created_at=timezone.now() - timedelta(days=3))
+        analytics.reset()  # live counters of the creates above
+
+        for _ in range(2):
+            call_command("backfill_rollups", stdout=StringIO())
+        self.assertEqual(self.rollups(analytics.QUOTATION), {"Silver Ring": 3})
+        self.assertEqual(self.rollups(analytics.LEAD), {"": 1})
+
+    def test_backfill_drops_pending_counts_it_covers(self):
+        Lead.objects.create(name="a", phone="1")  # counted live, not flushed yet
+        today = timezone.localdate()
+        analytics.incr(analytics.LEAD, day=today - timedelta(days=5))  # outside the backfilled range
+        self.assertEqual(analytics.pending()[(today, 0, analytics.LEAD, "")], 1)
+        analytics.backfill(today, today)
+        analytics.flush()
+        self.assertEqual(list(DailyRollup.objects.filter(metric=analytics.LEAD).order_by("day")
+                              .values_list("day", "count")),
+                         [(today - timedelta(days=5), 1), (today, 1)])  # not 2 for today
+
+
+# --- Silver-rate repricing ---
+@override_settings(STORAGES=PLAIN_STATIC)
+class RepricingTests(TestCase):
+    def setUp(self):
+        self.ring = Product.objects.create(name="Silver Ring", price=900, category="Rings",
+                                           weight_grams=Decimal("4.250"), making_charge=Decimal("150"))
+        self.chain = Product.objects.create(name="Rope Chain", price=3000, category="Chains",
+                                            weight_grams=Decimal("20"), making_charge=Decimal("400"))
+        self.fixed = Product.objects.create(name="Gift Box", price=99, category="Rings")
+
+    def prices(self):
+        return dict(Product.objects.values_list("name", "price"))
+
+    def test_one_update_and_one_version_bump(self):
+        version = catalog_version()
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            updated, _ = pricing.reprice("92.50")
+        self.assertEqual(updated, 2)
+        self.assertEqual(sum(q["sql"].startswith('UPDATE "chatbot_product"') for q in ctx.captured_queries), 1)
+        self.assertEqual(catalog_version(), version + 1)
+        self.assertEqual(self.prices(), {"Silver Ring": Decimal("543.13"), "Rope Chain": Decimal("2250.00"),
+                                         "Gift Box": Decimal("99.00")})
+
+        pricing.reprice(100, category="rings")
+        self.assertEqual(self.prices()["Silver Ring"], Decimal("575.00"))
+        self.assertEqual(self.prices()["Rope Chain"], Decimal("2250.00"))
+        with self.assertRaises(ValueError):
+            pricing.reprice("-5")
+
+    def test_admin_action_and_command(self):
+        User.objects.create_superuser("admin", "a@example.com", "pw")
+        self.client.login(username="admin", password="pw")
+        response = self.client.post("/admin/chatbot/product/", {
+            "action": "reprice", "rate": "100", "_selected_action": [self.ring.pk, self.fixed.pk],
+        }, follow=True)
+        self.assertContains(response, "Repriced 1 product(s)")
+        self.assertEqual(self.prices()["Silver Ring"], Decimal("575.00"))
+        self.assertEqual(self.prices()["Rope Chain"], Decimal("3000.00"))
+
+        out = StringIO()
+        call_command("reprice", "--rate", "80", "--category", "Chains", stdout=out)
+        self.assertIn("repriced=1", out.getvalue())
+        self.assertEqual(self.prices()["Rope Chain"], Decimal("2000.00"))
+
+
+# --- Read replica routing (two SQLite files: test DB = primary, temp file = replica) ---
+REPLICA = "replica_standin"
+
+
+@override_settings(DB_ROUTING={"REPLICA": REPLICA, "REPLICA_MODELS": ("chatbot.Product",),
+                               "PIN_COOKIE": "db_pin", "PIN_SECONDS": 15}, STORAGES=PLAIN_STATIC)
+class ReplicaRoutingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # the replica alias exists only while this class runs (the runner doesn't create it)
+        cls.databases = {"default", REPLICA}
+        path = os.path.join(tempfile.mkdtemp(), "replica.sqlite3")
+        connections.settings[REPLICA] = {**connections.settings["default"], "ENGINE": "django.db.backends.sqlite3",
+                                         "NAME": path, "OPTIONS": {},
+                                         "TEST": {**connections.settings["default"]["TEST"], "MIRROR": None}}
+        with connections[REPLICA].schema_editor() as editor:
+            editor.create_model(Store)
+            editor.create_model(Product)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+
+    def setUp(self):
+        for reset in (tenancy.reset_tenants, summaries.invalidate):
+            reset()
+            self.addCleanup(reset)
+        ring = Product.objects.create(name="Silver Ring", price=900, category="Rings")
+        Product.objects.using(REPLICA).create(pk=ring.pk, name="Silver Ring", price=900, category="Rings")
+
+    def replica_queries(self, fn):
+        with CaptureQueriesContext(connections[REPLICA]) as ctx:
+            fn()
+        return len(ctx.captured_queries)
+
+    def test_catalog_reads_replica_writes_primary(self):
+        Product.objects.using(REPLICA).create(name="Replica Only", price=1, category="Rings")
+        self.assertTrue(Product.objects.filter(name="Replica Only").exists())
+        self.assertFalse(Product.objects.using("default").filter(name="Replica Only").exists())
+        self.assertEqual(Lead.objects.create(name="a", phone="1")._state.db, "default")
+        self.assertEqual(self.replica_queries(lambda: list(Lead.objects.all())), 0)
+        with routers.use_primary():
+            self.assertFalse(Product.objects.filter(name="Replica Only").exists())
+
+        with routers.request_scope() as state:
+            SessionStore().save()
+            self.assertFalse(state.wrote)  # session saves don't pin
+            self.assertTrue(Product.objects.filter(name="Replica Only").exists())
+            Lead.objects.create(name="b", phone="2")
+            self.assertFalse(Product.objects.filter(name="Replica Only").exists())  # read-your-writes
+
+    def test_conversation_sticks_to_primary_after_a_write(self):
+        def add_to_cart():
+            reply = self.client.get("/get-response/", {"msg": "add silver ring to cart"}).json()["reply"]
+            self.assertIn("added to your cart", reply)
+
+        self.assertGreater(self.replica_queries(add_to_cart), 0)
+        self.assertNotIn("db_pin", self.client.cookies)
+
+        for msg in ["i'm interested", "asha", "9876543210", "asha@example.com"]:
+            response = self.client.get("/get-response/", {"msg": msg})
+        self.assertEqual(Lead.objects.count(), 1)
+        self.assertEqual(response.cookies["db_pin"]["max-age"], 15)
+
+        self.assertEqual(self.replica_queries(add_to_cart), 0)
+
+
+# --- Typeahead ---
+@override_settings(STORAGES=PLAIN_STATIC)
+class TypeaheadTests(TestCase):
+    CATEGORIES = {"ring": "Rings", "rings": "Rings", "chain": "Chains"}
+    INTENTS = {"best_sellers": ["suggest best selling items"], "greeting": ["hi", "hello"]}
+
+    def setUp(self):
+        for reset in (tenancy.reset_tenants, summaries.invalidate):
+            reset()
+            self.addCleanup(reset)
+
+    def items(self, *names):
+        return [CatalogItem(i, name, 100, name.split()[-1] + "s", False, "", "") for i, name in enumerate(names, 1)]
+
+    def test_radix_trie_completions(self):
+        trie = typeahead.build(self.items("Silver Ring", "Silver Rope Chain", "Silverware Ring", "Oxidised Jhumka"),
+                               self.CATEGORIES, self.INTENTS, {"silver rope chain": 9})
+        texts = lambda q, k=None: [s.text for s in trie.complete(q, k)]
+        self.assertEqual(texts("JHU"), ["Oxidised Jhumka"])  # word start inside the name
+        self.assertEqual(texts("silver r", 2), ["Silver Rope Chain", "Silver Ring"])  # popularity first
+        self.assertNotIn("Silverware Ring", texts("silver  "))  # trailing space = word boundary
+        self.assertIn("Silverware Ring", texts("silverw"))
+        self.assertEqual(texts("ring")[0], "show me rings")  # category outranks its products
+        self.assertEqual(texts("sugg"), ["suggest best selling items"])
+        self.assertEqual(texts("silverx"), [])
+
+    def test_suggest_endpoint_ranks_by_popularity_and_is_cacheable(self):
+        Product.objects.create(name="Silver Ring", price=900, category="Rings")
+        Product.objects.create(name="Silver Rope Chain", price=3000, category="Chains")
+        DailyRollup.objects.create(day=timezone.localdate(), metric=analytics.CART_ADD, key="Silver Rope Chain", count=5)
+
+        response = self.client.get("/suggest/", {"q": "Silver R"})
+        self.assertEqual([s["text"] for s in response.json()["suggestions"]], ["Silver Rope Chain", "Silver Ring"])
+        self.assertEqual(response.json()["suggestions"][0]["kind"], "product")
+        self.assertIn("max-age=60", response["Cache-Control"])
+        self.assertNotIn("Cookie", response.get("Vary", ""))
+        self.assertFalse(response.cookies)
+        self.assertEqual(self.client.get("/suggest/", {"q": "s"}).json()["suggestions"], [])
+
+    def test_picked_name_is_an_exact_lookup(self):
+        Product.objects.create(name="Oxidised Jhumka", price=650, category="Earrings")
+        request = RequestFactory().get("/get-response/", {"msg": "oxidised  jhumka"})
+        request.session = SessionStore()
+        response, intent, stage = views.chat_engine(request)
+        self.assertEqual((intent, stage), ("product_lookup", "exact"))
+        self.assertIn("Our Oxidised Jhumka is available", response["reply"])
+
+    def test_lookup_is_sub_millisecond(self):
+        words = ["silver", "oxidised", "jhumka", "kada", "payal", "chain", "ring", "bangle", "temple", "kundan"]
+        items = [CatalogItem(i, f"{words[i % 10]} {words[i // 10 % 10]} {words[i // 100 % 10]} {i}", 100, "Rings",
+                             False, "", "") for i in range(20000)]
+        trie = typeahead.build(items, self.CATEGORIES, self.INTENTS)
+        prefixes = ["si", "silver o", "jhumka k", "kundan temple r", "ring 1", "pay"] * 200
+        start = time.perf_counter()
+        for prefix in prefixes:
+            trie.complete(prefix, 6)
+        self.assertLess((time.perf_counter() - start) / len(prefixes) * 1000, 1.0)
+
@@ -0,0 +1,257 @@
+"""
+Append-only conversation transcript log.
+
+Har chat message ka ek record (timestamp, channel, hashed sender, message,
+intent, matching stage, latency) is pushed onto a bounded queue; a single
+background thread batches them into gzip-compressed JSONL segments. The
+request path only does a put_nowait() - if the writer falls behind, records
+are dropped and counted (transcripts.dropped) instead of blocking users.
+
+Segments rotate on size or age:
+    <DIR>/transcripts-20261019T101500-<pid>-0001.jsonl.gz.part   (being written)
+    <DIR>/transcripts-20261019T101500-<pid>-0001.jsonl.gz        (closed, immutable)
+A .part left behind by a worker that died (kill -9, OOM) is closed by the
+next recorder that starts on the same host (finalize_orphans); its gzip
+trailer is missing, read_segment returns what was flushed.
+
+Senders are HMAC-hashed. Email addresses and phone numbers in messages are
+replaced by same-shaped placeholders, and the name typed into the inquiry
+flow by "customer" (mask_pii), so replays still walk the same flow while
+the segments hold no contact details. The Lead / QuotationRequest tables
+remain the only copy; transcripts are load-test input and can be deleted
+at any time.
+
+Settings (settings.CHAT_TRANSCRIPTS): ENABLED, DIR, MAX_BYTES, MAX_AGE,
+QUEUE_SIZE, FLUSH_INTERVAL.
+"""
+import atexit
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from . import metrics
+
+
+_EMAIL = re.compile(r"[^\s@]+@[^\s@]+\.[^\s@]+")
+_PHONE = re.compile(r"\+?\d[\d\s-]{5,}\d")
+_SEGMENT_PID = re.compile(r"^transcripts-\d{8}T\d{6}-(\d+)-\d+\.jsonl\.gz\.part$")
+
+
+def mask_pii(message, stage=None):
+    """Emails / phone numbers -> placeholders that still validate; the inquiry flow's name answer -> "customer"."""
+    masked = _EMAIL.sub("customer@example.com", message)
+    masked = _PHONE.sub(lambda m: re.sub(r"\d", "0", m.group()), masked)
+    if stage == "flow" and masked == message:
+        return "customer"
+    return masked
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def finalize_orphans(directory):
+    """Close .part segments whose writer process is gone. Returns the closed paths."""
+    closed = []
+    for name in os.listdir(directory):
+        match = _SEGMENT_PID.match(name)
+        if match is None or int(match.group(1)) == os.getpid() or _pid_alive(int(match.group(1))):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            os.replace(path, path[:-len(".part")])
+        except OSError:
+            continue  # another worker got there first
+        metrics.incr("transcripts.orphans_finalized")
+        closed.append(path[:-len(".part")])
+    return closed
+
+
+def hash_sender(sender):
+    if not sender:
+        return ""
+    key = settings.SECRET_KEY.encode()
+    return hmac.new(key, str(sender).encode(), hashlib.sha256).hexdigest()[:16]
+
+
+class TranscriptRecorder:
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, max_age=3600,
+                 queue_size=10000, flush_interval=1.0):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._file = None
+        self._path = None
+        self._opened_at = 0
+        self._written = 0
+        self._sequence = 0
+
+    # --- request path ---
+    def record(self, record):
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.incr("transcripts.dropped")
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    os.makedirs(self.directory, exist_ok=True)
+                    finalize_orphans(self.directory)
+                    self._thread = threading.Thread(target=self._run, name="transcript-writer", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+
+    # --- writer thread ---
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                batch = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                self._maybe_rotate()
+                continue
+            while len(batch) < 1000:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+        self._drain()
+
+    def _write(self, batch):
+        try:
+            self._maybe_rotate()
+            if self._file is None:
+                self._open()
+            data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in batch).encode("utf-8")
+            self._file.write(data)
+            self._file.flush()  # sync flush: .part segment stays readable
+            self._written += len(data)
+            metrics.incr("transcripts.recorded", len(batch))
+        except OSError:
+            metrics.incr("transcripts.write_errors")
+            metrics.incr("transcripts.dropped", len(batch))
+
+    def _open(self):
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        self._sequence += 1
+        self._path = os.path.join(
+            self.directory, f"transcripts-{stamp}-{os.getpid()}-{self._sequence:04d}.jsonl.gz.part"
+        )
+        self._file = gzip.open(self._path, "ab")
+        self._opened_at = time.monotonic()
+        self._written = 0
+
+    def _maybe_rotate(self):
+        if self._file is None:
+            return
+        if self._written >= self.max_bytes or time.monotonic() - self._opened_at >= self.max_age:
+            self._close_segment()
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        self._file.close()
+        os.replace(self._path, self._path[:-len(".part")])
+        metrics.incr("transcripts.segments")
+        self._file = None
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch)
+        self._close_segment()
+
+    def close(self, timeout=5):
+        if self._thread is not None and self._thread.is_alive():
+            self._stopping.set()
+            self._thread.join(timeout)
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder():
+    global _recorder
+    conf = getattr(settings, "CHAT_TRANSCRIPTS", {})
+    if not conf.get("ENABLED"):
+        return None
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = TranscriptRecorder(
+                    conf.get("DIR", os.path.join(settings.BASE_DIR, "transcripts")),
+                    max_bytes=conf.get("MAX_BYTES", 64 * 1024 * 1024),
+                    max_age=conf.get("MAX_AGE", 3600),
+                    queue_size=conf.get("QUEUE_SIZE", 10000),
+                    flush_interval=conf.get("FLUSH_INTERVAL", 1.0),
+                )
+                metrics.register_gauge("transcripts.queue_depth", _recorder.queue.qsize)
+    return _recorder
+
+
+def reset_recorder():
+    global _recorder
+    with _recorder_lock:
+        if _recorder is not None:
+            _recorder.close()
+        _recorder = None
+
+
+def record_transcript(request, intent, stage, latency):
+    recorder = get_recorder()
+    if recorder is None or getattr(request, "chat_replay", False):
+        return
+    channel = getattr(request, "chat_channel", "web")
+    if channel == "whatsapp":
+        sender = request.POST.get("From", "")
+    else:
+        sender = request.session.session_key or request.COOKIES.get(settings.SESSION_COOKIE_NAME, "")
+    recorder.record({
+        "ts": time.time(),
+        "channel": channel,
+        "sender": hash_sender(sender),
+        "message": mask_pii(request.GET.get("msg", ""), stage),
+        "intent": intent,
+        "stage": stage,
+        "latency_ms": round(latency * 1000, 3),
+    })
+
+
+def read_segment(path):
+    """Yields records from a (possibly still open) segment."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile):
+            return  # .part segment: trailer not written yet
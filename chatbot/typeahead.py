@@ -0,0 +1,179 @@
+"""
+Typeahead for the web chat widget (/suggest/?q=...).
+
+Each store's TenantIndex keeps a compressed (radix) prefix trie over its
+product names, category synonyms and intents.yml phrases. Every word start
+of a product name is a key, so "jhu" finds "Oxidised Jhumka". Each node
+stores the top-k completions below it, ranked when the trie is built, so a
+lookup only walks len(prefix) characters and slices a precomputed tuple.
+There is no subtree scan and no DB access.
+
+Popularity: cart adds + 3 × quotation requests per product over the last
+POPULARITY_DAYS (DailyRollup, see analytics.py), plus a best-seller bonus.
+Categories rank by the popularity of their products; intent phrases come
+last. The trie is rebuilt in the background when the catalog version
+changes and after REFRESH_SECONDS (popularity drifts); the old one keeps
+serving until the new one is swapped in.
+
+Picking a product suggestion sends its exact name. chat_engine answers that
+with a name lookup in the catalog snapshot instead of fuzzy matching.
+
+Settings (settings.CHAT_TYPEAHEAD): MAX_RESULTS, MIN_PREFIX, POPULARITY_DAYS,
+REFRESH_SECONDS, MAX_AGE.
+"""
+import re
+from collections import Counter, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+Suggestion = namedtuple("Suggestion", ["text", "kind", "score"])
+
+PRODUCT, CATEGORY, PHRASE = "product", "category", "phrase"
+BEST_SELLER_BONUS = 20
+QUOTATION_WEIGHT = 3
+TOP_K = 10  # stored per node; MAX_RESULTS <= TOP_K
+
+_SPACES = re.compile(r"\s+")
+
+
+def _conf():
+    return getattr(settings, "CHAT_TYPEAHEAD", {})
+
+
+def normalize(text):
+    """Lowercased, single-spaced; a trailing space is kept ("silver " != "silverware")."""
+    return _SPACES.sub(" ", (text or "").lower()).lstrip()
+
+
+def word_starts(text):
+    """'oxidised jhumka set' -> ['oxidised jhumka set', 'jhumka set', 'set']."""
+    words = normalize(text).split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+def _rank(suggestion):
+    return -suggestion.score, len(suggestion.text), suggestion.text
+
+
+# --- Radix trie ---
+class _Node:
+    __slots__ = ("edges", "top", "entries")
+
+    def __init__(self):
+        self.edges = {}    # first char -> (edge label, child)
+        self.top = ()      # best completions under this node (after freeze)
+        self.entries = []  # suggestions ending here (build only)
+
+
+class RadixTrie:
+    """Compressed prefix trie; insert() everything, freeze(), then complete()."""
+
+    def __init__(self, k=TOP_K):
+        self.k = k
+        self.root = _Node()
+        self.keys = 0
+
+    def insert(self, key, suggestion):
+        node = self.root
+        self.keys += 1
+        while key:
+            edge = node.edges.get(key[0])
+            if edge is None:
+                child = _Node()
+                node.edges[key[0]] = (key, child)
+                node = child
+                break
+            label, child = edge
+            if key.startswith(label):
+                node, key = child, key[len(label):]
+                continue
+            common = 1  # first char matched via the edges dict
+            while common < len(key) and label[common] == key[common]:
+                common += 1
+            mid = _Node()  # split the edge: label[:common] -> mid -> label[common:]
+            mid.edges[label[common]] = (label[common:], child)
+            node.edges[key[0]] = (label[:common], mid)
+            node, key = mid, key[common:]
+        node.entries.append(suggestion)
+
+    def freeze(self):
+        """Compute every node's top-k (children first, no recursion)."""
+        order, stack = [], [self.root]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(child for _, child in node.edges.values())
+        for node in reversed(order):
+            children, entries = node.edges.values(), node.entries
+            node.entries = None
+            if not entries and len(children) == 1:
+                node.top = next(iter(children))[1].top  # pass-through node: share the child's tuple
+                continue
+            if not children and len(entries) == 1:
+                node.top = (entries[0],)
+                continue
+            best = {}
+            for s in [*entries, *(s for _, child in children for s in child.top)]:
+                if s.text not in best or best[s.text].score < s.score:
+                    best[s.text] = s  # same product reached through several word starts
+            node.top = tuple(sorted(best.values(), key=_rank)[:self.k])
+        return self
+
+    def complete(self, prefix, k=None):
+        node, rest = self.root, normalize(prefix)
+        while rest:
+            edge = node.edges.get(rest[0])
+            if edge is None:
+                return []
+            label, child = edge
+            if rest.startswith(label):
+                rest = rest[len(label):]
+            elif not label.startswith(rest):
+                return []
+            else:
+                rest = ""
+            node = child
+        return list(node.top[:k or self.k])
+
+
+# --- Building a store's trie ---
+def popularity(store_id=None, days=None):
+    """{lowercased product name: cart adds + 3 × quotations} over the last `days` days."""
+    from django.db.models import Sum
+
+    from . import analytics
+    from .models import DailyRollup
+
+    days = days or _conf().get("POPULARITY_DAYS", 30)
+    rows = (DailyRollup.objects
+            .filter(day__gte=timezone.localdate() - timedelta(days=days), store_key=store_id or 0,
+                    metric__in=[analytics.CART_ADD, analytics.QUOTATION])
+            .values_list("metric", "key").annotate(n=Sum("count")).order_by())
+    scores = Counter()
+    for metric, key, n in rows:
+        scores[normalize(key)] += n * (QUOTATION_WEIGHT if metric == analytics.QUOTATION else 1)
+    return scores
+
+
+def build(items, categories, intents, scores=None):
+    """Trie over products (CatalogItems), {synonym: category} and {intent: phrases}."""
+    scores = scores or {}
+    trie = RadixTrie()
+    category_scores = Counter()
+    for item in items:
+        score = 1 + scores.get(normalize(item.name), 0) + (BEST_SELLER_BONUS if item.best_seller else 0)
+        category_scores[(item.category or "").lower()] += score
+        suggestion = Suggestion(item.name, PRODUCT, score)
+        for key in word_starts(item.name):
+            trie.insert(key, suggestion)
+    for synonym, category in categories.items():
+        text = f"show me {category.lower()}"
+        suggestion = Suggestion(text, CATEGORY, 1 + category_scores.get(category.lower(), 0))
+        trie.insert(normalize(synonym), suggestion)
+        trie.insert(text, suggestion)
+    for phrases in intents.values():
+        for phrase in phrases:
+            trie.insert(normalize(phrase), Suggestion(phrase, PHRASE, 0))
+    return trie.freeze()
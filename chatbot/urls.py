@@ -1,8 +1,17 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# CHAT_ASYNC (env var, see settings) switches to the native async chat views for ASGI servers
+if settings.CHAT_ASYNC:
+    chat_response, whatsapp_webhook = views.achatbot_response, views.awhatsapp_webhook
+else:
+    chat_response, whatsapp_webhook = views.chatbot_response, views.whatsapp_webhook
+
 urlpatterns = [
     path("", views.chatbot_home, name="chat_home"),
-    path("get-response/", views.chatbot_response, name="chat_response"),
-    path("whatsapp-webhook/", views.whatsapp_webhook, name="whatsapp_webhook"),
+    path("get-response/", chat_response, name="chat_response"),
+    path("suggest/", views.suggest, name="chat_suggest"),
+    path("whatsapp-webhook/", whatsapp_webhook, name="whatsapp_webhook"),
+    path("metrics/", views.metrics_view, name="metrics"),
 ]
@@ -1,171 +1,442 @@
-from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
 from django.http import JsonResponse, HttpResponse
 from django.db.models import Count, Q
 from django.views.decorators.csrf import csrf_exempt
 from .models import Product, QuotationRequest
-import os, yaml, re, json
+from .formatting import FORMATTERS, format_products_list
+from .summaries import aget_category_summary, get_category_summary
+from .tenancy import get_tenant_index, load_intents_file
+from .transcripts import record_transcript
+from .typeahead import TOP_K
+from .ratelimit import rate_limit, remember_session, web_key, whatsapp_key
+from . import analytics, metrics
+from django.conf import settings
+import re, json, hmac, hashlib, time
 from difflib import get_close_matches
-from twilio.twiml.messaging_response import MessagingResponse
 
 
 # ---- Load intents.yml ----
-intents_path = os.path.join(os.path.dirname(__file__), "intents/intents.yml")
-with open(intents_path, "r", encoding="utf-8") as f:
-    yaml_data = yaml.safe_load(f)
-    INTENTS = yaml_data["intents"]
-    CATEGORY_SYNONYMS = yaml_data.get("categories", {})
+# default store ka data; per-store variants are loaded by tenancy.TenantIndex
+INTENTS, CATEGORY_SYNONYMS = load_intents_file()
+
+
+ABOVE_PRICE_RE = re.compile(r"\b(above|over|more than)\s*₹?\s*\d")
+PRICE_RE = re.compile(r"(\d[\d,]*)")
 
 
 # --- Detect intent ---
-def detect_intent(user_msg):
+def detect_intent(user_msg, index=None):
+    return detect_intent_stage(user_msg, index)[0]
+
+
+def detect_intent_stage(user_msg, index=None, spelling=True):
+    """Returns (intent, stage) where stage is the matcher that resolved it."""
     user_msg = user_msg.lower()
-    
-     # custom rules
+    index = index or get_tenant_index()
+
+    found = _match_phrases(user_msg, index)
+    if found:
+        return found
+
+    # 3. Typo correction ("neckless", "earings"), then rules/phrases again
+    if spelling:
+        corrected = index.speller().correct(user_msg)
+        if corrected != user_msg:
+            found = _match_phrases(corrected, index)
+            if found:
+                return found[0], "spelling"
+
+    # 4. Fuzzy match
+    for intent, phrases in index.intents.items():
+        if get_close_matches(user_msg, phrases, cutoff=0.75):
+            return intent, "fuzzy"
+
+    return "fallback", "none"
+
+
+def _match_phrases(user_msg, index):
+    # custom rules
     if "under" in user_msg or "below" in user_msg:
-        return "price_filter"
+        return "price_filter", "rule"
+    if ABOVE_PRICE_RE.search(user_msg) or "cheapest" in user_msg or "most expensive" in user_msg:
+        return "price_filter", "rule"
     if "price for" in user_msg or "cost of" in user_msg:
-        return "bulk_orders"
+        return "bulk_orders", "rule"
     if "interested" in user_msg:
-        return "inquiry"
+        return "inquiry", "rule"
 
     # 1. Exact match first
-    for intent, phrases in INTENTS.items():
-        if user_msg in [p.lower() for p in phrases]:
-            return intent
-
-    # 2. Substring match
-    for intent, phrases in INTENTS.items():
-        sorted_phrases = sorted(phrases, key=len, reverse=True)
-        for phrase in sorted_phrases:
-            if phrase.lower() in user_msg:
-                return intent
-    
-   
-
-    # 3. Fuzzy match
-    for intent, phrases in INTENTS.items():
-        if get_close_matches(user_msg, [p.lower() for p in phrases], cutoff=0.75):
-            return intent
-
-    return "fallback"
+    intent = index.exact.get(user_msg)
+    if intent:
+        return intent, "exact"
+
+    # 2. Substring match (longest phrases first)
+    for intent, phrases in index.by_length.items():
+        for phrase in phrases:
+            if phrase in user_msg:
+                return intent, "substring"
+    return None
 
 
 # --- Helpers for category matching ---
-def build_category_query(user_msg):
+def match_category(user_msg, index=None, spelling=True):
     user_msg = user_msg.lower()
-    for key, category in CATEGORY_SYNONYMS.items():
-        if key.lower() in user_msg:
-            return Q(category__iexact=category)
+    index = index or get_tenant_index()
+    match = index.category_re.search(user_msg) if index.category_re else None
+    if match:
+        return index.categories[match.group(1)]
+    if spelling:
+        corrected = index.speller().correct(user_msg)
+        if corrected != user_msg:
+            return match_category(corrected, index, spelling=False)
     return None
 
 
-def format_products_list(products, header="🔎 Matching items:"):
-    reply = header + "<br>"
-    for p in products:
-        price_txt = f"₹{p.price}" if p.price else "Price NA"
-        reply += f"- {p.name} ({price_txt})<br>"
-    reply += "<br>💬 Type 'add <product>' to add to cart, or 'I'm interested' to request a callback."
-    return reply
+def build_category_query(user_msg, index=None):
+    category = match_category(user_msg, index)
+    return Q(category__iexact=category) if category else None
 
 
 # --- Common reply function (for WhatsApp + Web) ---
 def chatbot_reply(user_msg, request):
     fake_request = request
     fake_request.GET = {"msg": user_msg}
+    fake_request.chat_channel = "whatsapp"
 
-    json_response = chatbot_response(fake_request)
+    json_response = _chatbot_response(fake_request)
     response_dict = json.loads(json_response.content.decode("utf-8"))
 
     return response_dict.get("reply", "❌ Sorry, I didn’t understand.")
 
 
+async def achatbot_reply(user_msg, request):
+    request.GET = {"msg": user_msg}
+    request.chat_channel = "whatsapp"
+    json_response = await _achatbot_response(request)
+    return json.loads(json_response.content.decode("utf-8")).get("reply", "❌ Sorry, I didn’t understand.")
+
+
+# --- Rate limited replies (no intent detection / DB work) ---
+RATE_LIMITED_REPLY = "⏳ You're sending messages too fast. Please wait a moment and try again."
+
+
+def web_rate_limited(request, retry_after):
+    resp = JsonResponse({"reply": RATE_LIMITED_REPLY}, status=429)
+    resp["Retry-After"] = str(retry_after)
+    return resp
+
+
+def whatsapp_rate_limited(request, retry_after):
+    from .whatsapp import twiml_response
+    return twiml_response(RATE_LIMITED_REPLY)
+
+
 # --- WhatsApp Webhook (Twilio) ---
+# channel code lives in .whatsapp and is imported on first webhook hit only
 @csrf_exempt
+@rate_limit(whatsapp_key, whatsapp_rate_limited, channel="whatsapp")
 def whatsapp_webhook(request):
-    if request.method == "POST":
-        user_msg = request.POST.get("Body", "").strip()  # WhatsApp msg
-        bot_reply = chatbot_reply(user_msg, request)
+    from .whatsapp import webhook
+    return webhook(request)
 
-        resp = MessagingResponse()
-        resp.message(bot_reply)
 
-        return HttpResponse(str(resp), content_type="application/xml")
-
-    return HttpResponse("WhatsApp bot running ✅")
+@csrf_exempt
+@rate_limit(whatsapp_key, whatsapp_rate_limited, channel="whatsapp")
+async def awhatsapp_webhook(request):
+    from .whatsapp import awebhook
+    return await awebhook(request)
 
 
 # --- Web chatbot home ---
+# Page shell is the same for every visitor: render once per process, serve with
+# ETag + Cache-Control, and never touch the session here (cart / chat_state are
+# created lazily on the first message). Bounce visits -> no session row, no
+# Set-Cookie; repeat visits -> browser cache or a 304. The ETag is a hash of
+# the rendered page, so every worker and every restart agrees on it; no
+# Last-Modified (a per-worker render time would differ between workers).
+_home_page = None  # (content, etag)
+
+
+def _home_shell():
+    global _home_page
+    if _home_page is None or settings.DEBUG:
+        content = render_to_string("chatbot/chatbot.html").encode("utf-8")
+        _home_page = (content, f'"{hashlib.md5(content).hexdigest()}"')
+    return _home_page
+
+
+@condition(etag_func=lambda request: _home_shell()[1])
 def chatbot_home(request):
-    if "cart" not in request.session:
-        request.session["cart"] = []
-    if "chat_state" not in request.session:
-        request.session["chat_state"] = {}
-    return render(request, "chatbot/chatbot.html")
+    content, etag = _home_shell()
+    response = HttpResponse(content)
+    patch_cache_control(response, public=True, max_age=settings.CHAT_PAGE_MAX_AGE)
+    return response
+
+
+# --- Typeahead (web widget, see typeahead.py) ---
+# No session access (no Set-Cookie), so browsers and CDNs can cache the
+# answer for a prefix for MAX_AGE seconds.
+def suggest(request):
+    conf = getattr(settings, "CHAT_TYPEAHEAD", {})
+    q, k = request.GET.get("q", ""), request.GET.get("k", "")
+    limit = min(int(k), TOP_K) if k.isdigit() and int(k) > 0 else conf.get("MAX_RESULTS", 6)
+    suggestions = []
+    if len(q.strip()) >= conf.get("MIN_PREFIX", 2):
+        suggestions = get_tenant_index(getattr(request, "store", None)).typeahead().complete(q[:100], limit)
+    response = JsonResponse({"q": q, "suggestions": [{"text": s.text, "kind": s.kind} for s in suggestions]})
+    patch_cache_control(response, public=True, max_age=conf.get("MAX_AGE", 60))
+    return response
+
+
+# --- Metrics (staff or bearer token) ---
+def metrics_view(request):
+    token = getattr(settings, "METRICS_TOKEN", "")
+    auth = request.headers.get("Authorization", "")
+    allowed = request.user.is_staff or (token and hmac.compare_digest(auth, f"Bearer {token}"))
+    if not allowed:
+        return JsonResponse({"error": "forbidden"}, status=403)
+    return JsonResponse(metrics.snapshot())
 
 
 # --- Web chatbot response ---
+@rate_limit(web_key, web_rate_limited, channel="web", after=remember_session)
 def chatbot_response(request):
+    return _chatbot_response(request)
+
+
+def _chatbot_response(request):
+    started = time.perf_counter()
+    response, intent, stage = chat_engine(request)
+    request.chat_intent, request.chat_stage = intent, stage
+    record_transcript(request, intent, stage, time.perf_counter() - started)
+    analytics.record_message(request, intent, stage)
+    return JsonResponse(response)
+
+
+# --- Replies built without DB access (shared by chat_engine and achat_engine) ---
+DEFAULT_REPLY = "❌ Sorry, I didn’t understand. Try: rings, necklaces, bangles, earrings, anklets, chains."
+NO_MATCH_REPLY = "❌ I couldn't find a match. Try a category like 'rings', 'bangles', 'chains', or say 'best selling items' / 'under 2000'."
+RESET_WORDS = ["end", "reset", "restart", "bye"]
+
+
+def _intent_for(user_msg, state, tenant):
+    # If already in inquiry flow, override intent
+    if state.get("awaiting") in ["name", "contact", "email"]:
+        return "inquiry", "flow"
+    # exact product name (typically a typeahead pick): no phrase matching / fuzzy scan
+    if tenant.snapshot().named(user_msg) is not None:
+        return "product_lookup", "exact"
+    return detect_intent_stage(user_msg, tenant)
+
+
+def _greeting_reply(user_msg, tenant):
+    return {"reply": "Hi 👋 I’m SilverBot! Ask me about rings, bangles, necklaces, earrings, chains, anklets."}
+
+
+def _price_filter_reply(user_msg, tenant):
+    # (answered from the in-memory catalog snapshot, no DB round trip)
+    snapshot = tenant.snapshot()
+    category = match_category(user_msg, tenant)
+    label = category or "Items"
+    price_match = PRICE_RE.search(user_msg)
+
+    if "cheapest" in user_msg:
+        products = snapshot.cheapest(category)
+        return {"reply": format_products_list(products, f"💎 Cheapest {label.lower()}:")
+                if products else f"❌ No {label.lower()} found."}
+    if "most expensive" in user_msg or ("premium" in user_msg and not price_match):
+        products = snapshot.most_expensive(category)
+        return {"reply": format_products_list(products, f"💎 Premium {label.lower()}:")
+                if products else f"❌ No {label.lower()} found."}
+    if price_match:
+        price_limit = int(price_match.group(1).replace(",", ""))
+        if ABOVE_PRICE_RE.search(user_msg):
+            products = snapshot.above(price_limit, category)
+            direction = "above"
+        else:
+            products = snapshot.under(price_limit, category)
+            direction = "under"
+        if products:
+            return {"reply": format_products_list(products, f"💎 {label} {direction} ₹{price_limit}:")}
+        return {"reply": f"❌ No {label.lower()} found {direction} ₹{price_limit}."}
+    return {"reply": DEFAULT_REPLY}
+
+
+def _business_info_reply(user_msg, tenant):
+    info = tenant.business_info
+    if "store" in user_msg or "located" in user_msg:
+        return {"reply": info["store"]}
+    if "catalog" in user_msg:
+        return {"reply": info["catalog"]}
+    if "customize" in user_msg:
+        return {"reply": info["customize"]}
+    if "gold" in user_msg:
+        return {"reply": info["gold"]}
+    return {"reply": info["default"]}
+
+
+LOCAL_REPLIES = {
+    "greeting": _greeting_reply,
+    "price_filter": _price_filter_reply,
+    "business_info": _business_info_reply,
+}
+
+
+def _bulk_request(user_msg, tenant):
+    """(quantity, category Q) for a bulk quote, or None if either is missing."""
+    qty_match = re.search(r"(\d+)", user_msg)
+    product_q = build_category_query(user_msg, tenant)
+    if qty_match and product_q:
+        return int(qty_match.group(1)), product_q
+    return None
+
+
+def _bulk_reply(qty, product):
+    if not product:
+        return {"reply": "❌ Couldn’t find the product for bulk order."}
+    total_price = product.price * qty
+    img_url = product.image.url if getattr(product, "image", None) else ""
+    reply = (
+        f"📦 Bulk order quotation:<br>"
+        f"{qty} x {product.name} = ₹{total_price}<br>"
+        f"💬 Type 'I'm interested' to request a callback."
+    )
+    return {"reply": reply, "img": img_url}
+
+
+BULK_HELP_REPLY = {"reply": "ℹ️ Please mention quantity and product, e.g. 'price for 20 rings'."}
+
+
+def _popular_queryset(products_qs):
+    return products_qs.annotate(req_count=Count("quotationrequest")).order_by("-req_count")[:5]
+
+
+def _popular_reply(popular):
+    if popular:
+        return {"reply": format_products_list(popular, "🔥 Our best selling items:")}
+    return {"reply": "🤔 Not enough data yet for best sellers."}
+
+
+def _closest_name(text, names):
+    match = get_close_matches(text.lower(), [n.lower() for n in names], n=1, cutoff=0.6)
+    return match[0] if match else None
+
+
+def _cart_reply(cart):
+    if cart:
+        return {"reply": "🛒 Your cart: " + ", ".join(cart)}
+    return {"reply": "🛒 Your cart is empty."}
+
+
+def _inquiry_step(state, user_msg, cart):
+    """Advances the lead-capture flow. Returns the reply, or None when the email is valid (caller saves the lead)."""
+    # force start if fresh
+    if not state.get("awaiting"):
+        state["product_interest"] = cart[-1] if cart else "General"
+        state["awaiting"] = "name"
+        return {"reply": "🙋 Sure! Please tell me your name."}
+
+    if state.get("awaiting") == "name":
+        state["customer_name"] = user_msg
+        state["awaiting"] = "contact"
+        return {"reply": "📞 Great! Please share your contact number."}
+
+    if state.get("awaiting") == "contact":
+        if re.match(r"^\d{7,15}$", user_msg):  # phone validate
+            state["contact"] = user_msg
+            state["awaiting"] = "email"
+            return {"reply": "📧 Thanks! Please share your email address."}
+        return {"reply": "⚠️ Please enter a valid phone number (digits only)."}
+
+    if re.match(r"^[^@]+@[^@]+\.[^@]+$", user_msg):
+        state["email"] = user_msg
+        return None
+    return {"reply": "⚠️ Please enter a valid email address."}
+
+
+LEAD_SAVED_REPLY = {"reply": "✅ Thank you! Our team will contact you soon."}
+
+
+def _lead_rows(state, store, product):
+    """(Lead kwargs, QuotationRequest kwargs) for a finished inquiry."""
+    lead = dict(
+        name=state.get("customer_name"),
+        phone=state.get("contact"),
+        email=state.get("email"),
+        store=store,
+        message=f"Inquiry about {product.name if product else 'General'}",
+    )
+    quotation = dict(
+        customer_name=state.get("customer_name"),
+        contact=state.get("contact"),
+        product=product if product else None,
+        quantity=1,
+        store=store,
+        message="Lead generated from chatbot",
+    )
+    return lead, quotation
+
+
+def _product_reply(prod):
+    price_txt = f"₹{prod.price}" if prod.price else "Price NA"
+    img_url = prod.image.url if getattr(prod, "image", None) else ""
+    reply = (
+        f"Our {prod.name} is available. "
+        f"Price: {price_txt}. "
+        f"Description: {prod.description or 'No details'}<br>"
+        f"💬 Type 'add {prod.name.lower()}' to add to cart, or 'I'm interested' for a callback."
+    )
+    return {"reply": reply, "img": img_url}
+
+
+def _product_lookup_reply(prod, state):
+    if prod is None:  # deleted since the snapshot was taken
+        return {"reply": NO_MATCH_REPLY}
+    state["product_interest"] = prod.name
+    return _product_reply(prod)
+
+
+RESET_REPLY = {"reply": "🔄 Conversation ended. You can start a new chat now."}
+
+
+def chat_engine(request):
+    """Answers request.GET["msg"]; returns (response dict, intent, matching stage)."""
     user_msg = request.GET.get("msg", "").lower()
+    channel = getattr(request, "chat_channel", "web")
+    store = getattr(request, "store", None)
+    store_id = store.pk if store else None
+    tenant = get_tenant_index(store)
+    products_qs = Product.objects.for_store(store)
     state = request.session.get("chat_state", {})
 
     # Ensure cart exists
-    if "cart" not in request.session:
-        request.session["cart"] = []
+    cart = request.session.setdefault("cart", [])
 
-    # If already in inquiry flow, override intent
-    if state.get("awaiting") in ["name", "contact"]:
-        intent = "inquiry"
-    else:
-        intent = detect_intent(user_msg)
-
-    response = {"reply": "❌ Sorry, I didn’t understand. Try: rings, necklaces, bangles, earrings, anklets, chains."}
-
-    # --- Greeting ---
-    if intent == "greeting":
-        response = {"reply": "Hi 👋 I’m SilverBot! Ask me about rings, bangles, necklaces, earrings, chains, anklets."}
-
-    # --- Price filter ---
-    elif intent == "price_filter":
-        price_match = re.search(r"(\d+)", user_msg)
-        if price_match:
-            price_limit = int(price_match.group(1))
-            products = Product.objects.filter(price__lte=price_limit)[:5]
-            if products:
-                response = {"reply": format_products_list(products, f"💎 Items under ₹{price_limit}:")}
-            else:
-                response = {"reply": f"❌ No items found under ₹{price_limit}."}
+    intent, stage = _intent_for(user_msg, state, tenant)
+    response = {"reply": DEFAULT_REPLY}
+
+    # --- Greeting / price filter / business info (in memory) ---
+    if intent in LOCAL_REPLIES:
+        response = LOCAL_REPLIES[intent](user_msg, tenant)
 
     # --- Bulk Orders ---
     elif intent == "bulk_orders":
-        qty_match = re.search(r"(\d+)", user_msg)
-        product_q = build_category_query(user_msg)
-
-        if qty_match and product_q:
-            qty = int(qty_match.group(1))
-            product = Product.objects.filter(product_q).first()
-            if product:
-                total_price = product.price * qty
-                img_url = product.image.url if getattr(product, "image", None) else ""
-                reply = (
-                    f"📦 Bulk order quotation:<br>"
-                    f"{qty} x {product.name} = ₹{total_price}<br>"
-                    f"💬 Type 'I'm interested' to request a callback."
-                )
-                response = {"reply": reply, "img": img_url}
-            else:
-                response = {"reply": "❌ Couldn’t find the product for bulk order."}
+        bulk = _bulk_request(user_msg, tenant)
+        if bulk:
+            qty, product_q = bulk
+            response = _bulk_reply(qty, products_qs.filter(product_q).first())
         else:
-            response = {"reply": "ℹ️ Please mention quantity and product, e.g. 'price for 20 rings'."}
+            response = BULK_HELP_REPLY
 
     # --- Recommendations ---
     elif intent == "best_sellers":
-        popular = (Product.objects
-                   .annotate(req_count=Count("quotationrequest"))
-                   .order_by("-req_count")[:5])
-        if popular:
-            response = {"reply": format_products_list(popular, "🔥 Our best selling items:")}
+        summary = get_category_summary(match_category(user_msg, tenant), store_id)
+        if summary and summary.best_sellers:
+            response = {"reply": FORMATTERS[channel](summary.best_sellers, f"🔥 Best selling {summary.category.lower()}:")}
         else:
-            response = {"reply": "🤔 Not enough data yet for best sellers."}
+            response = _popular_reply(list(_popular_queryset(products_qs)))
 
     # --- Cart management ---
     elif intent == "cart_management":
@@ -173,124 +444,193 @@ def chatbot_response(request):
             parts = user_msg.split(maxsplit=1)
             if len(parts) > 1:
                 product_code = parts[1]
-                all_products = list(Product.objects.values_list("name", flat=True))
-                match = get_close_matches(product_code.lower(), [p.lower() for p in all_products], n=1, cutoff=0.6)
-                prod = Product.objects.filter(name__iexact=match[0]).first() if match else None
+                match = _closest_name(product_code, products_qs.values_list("name", flat=True))
+                prod = products_qs.filter(name__iexact=match).first() if match else None
 
                 if prod:
-                    request.session["cart"].append(prod.name)
+                    cart.append(prod.name)
                     request.session.modified = True
+                    analytics.record_cart_add(request, prod.name, store_id)
                     response = {"reply": f"✅ {prod.name} added to your cart!"}
                 else:
                     response = {"reply": f"❌ Couldn’t find {product_code} in catalog."}
 
         elif "show" in user_msg or "view" in user_msg:
-            cart = request.session.get("cart", [])
-            if cart:
-                response = {"reply": "🛒 Your cart: " + ", ".join(cart)}
-            else:
-                response = {"reply": "🛒 Your cart is empty."}
+            response = _cart_reply(cart)
 
     # --- Inquiry (Lead capture) ---
-       
-        elif intent == "inquiry":
-            from .models import Lead  
-
-            # force start if fresh
-            if not state.get("awaiting"):
-                last_cart = request.session.get("cart", [])
-                product_interest = last_cart[-1] if last_cart else "General"
-                state["product_interest"] = product_interest
-                state["awaiting"] = "name"
-                response = {"reply": "🙋 Sure! Please tell me your name."}
-
-            elif state.get("awaiting") == "name":
-                state["customer_name"] = user_msg
-                state["awaiting"] = "contact"
-                response = {"reply": "📞 Great! Please share your contact number."}
-
-            elif state.get("awaiting") == "contact":
-                if re.match(r"^\d{7,15}$", user_msg):  # phone validate
-                    state["contact"] = user_msg
-                    state["awaiting"] = "email"
-                    response = {"reply": "📧 Thanks! Please share your email address."}
-                else:
-                    response = {"reply": "⚠️ Please enter a valid phone number (digits only)."}
-
-            elif state.get("awaiting") == "email":
-                if re.match(r"^[^@]+@[^@]+\.[^@]+$", user_msg):
-                    state["email"] = user_msg
-                    product_name = state.get("product_interest", "General Inquiry")
-                    product = Product.objects.filter(name__icontains=product_name).first()
-
-                    # Save Lead
-                    Lead.objects.create(
-                        name=state.get("customer_name"),
-                        phone=state.get("contact"),
-                        email=state.get("email"),
-                        message=f"Inquiry about {product.name if product else 'General'}"
-                    )
-
-                    # Save Quotation Request
-                    QuotationRequest.objects.create(
-                        customer_name=state.get("customer_name"),
-                        contact=state.get("contact"),
-                        product=product if product else None,
-                        quantity=1,
-                        message="Lead generated from chatbot"
-                    )
-
-                    response = {"reply": "✅ Thank you! Our team will contact you soon."}
-                    state.clear()
-                else:
-                    response = {"reply": "⚠️ Please enter a valid email address."}
-
-
-    # --- Business Info ---
-    elif intent == "business_info":
-        if "store" in user_msg or "located" in user_msg:
-            response = {"reply": "🏬 Our store is located at: Mumbai, India. We also deliver PAN-India 🌍"}
-        elif "catalog" in user_msg:
-            response = {"reply": "📖 You can view our full catalog on our website or ask me for specific categories."}
-        elif "customize" in user_msg:
-            response = {"reply": "🎨 Yes, we do customize silver jewelry on request."}
-        elif "gold" in user_msg:
-            response = {"reply": "✨ We specialize in silver jewelry only, not gold."}
-        else:
-            response = {"reply": "ℹ️ We are a silver jewelry manufacturer. Ask me about store, catalog, or customization."}
+    elif intent == "inquiry":
+        from .models import Lead
+
+        response = _inquiry_step(state, user_msg, cart)
+        if response is None:
+            product_name = state.get("product_interest", "General Inquiry")
+            product = products_qs.filter(name__icontains=product_name).first()
+            lead, quotation = _lead_rows(state, store, product)
+            if not getattr(request, "chat_replay", False):  # load-test replays: no synthetic leads / notifications
+                Lead.objects.create(**lead)
+                QuotationRequest.objects.create(**quotation)
+            response = LEAD_SAVED_REPLY
+            state.clear()
+
+    # --- Exact product name -> primary key lookup ---
+    elif intent == "product_lookup":
+        item = tenant.snapshot().named(user_msg)
+        response = _product_lookup_reply(products_qs.filter(pk=item.id).first() if item else None, state)
 
     # --- Fallback (search products with fuzzy match) ---
     else:
-        q = build_category_query(user_msg)
-        products = Product.objects.filter(q).order_by("price")[:5] if q else []
-        if products:
-            response = {"reply": format_products_list(products, "🔎 Matching items:")}
-            state["product_interest"] = products[0].name
+        # category answers are precomputed (see summaries.py) -> dict lookup
+        summary = get_category_summary(match_category(user_msg, tenant), store_id)
+        if summary:
+            response = {"reply": summary.replies[channel]}
+            state["product_interest"] = summary.cheapest[0].name
         else:
-            all_products = list(Product.objects.values_list("name", flat=True))
-            match = get_close_matches(user_msg, [p.lower() for p in all_products], n=1, cutoff=0.6)
-            prod = Product.objects.filter(name__iexact=match[0]).first() if match else None
+            match = _closest_name(user_msg, products_qs.values_list("name", flat=True))
+            prod = products_qs.filter(name__iexact=match).first() if match else None
+
+            # descriptions ("light oxidised jhumka for daily wear") -> semantic index
+            if not prod:
+                # index is shared by all stores: keep the best hit from this store
+                from .semantic import semantic_search  # numpy, loaded on first use
+                hits = [pk for pk, _ in semantic_search(user_msg, k=5)]
+                found = products_qs.in_bulk(hits) if hits else {}
+                prod = next((found[pk] for pk in hits if pk in found), None)
+                if prod:
+                    stage = "semantic"
 
             if prod:
-                price_txt = f"₹{prod.price}" if prod.price else "Price NA"
-                img_url = prod.image.url if getattr(prod, "image", None) else ""
-                reply = (
-                    f"Our {prod.name} is available. "
-                    f"Price: {price_txt}. "
-                    f"Description: {prod.description or 'No details'}<br>"
-                    f"💬 Type 'add {prod.name.lower()}' to add to cart, or 'I'm interested' for a callback."
-                )
-                response = {"reply": reply, "img": img_url}
+                response = _product_reply(prod)
                 state["product_interest"] = prod.name
             else:
-                response = {"reply": "❌ I couldn't find a match. Try a category like 'rings', 'bangles', 'chains', or say 'best selling items' / 'under 2000'."}
+                response = {"reply": NO_MATCH_REPLY}
 
     # --- Reset ---
-    if user_msg in ["end", "reset", "restart", "bye"]:
+    if user_msg in RESET_WORDS:
         request.session["chat_state"] = {}
         request.session["cart"] = []
-        response = {"reply": "🔄 Conversation ended. You can start a new chat now."}
-        return JsonResponse(response)
+        return RESET_REPLY, intent, stage
 
     request.session["chat_state"] = state
+    return response, intent, stage
+
+
+# --- Async chat engine (ASGI, see aio.py) ---
+# Same replies as chat_engine; sessions through aget/aset and the catalog
+# through the async ORM, so a worker isn't tied up while Postgres answers.
+@rate_limit(web_key, web_rate_limited, channel="web", after=remember_session)
+async def achatbot_response(request):
+    return await _achatbot_response(request)
+
+
+async def _achatbot_response(request):
+    started = time.perf_counter()
+    response, intent, stage = await achat_engine(request)
+    request.chat_intent, request.chat_stage = intent, stage
+    record_transcript(request, intent, stage, time.perf_counter() - started)
+    analytics.record_message(request, intent, stage)
     return JsonResponse(response)
+
+
+async def achat_engine(request):
+    """chat_engine for async views; returns (response dict, intent, matching stage)."""
+    user_msg = request.GET.get("msg", "").lower()
+    channel = getattr(request, "chat_channel", "web")
+    store = getattr(request, "store", None)
+    store_id = store.pk if store else None
+    tenant = get_tenant_index(store)
+    await tenant.awarm()
+    products_qs = Product.objects.for_store(store)
+    state = await request.session.aget("chat_state", {})
+    cart = await request.session.asetdefault("cart", [])
+
+    intent, stage = _intent_for(user_msg, state, tenant)
+    response = {"reply": DEFAULT_REPLY}
+
+    if intent in LOCAL_REPLIES:
+        response = LOCAL_REPLIES[intent](user_msg, tenant)
+
+    elif intent == "bulk_orders":
+        bulk = _bulk_request(user_msg, tenant)
+        if bulk:
+            qty, product_q = bulk
+            response = _bulk_reply(qty, await products_qs.filter(product_q).afirst())
+        else:
+            response = BULK_HELP_REPLY
+
+    elif intent == "best_sellers":
+        summary = await aget_category_summary(match_category(user_msg, tenant), store_id)
+        if summary and summary.best_sellers:
+            response = {"reply": FORMATTERS[channel](summary.best_sellers, f"🔥 Best selling {summary.category.lower()}:")}
+        else:
+            response = _popular_reply([p async for p in _popular_queryset(products_qs)])
+
+    elif intent == "cart_management":
+        if "add" in user_msg:
+            parts = user_msg.split(maxsplit=1)
+            if len(parts) > 1:
+                product_code = parts[1]
+                names = [name async for name in products_qs.values_list("name", flat=True)]
+                match = _closest_name(product_code, names)
+                prod = await products_qs.filter(name__iexact=match).afirst() if match else None
+
+                if prod:
+                    cart.append(prod.name)
+                    request.session.modified = True
+                    analytics.record_cart_add(request, prod.name, store_id)
+                    response = {"reply": f"✅ {prod.name} added to your cart!"}
+                else:
+                    response = {"reply": f"❌ Couldn’t find {product_code} in catalog."}
+
+        elif "show" in user_msg or "view" in user_msg:
+            response = _cart_reply(cart)
+
+    elif intent == "inquiry":
+        from .models import Lead
+
+        response = _inquiry_step(state, user_msg, cart)
+        if response is None:
+            product_name = state.get("product_interest", "General Inquiry")
+            product = await products_qs.filter(name__icontains=product_name).afirst()
+            lead, quotation = _lead_rows(state, store, product)
+            if not getattr(request, "chat_replay", False):
+                await Lead.objects.acreate(**lead)
+                await QuotationRequest.objects.acreate(**quotation)
+            response = LEAD_SAVED_REPLY
+            state.clear()
+
+    elif intent == "product_lookup":
+        item = tenant.snapshot().named(user_msg)
+        response = _product_lookup_reply(await products_qs.filter(pk=item.id).afirst() if item else None, state)
+
+    else:
+        summary = await aget_category_summary(match_category(user_msg, tenant), store_id)
+        if summary:
+            response = {"reply": summary.replies[channel]}
+            state["product_interest"] = summary.cheapest[0].name
+        else:
+            names = [name async for name in products_qs.values_list("name", flat=True)]
+            match = _closest_name(user_msg, names)
+            prod = await products_qs.filter(name__iexact=match).afirst() if match else None
+
+            if not prod:
+                from .semantic import semantic_search  # numpy, loaded on first use
+                hits = [pk for pk, _ in semantic_search(user_msg, k=5)]
+                found = await products_qs.ain_bulk(hits) if hits else {}
+                prod = next((found[pk] for pk in hits if pk in found), None)
+                if prod:
+                    stage = "semantic"
+
+            if prod:
+                response = _product_reply(prod)
+                state["product_interest"] = prod.name
+            else:
+                response = {"reply": NO_MATCH_REPLY}
+
+    if user_msg in RESET_WORDS:
+        await request.session.aset("chat_state", {})
+        await request.session.aset("cart", [])
+        return RESET_REPLY, intent, stage
+
+    await request.session.aset("chat_state", state)
+    return response, intent, stage
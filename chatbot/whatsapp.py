@@ -0,0 +1,42 @@
+"""
+WhatsApp (Twilio) channel.
+
+Ye module sirf WhatsApp webhook hit hone par load hota hai (see
+views.whatsapp_webhook). Incoming webhooks only need a TwiML reply, which is
+a tiny XML document, so we write it ourselves instead of importing the Twilio
+SDK (and its requests/aiohttp dependency tree) into every web worker.
+"""
+from xml.sax.saxutils import escape
+
+from django.http import HttpResponse
+
+
+def twiml_message(*bodies):
+    """Minimal <Response><Message>...</Message></Response> writer."""
+    messages = "".join(f"<Message>{escape(body)}</Message>" for body in bodies)
+    return f'<?xml version="1.0" encoding="UTF-8"?><Response>{messages}</Response>'
+
+
+def twiml_response(*bodies):
+    return HttpResponse(twiml_message(*bodies), content_type="application/xml")
+
+
+def webhook(request):
+    from .views import chatbot_reply
+
+    if request.method == "POST":
+        user_msg = request.POST.get("Body", "").strip()  # WhatsApp msg
+        bot_reply = chatbot_reply(user_msg, request)
+        return twiml_response(bot_reply)
+
+    return HttpResponse("WhatsApp bot running ✅")
+
+
+async def awebhook(request):
+    from .views import achatbot_reply
+
+    if request.method == "POST":
+        user_msg = request.POST.get("Body", "").strip()
+        return twiml_response(await achatbot_reply(user_msg, request))
+
+    return HttpResponse("WhatsApp bot running ✅")
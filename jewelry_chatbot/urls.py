@@ -17,15 +17,16 @@
 # ]
 
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from chatbot.admin import analytics_view, profiles_view
+from chatbot.media import serve_media
 
 urlpatterns = [
+    path("admin/chatbot/profiles/", admin.site.admin_view(profiles_view), name="chatbot_profiles"),
+    path("admin/chatbot/analytics/", admin.site.admin_view(analytics_view), name="chatbot_analytics"),
     path("admin/", admin.site.urls),
     path("", include("chatbot.urls")),  
+    # Product images: served in production too (Range/304/immutable caching, or nginx via X-Accel)
+    re_path(r"^%s(?P<path>.+)$" % settings.MEDIA_URL.lstrip("/"), serve_media, name="media"),
 ]
-
-#  Serve media files (only in DEBUG mode)
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)